@@ -0,0 +1,229 @@
+"""
+First-come-first-serve slot allocation.
+
+A slot is (date, sport, time_slot). For every slot touched, the oldest
+Pending booking is approved and every other Pending booking is rejected;
+if the slot already has an Approved booking all of its Pending bookings
+are rejected. Decisions for any number of slots are persisted with
+set-based UPDATEs, one bulk upsert of AllotedGroundBooking and one pass
+over the outbox.
+"""
+import time
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from . import availability_cache, metrics, reference, slot_events, slot_locks
+from .models import AllotedGroundBooking, Booking, Player
+from .notifications import queue_booking_status_emails
+
+
+def slot_key(booking):
+    return (booking.date, (booking.sport or '').lower(), booking.time_slot)
+
+
+def _load_slot(key, requested=None):
+    """
+    Return (taken, rows) for one slot whose slot lock is already held.
+
+    `taken` says whether the slot has an Approved booking; `rows` are its
+    Pending bookings (plus `requested`), locked and oldest first. Approved
+    and Rejected history is read but never locked.
+    """
+    date, sport, time_slot = key
+    slot = Booking.objects.filter(
+        date=date,
+        sport_ref_id=reference.get_id('sport', sport),
+        time_slot_ref_id=reference.get_id('time_slot', time_slot),
+    )
+    taken = slot.filter(status='Approved').exists()
+    wanted = Q(status='Pending')
+    if requested is not None:
+        wanted |= Q(id=requested.id)
+    rows = list(slot.filter(wanted).select_for_update().order_by('created_at', 'id'))
+    return taken, rows
+
+
+def resolve_slot(rows, taken=False, requested=None):
+    """
+    FCFS decision for the bookings of one slot (oldest first).
+
+    Returns (winner, losers); winner is None when the slot is already taken.
+    `requested` is approved when nothing is pending (e.g. re-approving a
+    rejected booking for a free slot).
+    """
+    pending = [r for r in rows if r.status == 'Pending']
+    if taken or any(r.status == 'Approved' for r in rows):
+        return None, pending
+    winner = pending[0] if pending else None
+    if winner is None and requested is not None:
+        winner = next((r for r in rows if r.id == requested.id), None)
+    return winner, [r for r in pending if r is not winner]
+
+
+def _upsert_allotments(winners, now):
+    """Create or refresh the AllotedGroundBooking row of each winner in bulk."""
+    if not winners:
+        return
+    player_counts = dict(
+        Player.objects.filter(booking__in=winners)
+        .values('booking').annotate(n=Count('id'))
+        .values_list('booking', 'n')
+    )
+    existing = {a.booking_id: a for a in AllotedGroundBooking.objects.filter(booking__in=winners)}
+    fields = ['date', 'ground', 'time_slot', 'ground_ref', 'time_slot_ref', 'start_minute', 'end_minute',
+              'allotted_to', 'roll_number', 'purpose', 'players', 'updated_at']
+    to_create, to_update = [], []
+    for w in winners:
+        values = {
+            'date': w.date,
+            'ground': w.ground,
+            'time_slot': w.time_slot,
+            'ground_ref_id': w.ground_ref_id,
+            'time_slot_ref_id': w.time_slot_ref_id,
+            'start_minute': w.start_minute,
+            'end_minute': w.end_minute,
+            'allotted_to': w.student_name,
+            'roll_number': w.roll_number or '',
+            'purpose': w.purpose,
+            'players': player_counts.get(w.id, 0),
+            'updated_at': now,  # bulk_update skips auto_now
+        }
+        allotment = existing.get(w.id)
+        if allotment is None:
+            to_create.append(AllotedGroundBooking(booking=w, **values))
+        else:
+            for name, value in values.items():
+                setattr(allotment, name, value)
+            to_update.append(allotment)
+    if to_create:
+        AllotedGroundBooking.objects.bulk_create(to_create)
+    if to_update:
+        AllotedGroundBooking.objects.bulk_update(to_update, fields)
+
+
+def persist_decisions(winners, losers):
+    """Write approve/reject decisions, allotments and notifications. Call inside a transaction."""
+    # QuerySet.update() skips auto_now, so the change feed's stamp is set here
+    now = timezone.now()
+    if losers:
+        Booking.objects.filter(id__in=[b.id for b in losers]).update(status='Rejected', updated_at=now)
+        for b in losers:
+            b.status, b.updated_at = 'Rejected', now
+    if winners:
+        Booking.objects.filter(id__in=[b.id for b in winners]).update(status='Approved', updated_at=now)
+        for b in winners:
+            b.status, b.updated_at = 'Approved', now
+    _upsert_allotments(winners, now)
+    queue_booking_status_emails(winners, 'Approved')
+    queue_booking_status_emails(losers, 'Rejected')
+    metrics.inc_on_commit('booking_decisions_total', ('approved',), len(winners))
+    metrics.inc_on_commit('booking_decisions_total', ('rejected',), len(losers))
+    for key in {(w.date, (w.sport or '').lower()) for w in winners}:
+        availability_cache.invalidate_on_commit(*key)
+
+
+def approve(bookings):
+    """
+    Apply FCFS to the slots of `bookings`, holding only their slot locks.
+
+    Returns (approved, rejected) lists of Booking instances.
+    """
+    requested = {}
+    for b in bookings:
+        requested.setdefault(slot_key(b), b)
+
+    winners, losers = [], []
+    with transaction.atomic():
+        slot_locks.acquire(requested)
+        for key in sorted(requested):
+            taken, rows = _load_slot(key, requested[key])
+            winner, rejected = resolve_slot(rows, taken, requested[key])
+            if winner is not None:
+                winners.append(winner)
+            losers.extend(rejected)
+        persist_decisions(winners, losers)
+        # After the version bumps, so the woken SSE hubs see them
+        transaction.on_commit(slot_events.notify)
+    return winners, losers
+
+
+def reject(bookings):
+    """Reject `bookings` (skipping ones already rejected). Returns the rejected list."""
+    ids = [b.id for b in bookings]
+    with transaction.atomic():
+        rows = list(
+            Booking.objects.select_for_update()
+            .filter(id__in=ids).exclude(status='Rejected')
+            .order_by('id')
+        )
+        freed = {(b.date, (b.sport or '').lower()) for b in rows if b.status == 'Approved'}
+        persist_decisions([], rows)
+        for key in freed:
+            availability_cache.invalidate_on_commit(*key)
+        transaction.on_commit(slot_events.notify)
+    return rows
+
+
+class AllocationPlan:
+    """Winners and losers for every slot in a date range, decided in memory."""
+
+    def __init__(self):
+        self.slots = []  # (key, winner or None, losers)
+        self.timings = {}
+
+    @property
+    def winners(self):
+        return [w for _, w, _ in self.slots if w is not None]
+
+    @property
+    def losers(self):
+        return [b for _, _, losers in self.slots for b in losers]
+
+
+def plan_range(start, end, lock=False):
+    """
+    Decide FCFS outcomes for every Pending booking dated start..end in one pass.
+
+    Two queries: the slot keys that already have an Approved booking, and the
+    Pending bookings oldest first. With `lock` set, the slot locks of every
+    pending key are taken first and only the Pending rows are locked.
+    """
+    plan = AllocationPlan()
+    started = time.perf_counter()
+    pending = Booking.objects.filter(date__range=(start, end), status='Pending')
+    if lock:
+        slot_locks.acquire(pending.values_list('date', 'sport', 'time_slot').distinct())
+        pending = pending.select_for_update()
+    taken = {
+        (d, (sport or '').lower(), slot)
+        for d, sport, slot in Booking.objects
+        .filter(date__range=(start, end), status='Approved')
+        .values_list('date', 'sport', 'time_slot')
+    }
+    groups = {}
+    for b in pending.order_by('created_at', 'id'):
+        groups.setdefault(slot_key(b), []).append(b)
+    plan.timings['load'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for key in sorted(groups):
+        rows = groups[key]
+        if key in taken:
+            plan.slots.append((key, None, rows))
+        else:
+            plan.slots.append((key, rows[0], rows[1:]))
+    plan.timings['decide'] = time.perf_counter() - started
+    return plan
+
+
+def allocate_range(start, end, dry_run=False):
+    """Plan and (unless dry_run) persist FCFS allocation for a date range."""
+    with transaction.atomic():
+        plan = plan_range(start, end, lock=not dry_run)
+        if not dry_run:
+            started = time.perf_counter()
+            persist_decisions(plan.winners, plan.losers)
+            plan.timings['persist'] = time.perf_counter() - started
+    return plan
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class BookingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'booking'
+
+    def ready(self):
+        # Registers the StudentUser signals that invalidate the search index
+        from . import student_search  # noqa: F401
+        # Registers the TimeSlot signals that invalidate the slot catalog
+        from . import slot_catalog  # noqa: F401
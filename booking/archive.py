@@ -0,0 +1,159 @@
+"""
+Archival of old bookings.
+
+`archive_before(cutoff)` moves bookings dated before `cutoff`, with their
+players and allotments, into the ArchivedBooking / ArchivedPlayer /
+ArchivedAllotment tables in short batches, so the live tables that FCFS,
+availability and the 24-hour rule query stay small. On PostgreSQL the
+archive tables are range partitioned by `date`; the yearly partition a
+batch needs is created before rows are copied into it.
+
+`history_page` serves the student history across both: the live table
+alone until a page reaches the archive horizon (the latest archived
+date), then the keyset union of live and archived rows.
+
+The horizon is cached in the shared cache. It must never be earlier than
+an archived row that has left the live table. Each batch therefore raises
+it before moving rows, and recomputes it from ArchivedBooking once the
+batch commits. The recompute overwrites a stale value that a reader
+cached after the key was evicted mid-batch, from a Max('date') that could
+not see the uncommitted rows.
+"""
+from datetime import date
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Max
+
+from .models import (
+    AllotedGroundBooking, ArchivedAllotment, ArchivedBooking, ArchivedPlayer, Booking, Player,
+)
+from .pagination import decode_cursor, paginate, paginate_union
+
+HORIZON_KEY = 'archive:horizon'
+HISTORY_ORDERING = ('-date', '-created_at', '-id')
+
+
+def _latest_archived():
+    return ArchivedBooking.objects.aggregate(latest=Max('date'))['latest'] or date.min
+
+
+def horizon():
+    """Latest archived booking date, or None while the archive is empty."""
+    value = cache.get(HORIZON_KEY)
+    if value is None:
+        value = _latest_archived()
+        cache.add(HORIZON_KEY, value, None)
+    return None if value == date.min else value
+
+
+def _raise_horizon(day):
+    # Raised before rows leave the live table: a horizon that is too late
+    # only costs a history page an archive query, one that is too early
+    # would hide rows
+    current = horizon()
+    if current is None or day > current:
+        cache.set(HORIZON_KEY, day, None)
+
+
+def _refresh_horizon():
+    # set, not add: replaces whatever a reader cached while the batch was uncommitted
+    cache.set(HORIZON_KEY, _latest_archived(), None)
+
+
+def ensure_partitions(model, days):
+    """Create the yearly partitions of `model`'s table covering `days` (PostgreSQL only)."""
+    if connection.vendor != 'postgresql':
+        return
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        for year in sorted({day.year for day in days}):
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {connection.ops.quote_name(f"{table}_y{year}")} '
+                f'PARTITION OF {connection.ops.quote_name(table)} '
+                f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+            )
+
+
+def _copy(rows, model):
+    """Bulk insert `rows` (dicts of source values) into `model`, keeping ids."""
+    names = [f.attname for f in model._meta.concrete_fields if f.name != 'archived_at']
+    model.objects.bulk_create([model(**{name: row[name] for name in names}) for row in rows])
+
+
+def _archive_allotments(cutoff, batch_size):
+    with transaction.atomic():
+        rows = list(
+            AllotedGroundBooking.objects.filter(date__lt=cutoff)
+            .order_by('date', 'id').select_for_update()
+            .values()[:batch_size]
+        )
+        if rows:
+            ensure_partitions(ArchivedAllotment, {row['date'] for row in rows})
+            _copy(rows, ArchivedAllotment)
+            AllotedGroundBooking.objects.filter(id__in=[row['id'] for row in rows]).delete()
+    return len(rows)
+
+
+def _archive_bookings(cutoff, batch_size):
+    with transaction.atomic():
+        rows = list(
+            Booking.objects.filter(date__lt=cutoff)
+            .order_by('date', 'id').select_for_update()
+            .values()[:batch_size]
+        )
+        if not rows:
+            return 0, 0
+        ids = [row['id'] for row in rows]
+        players = list(Player.objects.filter(booking_id__in=ids).values())
+
+        _raise_horizon(max(row['date'] for row in rows))
+        transaction.on_commit(_refresh_horizon)
+        ensure_partitions(ArchivedBooking, {row['date'] for row in rows})
+        _copy(rows, ArchivedBooking)
+        _copy(players, ArchivedPlayer)
+        # Allotments dated before the cutoff were moved already; any left
+        # for these bookings are deleted by the cascade
+        Player.objects.filter(booking_id__in=ids).delete()
+        Booking.objects.filter(id__in=ids).delete()
+    return len(rows), len(players)
+
+
+def archive_before(cutoff, batch_size=500):
+    """
+    Move everything dated before `cutoff` into the archive, one transaction
+    per batch. Returns the number of (bookings, players, allotments) moved.
+    """
+    allotments = 0
+    while moved := _archive_allotments(cutoff, batch_size):
+        allotments += moved
+    bookings = players = 0
+    while True:
+        moved, moved_players = _archive_bookings(cutoff, batch_size)
+        if not moved:
+            break
+        bookings += moved
+        players += moved_players
+    return bookings, players, allotments
+
+
+def history_page(student_email, status=None, cursor=None, per_page=10):
+    """One page of a student's bookings, newest first, live and archived."""
+    live = Booking.objects.filter(student_email=student_email).prefetch_related('players')
+    archived = ArchivedBooking.objects.filter(student_email=student_email).prefetch_related('players')
+    if status:
+        live = live.filter(status=status)
+        archived = archived.filter(status=status)
+
+    limit = horizon()
+    if limit is None:
+        return paginate(live, HISTORY_ORDERING, cursor, per_page)
+
+    values, direction = decode_cursor(Booking, HISTORY_ORDERING, cursor)
+    if values is None or values[0] > limit:
+        page = paginate(live, HISTORY_ORDERING, cursor, per_page)
+        # Every archived row is dated on or before the horizon, so a page
+        # that ends after it (or walks back from a key after it) is complete
+        if direction == 'p' or (page.has_next and page[-1].date > limit):
+            return page
+    return paginate_union([live, archived], HISTORY_ORDERING, cursor, per_page)
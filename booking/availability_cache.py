@@ -0,0 +1,140 @@
+"""
+Versioned cache for `check_availability` responses.
+
+Entries are keyed by (date, sport, ground) and embed a version stamp kept
+per (date, sport) in the shared cache. Approving or rejecting a booking
+bumps that stamp, which orphans every cached entry for the slot in all
+worker processes at once; nothing has to be deleted. Slot state does not
+depend on the ground, so one bump covers every ground for the sport.
+
+The stamps live in the default cache so every worker sees a bump. The
+entries themselves go to the 'bulk' cache alias, so filling it with slot
+lists never evicts a stamp. `get_slots` returns the key it looked up and
+a miss is stored under that same key. A bump that lands while the caller
+computes the slots thus orphans what it stores, instead of filing the
+pre-bump state under the new version.
+
+Hits and misses are counted by booking.metrics (in memory per process,
+flushed to the shared counters), so a lookup does no extra cache I/O.
+
+`aget_slots` / `aset_slots` are the same operations for async views.
+"""
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.utils.connection import ConnectionProxy
+
+from . import metrics
+from .slot_catalog import get_catalog
+
+KEY_PREFIX = 'availability'
+LOOKUPS = 'booking_availability_cache_lookups_total'
+
+entries = ConnectionProxy(caches, 'bulk')
+
+
+def _norm(value):
+    # Quoted so user input cannot put spaces or control characters in a key
+    return quote(str(value or '').strip().lower(), safe='')
+
+
+def _version_key(date, sport):
+    return f'{KEY_PREFIX}:v:{_norm(date)}:{_norm(sport)}'
+
+
+def _entry_key(date, sport, ground, version, catalog_version):
+    # The catalog stamp retires every entry when the bookable slots change
+    return f'{KEY_PREFIX}:{_norm(date)}:{_norm(sport)}:{_norm(ground)}:{version}:{catalog_version}'
+
+
+def _timeout():
+    return getattr(settings, 'AVAILABILITY_CACHE_TIMEOUT', 3600)
+
+
+def get_version(date, sport):
+    key = _version_key(date, sport)
+    version = cache.get(key)
+    if version is None:
+        # Seed with a clock value so an evicted stamp never reuses an old number
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(date, sport):
+    key = _version_key(date, sport)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+    return version
+
+
+async def aget_versions(keys):
+    """{(date, sport): version stamp or None} for every key, in one cache round trip."""
+    found = await cache.aget_many([_version_key(*key) for key in keys])
+    return {key: found.get(_version_key(*key)) for key in keys}
+
+
+def bump_version(date, sport):
+    """Invalidate every cached availability entry for (date, sport)."""
+    key = _version_key(date, sport)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def invalidate_on_commit(date, sport):
+    """Bump the version once the surrounding transaction commits.
+
+    Bumping earlier would let a concurrent request re-cache the old state
+    before the new status is visible.
+    """
+    transaction.on_commit(lambda: bump_version(date, sport))
+
+
+def get_slots(date, sport, ground):
+    """
+    (cached slot list or None on a miss, key). Store a miss with
+    `set_slots(key, ...)` so it lands under the version read here.
+    """
+    key = _entry_key(date, sport, ground, get_version(date, sport), get_catalog().version)
+    slots = entries.get(key)
+    metrics.inc(LOOKUPS, ('hit' if slots is not None else 'miss',))
+    return slots, key
+
+
+def set_slots(key, slots):
+    entries.set(key, slots, _timeout())
+
+
+async def aget_slots(date, sport, ground, catalog):
+    """Async `get_slots`; `catalog` is the slot catalog the caller already holds."""
+    key = _entry_key(date, sport, ground, await aget_version(date, sport), catalog.version)
+    slots = await entries.aget(key)
+    metrics.inc(LOOKUPS, ('hit' if slots is not None else 'miss',))
+    return slots, key
+
+
+async def aset_slots(key, slots):
+    await entries.aset(key, slots, _timeout())
+
+
+def stats():
+    """Return {'hits', 'misses', 'hit_ratio'} accumulated across all workers."""
+    hits = metrics.total(LOOKUPS, ('hit',))
+    misses = metrics.total(LOOKUPS, ('miss',))
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': (hits / total) if total else 0.0,
+    }
+
+
+def reset_stats():
+    metrics.reset(LOOKUPS)
@@ -1,6 +1,7 @@
 from django import forms
 from django.forms import inlineformset_factory, BaseInlineFormSet
 from .models import Booking, Player, StudentUser
+from .slot_catalog import get_catalog
 from django.core.exceptions import ValidationError
 
 
@@ -57,15 +58,9 @@ class BookingForm(forms.ModelForm):
             ('Ground C', 'Ground C'),
         ]
 
-        # Time slot choices
-        self.fields['time_slot'].choices = [
-            ('', 'Select time slot'),
-            ('9:00-11:00', '9:00 AM - 11:00 AM'),
-            ('11:00-13:00', '11:00 AM - 1:00 PM'),
-            ('13:00-15:00', '1:00 PM - 3:00 PM'),
-            ('15:00-17:00', '3:00 PM - 5:00 PM'),
-            ('17:00-19:00', '5:00 PM - 7:00 PM'),
-        ]
+        # Time slot choices come from the slot catalog, like check_availability
+        self.slot_catalog = get_catalog()
+        self.fields['time_slot'].widget.choices = [('', 'Select time slot')] + self.slot_catalog.choices()
 
         # Number of players choices
         self.fields['number_of_players'].choices = [
@@ -74,6 +69,24 @@ class BookingForm(forms.ModelForm):
         self.fields['number_of_players'].initial = 1
 
 
+    def clean_time_slot(self):
+        time_slot = self.cleaned_data['time_slot']
+        if time_slot not in self.slot_catalog:
+            raise ValidationError("Please select one of the available time slots.")
+        return time_slot
+
+    def clean(self):
+        cleaned_data = super().clean()
+        time_slot = cleaned_data.get('time_slot')
+        if time_slot:
+            # Same per-sport/per-ground sets check_availability offers; the sport is
+            # posted next to the form fields (the view copies it onto the booking)
+            offered = self.slot_catalog.slots_for(self.data.get('sport'), cleaned_data.get('ground'))
+            if time_slot not in {slot.label for slot in offered}:
+                self.add_error('time_slot', "This time slot is not offered for the selected sport and ground.")
+        return cleaned_data
+
+
 class PlayerForm(forms.ModelForm):
     class Meta:
         model = Player
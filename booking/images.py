@@ -0,0 +1,91 @@
+"""
+Responsive variants of the static images in settings.RESPONSIVE_IMAGES.
+
+During collectstatic, `booking.storage.StaticFilesStorage` writes each listed
+image as AVIF and WebP at each listed width. A width is capped at the
+image's own width, because upscaling only adds bytes. The variants are then
+hashed like any other static file. `{% responsive_image %}`
+(booking/templatetags/responsive_images.py) turns them into a <picture>
+with srcsets, so the browser fetches the smallest modern format that fills
+the layout. Until collectstatic has run (e.g. with DEBUG on) the tag renders
+the plain <img>.
+
+Only collectstatic needs Pillow; it is imported there.
+"""
+import functools
+import io
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+# Best first: the order of the <source> elements
+FORMATS = {
+    'avif': {'quality': 55},
+    'webp': {'quality': 78, 'method': 6},
+}
+
+
+def variant_name(name, width, fmt):
+    stem, _ = os.path.splitext(name)
+    return f'{stem}-{width}w.{fmt}'
+
+
+def render_variants(file, widths):
+    """Yield (width, format, bytes) for the image in `file` at each of `widths`."""
+    from PIL import Image, ImageOps, features
+
+    with Image.open(file) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+        for width in sorted({min(w, image.width) for w in widths}):
+            if width == image.width:
+                resized = image
+            else:
+                resized = image.resize((width, round(image.height * width / image.width)), Image.Resampling.LANCZOS)
+            for fmt, options in FORMATS.items():
+                if not features.check(fmt):
+                    continue  # a Pillow build without the codec still gets the other format
+                buffer = io.BytesIO()
+                resized.save(buffer, fmt.upper(), **options)
+                yield width, fmt, buffer.getvalue()
+
+
+def write_variants(storage, paths):
+    """
+    Save the variants of the RESPONSIVE_IMAGES found in `paths` (collectstatic's
+    {name: (source storage, path)}) to `storage`. Returns the names written.
+    """
+    written = []
+    for name, widths in getattr(settings, 'RESPONSIVE_IMAGES', {}).items():
+        if name not in paths:
+            continue
+        source_storage, path = paths[name]
+        with source_storage.open(path) as file:
+            for width, fmt, data in render_variants(file, widths):
+                target = variant_name(name, width, fmt)
+                if storage.exists(target):
+                    storage.delete(target)
+                storage.save(target, io.BytesIO(data))
+                written.append(target)
+    return written
+
+
+@functools.cache
+def variants():
+    """{image name: {format: [(width, variant name)], ...}} for the variants in the static manifest."""
+    collected = getattr(staticfiles_storage, 'hashed_files', {})
+    index = {}
+    for name in getattr(settings, 'RESPONSIVE_IMAGES', {}):
+        stem, _ = os.path.splitext(name)
+        pattern = re.compile(rf'{re.escape(stem)}-(\d+)w\.({"|".join(FORMATS)})')
+        found = {}
+        for collected_name in collected:
+            match = pattern.fullmatch(collected_name)
+            if match:
+                found.setdefault(match[2], []).append((int(match[1]), collected_name))
+        if found:
+            index[name] = {fmt: sorted(found[fmt]) for fmt in FORMATS if fmt in found}
+    return index
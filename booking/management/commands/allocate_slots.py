@@ -0,0 +1,35 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking import allocation
+
+
+class Command(BaseCommand):
+    help = ("Apply first-come-first-serve allocation to every Pending booking dated "
+            "--start..--end (default: today) in one pass.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, default=None, help='First date, YYYY-MM-DD')
+        parser.add_argument('--end', type=date.fromisoformat, default=None, help='Last date, YYYY-MM-DD')
+        parser.add_argument('--dry-run', action='store_true', help='Print the plan without writing anything')
+
+    def handle(self, *args, **options):
+        start = options['start'] or date.today()
+        end = options['end'] or start
+        if end < start:
+            raise CommandError('--end must not be before --start')
+
+        plan = allocation.allocate_range(start, end, dry_run=options['dry_run'])
+
+        if options['dry_run'] or options['verbosity'] > 1:
+            for (day, sport, time_slot), winner, losers in plan.slots:
+                outcome = f"approve #{winner.id} ({winner.student_name})" if winner else "already taken"
+                self.stdout.write(f"{day} {sport} {time_slot}: {outcome}, reject {len(losers)}")
+
+        verb = 'would approve' if options['dry_run'] else 'approved'
+        self.stdout.write(
+            f"{len(plan.slots)} slots, {verb} {len(plan.winners)}, "
+            f"{'would reject' if options['dry_run'] else 'rejected'} {len(plan.losers)}"
+        )
+        self.stdout.write(' '.join(f"{step}={seconds * 1000:.1f}ms" for step, seconds in plan.timings.items()))
@@ -0,0 +1,24 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from booking import archive
+
+
+class Command(BaseCommand):
+    help = ("Move bookings dated before the cutoff, with their players and allotments, "
+            "into the archive tables in batches (one transaction per batch).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=date.fromisoformat, default=None,
+                            help='Archive rows dated before this day, YYYY-MM-DD (overrides --older-than-days).')
+        parser.add_argument('--older-than-days', type=int, default=365,
+                            help='Archive rows dated more than this many days ago.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows moved per transaction.')
+
+    def handle(self, *args, **options):
+        cutoff = options['before'] or date.today() - timedelta(days=options['older_than_days'])
+        bookings, players, allotments = archive.archive_before(cutoff, options['batch_size'])
+        self.stdout.write(
+            f"[archive_bookings] before={cutoff} bookings={bookings} players={players} allotments={allotments}"
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from booking import availability_cache
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters for the availability cache (shared across workers)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them.')
+
+    def handle(self, *args, **options):
+        s = availability_cache.stats()
+        self.stdout.write(
+            f"hits={s['hits']} misses={s['misses']} hit_ratio={s['hit_ratio']:.2%}"
+        )
+        if options['reset']:
+            availability_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
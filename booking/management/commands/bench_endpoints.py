@@ -0,0 +1,404 @@
+import asyncio
+import json
+import logging
+import math
+import random
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from booking import reference, slot_catalog, student_search
+from booking.management.commands.bench_student_search import FIRST_NAMES, LAST_NAMES
+from booking.metrics import QueryStats, track_queries
+from booking.models import AllotedGroundBooking, Booking, Player, StudentUser
+from booking.slots import parse_slot_range
+
+ENDPOINTS = [
+    'check_availability',
+    'fetch_student_data',
+    'student_booking',
+    'approve_booking',
+    'custom_admin_dashboard',
+    'student_history',
+    'get_players',
+    'get_equipment_for_booking',
+]
+GROUNDS = ['Ground A', 'Ground B', 'Ground C']
+SPORTS = ['Football', 'Cricket', 'Basketball', 'Volleyball']
+DAYS_BACK, DAYS_AHEAD = 30, 30
+FREQUENT_STUDENTS = 20
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ("Load-test the booking hot paths with concurrent clients against a throwaway "
+            "database (created like the test database and destroyed afterwards). Reports "
+            "p50/p95/p99 latency, throughput and queries per request for each endpoint and "
+            "writes them to a JSON file that --compare can diff against a later run. "
+            "--handler wsgi runs each client in its own thread, like sync workers; "
+            "--handler asgi runs them all as tasks on one event loop, like one ASGI worker.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8, help='Concurrent client threads.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint.')
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--bookings', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--handler', choices=['wsgi', 'asgi'], default='wsgi')
+        parser.add_argument('--db-latency-ms', type=float, default=0.0,
+                            help='Add this network round trip to every query, to model a remote database.')
+        parser.add_argument('--endpoint', action='append', dest='endpoints', choices=ENDPOINTS,
+                            help='Endpoint to include (repeatable); default: all')
+        parser.add_argument('--output', default='bench-results.json', help='Where to write the JSON results.')
+        parser.add_argument('--compare', help='Earlier results file to print changes against.')
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['requests'] < 1:
+            raise CommandError('--clients and --requests must be at least 1')
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read --compare file: {e}")
+
+        overrides = {
+            'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+            'ALLOWED_HOSTS': ['*'],
+            # Keep the shared cache (and anything cached for the real database) out of the run
+            'CACHES': {alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                               'LOCATION': f'booking-bench-{alias}'} for alias in ('default', 'bulk')},
+        }
+        if connection.vendor == 'sqlite':
+            # Client threads need one database file; an in-memory database is per connection
+            test = connection.settings_dict.setdefault('TEST', {})
+            if not test.get('NAME'):
+                test['NAME'] = str(Path(tempfile.gettempdir()) / 'booking_bench.sqlite3')
+            # Concurrent writers wait for the lock instead of failing with "database is locked"
+            connection.settings_dict.setdefault('OPTIONS', {}).update(timeout=30, transaction_mode='IMMEDIATE')
+            # The early booking migrations are PostgreSQL-only; build the tables from the models
+            overrides['MIGRATION_MODULES'] = {**getattr(settings, 'MIGRATION_MODULES', {}), 'booking': None}
+
+        # Lock waits under load trip the slow-query warnings; keep the report readable
+        logging.getLogger('booking.query_budget').setLevel(logging.ERROR)
+
+        old_name = connection.settings_dict['NAME']
+        with override_settings(**overrides):
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                self._reset_process_caches()
+                started = time.perf_counter()
+                fixtures = self.seed(random.Random(options['seed']), options)
+                self.stdout.write(
+                    f"seeded {options['students']} students, {options['bookings']} bookings "
+                    f"in {time.perf_counter() - started:.1f}s ({connection.vendor})"
+                )
+                results = {
+                    name: self.run_endpoint(name, fixtures, options)
+                    for name in options['endpoints'] or ENDPOINTS
+                }
+            finally:
+                self._reset_process_caches()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = {
+            'commit': _git_commit(),
+            'database': connection.vendor,
+            'handler': options['handler'],
+            'db_latency_ms': options['db_latency_ms'],
+            'clients': options['clients'],
+            'requests': options['requests'],
+            'students': options['students'],
+            'bookings': options['bookings'],
+            'endpoints': results,
+        }
+        Path(options['output']).write_text(json.dumps(report, indent=2) + '\n')
+        self.print_report(results, baseline)
+        self.stdout.write(f"results written to {options['output']}")
+
+    def _reset_process_caches(self):
+        # The reference, slot catalog and search caches must not carry ids
+        # between the real database and the benchmark one
+        reference.clear()
+        slot_catalog.invalidate()
+        student_search.invalidate()
+
+    # -------------------- seeding --------------------
+    def seed(self, rng, options):
+        today = date.today()
+        catalog = slot_catalog.get_catalog()
+        labels = [slot.label for slot in catalog]
+
+        students = StudentUser.objects.bulk_create([
+            StudentUser(
+                full_name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                email=f"bench{i}@vit.edu.in", roll_number=f"{20000000 + i}",
+                branch=rng.choice(['CSE', 'IT', 'EXTC']), year=rng.choice(['FE', 'SE', 'TE', 'BE']),
+                division=rng.choice(['A', 'B', 'C']), password='bench',
+            ) for i in range(options['students'])
+        ], batch_size=2000)
+        student_search.invalidate()  # bulk_create skips the save signals
+
+        refs = {}
+        for kind, values in (('ground', GROUNDS), ('sport', SPORTS), ('time_slot', labels)):
+            for value in values:
+                refs[kind, value] = reference.get_id(kind, value, create=True)
+
+        def booking(student, day, sport, label, status, ground=None):
+            ground = ground or rng.choice(GROUNDS)
+            start, end = parse_slot_range(label)
+            return Booking(
+                student_name=student.full_name, student_email=student.email, roll_number=student.roll_number,
+                student_branch=student.branch, student_year=student.year, student_division=student.division,
+                ground=ground, sport=sport, date=day, time_slot=label,
+                ground_ref_id=refs['ground', ground], sport_ref_id=refs['sport', sport],
+                time_slot_ref_id=refs['time_slot', label], start_minute=start, end_minute=end,
+                purpose='Practice', number_of_players=rng.randint(2, 8), status=status,
+            )
+
+        # Most history belongs to a few frequent bookers, like a real campus
+        frequent = students[:FREQUENT_STUDENTS]
+        approved_keys = set()
+        rows = []
+        for _ in range(options['bookings']):
+            student = rng.choice(frequent) if rng.random() < 0.3 else rng.choice(students)
+            day = today + timedelta(days=rng.randint(-DAYS_BACK, DAYS_AHEAD))
+            sport, label = rng.choice(SPORTS), rng.choice(labels)
+            status = 'Pending' if day >= today else 'Rejected'
+            if (day, sport, label) not in approved_keys and rng.random() < 0.3:
+                approved_keys.add((day, sport, label))
+                status = 'Approved'
+            rows.append(booking(student, day, sport, label, status))
+
+        # Approval targets: each on its own slot past the seeded range, with two later competitors
+        targets = []
+        for i in range(options['requests']):
+            day = today + timedelta(days=DAYS_AHEAD + 1 + i // (len(SPORTS) * len(labels)))
+            sport = SPORTS[i % len(SPORTS)]
+            label = labels[(i // len(SPORTS)) % len(labels)]
+            targets.append(booking(rng.choice(frequent), day, sport, label, 'Pending'))
+            rows.extend(booking(rng.choice(frequent), day, sport, label, 'Pending') for _ in range(2))
+
+        Booking.objects.bulk_create(targets, batch_size=1000)
+        Booking.objects.bulk_create(rows, batch_size=1000)
+        Player.objects.bulk_create([
+            Player(booking=b, name=p.full_name, branch=p.branch, year=p.year, division=p.division)
+            for b in rows + targets
+            for p in rng.sample(students, min(3, len(students)))
+        ], batch_size=2000)
+        AllotedGroundBooking.objects.bulk_create([
+            AllotedGroundBooking(
+                booking=b, date=b.date, ground=b.ground, time_slot=b.time_slot,
+                ground_ref_id=b.ground_ref_id, time_slot_ref_id=b.time_slot_ref_id,
+                start_minute=b.start_minute, end_minute=b.end_minute,
+                allotted_to=b.student_name, roll_number=b.roll_number, purpose=b.purpose, players=3,
+            ) for b in rows if b.status == 'Approved'
+        ], batch_size=1000)
+
+        # Players for walk-in bookings must pass the 24-hour rule
+        busy = {b.student_email for b in rows if b.status == 'Approved' and b.date >= today - timedelta(days=1)}
+        return {
+            'today': today,
+            'labels': labels,
+            'frequent': frequent,
+            'free': [s for s in students[FREQUENT_STUDENTS:] if s.email not in busy],
+            'targets': [b.id for b in targets],
+        }
+
+    # -------------------- requests --------------------
+    def build_request(self, name, i, rng, fx):
+        """(method, url, data, expected status) for request `i` of endpoint `name`."""
+        today = fx['today']
+        if name == 'check_availability':
+            day = today + timedelta(days=rng.randint(-DAYS_BACK, DAYS_AHEAD))
+            return 'get', reverse(name), {
+                'date': day.isoformat(), 'sport': rng.choice(SPORTS), 'ground': rng.choice(GROUNDS),
+            }, 200
+        if name == 'fetch_student_data':
+            return 'get', reverse(name), {'q': rng.choice(FIRST_NAMES + LAST_NAMES)[:rng.randint(2, 5)]}, 200
+        if name == 'student_booking':
+            players = rng.randint(1, 6)
+            data = {
+                'student_name': 'Walk-in Organizer', 'student_email': f'walkin{i}@vit.edu.in', 'roll_number': '',
+                'ground': rng.choice(GROUNDS), 'sport': rng.choice(SPORTS),
+                'date': (today + timedelta(days=rng.randint(1, DAYS_AHEAD))).isoformat(),
+                'time_slot': rng.choice(fx['labels']), 'purpose': 'Practice', 'number_of_players': players,
+            }
+            for j in range(1, players + 1):
+                # Mix of registered students and guests
+                data[f'player{j}_name'] = (f'walkin{i}-guest{j}@example.com' if rng.random() < 0.5 or not fx['free']
+                                           else rng.choice(fx['free']).email)
+            return 'post', reverse(name), data, 302
+        if name == 'approve_booking':
+            return 'get', reverse(name, args=[fx['targets'][i]]), {}, 302
+        if name == 'custom_admin_dashboard':
+            return 'get', reverse(name), {'pending_page': rng.randint(1, 3)}, 200
+        if name == 'student_history':
+            return 'get', reverse(name), {}, 200
+        if name in ('get_players', 'get_equipment_for_booking'):
+            return 'get', reverse(name, args=[rng.choice(fx['targets'])]), {}, 200
+        raise CommandError(f"Unknown endpoint {name}")
+
+    def login(self, client, name, worker):
+        session = client.session
+        if name in ('custom_admin_dashboard', 'approve_booking'):
+            session['is_admin_logged_in'] = True
+        elif name == 'student_history':
+            session['student_email'] = self.fixtures['frequent'][worker % FREQUENT_STUDENTS].email
+        session.save()
+        client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    def run_endpoint(self, name, fixtures, options):
+        self.fixtures = fixtures
+        delay = options['db_latency_ms'] / 1000
+
+        def latency(execute, sql, params, many, context):
+            if delay:
+                time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        self.latency = latency
+        client_class = AsyncClient if options['handler'] == 'asgi' else Client
+        clients = []
+        for n in range(options['clients'] + 1):
+            clients.append(client_class())
+            self.login(clients[-1], name, n)
+
+        # One untimed request warms templates and the per-process caches
+        warm = Client()
+        self.login(warm, name, 0)
+        method, url, data, _ = self.build_request(name, 0, random.Random(0), fixtures)
+        if name not in ('approve_booking', 'student_booking'):
+            getattr(warm, method)(url, data)
+
+        run = self.run_async if options['handler'] == 'asgi' else self.run_threads
+        started = time.perf_counter()
+        samples = run(name, clients[1:], options)  # (ms, queries, ok)
+        wall = time.perf_counter() - started
+
+        latencies = sorted(ms for ms, _, _ in samples)
+        queries = [q for _, q, _ in samples]
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for _, _, ok in samples if not ok),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'mean_ms': round(statistics.fmean(latencies), 3),
+            'throughput_rps': round(len(samples) / wall, 1),
+            'queries_mean': round(statistics.fmean(queries), 2),
+            'queries_max': max(queries),
+        }
+
+    def run_threads(self, name, clients, options):
+        jobs = iter(range(options['requests']))
+        lock = threading.Lock()
+        samples = []
+        failures = []
+
+        def worker(n):
+            rng = random.Random(options['seed'] * 1000 + n)
+            try:
+                while True:
+                    with lock:
+                        i = next(jobs, None)
+                    if i is None:
+                        return
+                    method, url, data, expected = self.build_request(name, i, rng, self.fixtures)
+                    stats = QueryStats()
+                    started = time.perf_counter()
+                    with track_queries(stats), track_queries(self.latency):
+                        resp = getattr(clients[n], method)(url, data)
+                    ms = (time.perf_counter() - started) * 1000
+                    with lock:
+                        samples.append((ms, stats.count, resp.status_code == expected))
+            except Exception as e:
+                failures.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(len(clients))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if failures:
+            raise CommandError(f"{name}: {failures[0]!r}") from failures[0]
+        return samples
+
+    def run_async(self, name, clients, options):
+        jobs = iter(range(options['requests']))
+        samples = []
+
+        async def worker(n):
+            rng = random.Random(options['seed'] * 1000 + n)
+            while (i := next(jobs, None)) is not None:
+                method, url, data, expected = self.build_request(name, i, rng, self.fixtures)
+                stats = QueryStats()
+                started = time.perf_counter()
+                # Like the ASGI handler: sync code of one request shares one thread
+                async with ThreadSensitiveContext():
+                    with track_queries(stats), track_queries(self.latency):
+                        resp = await getattr(clients[n], method)(url, data)
+                ms = (time.perf_counter() - started) * 1000
+                samples.append((ms, stats.count, resp.status_code == expected))
+
+        async def main():
+            await asyncio.gather(*(worker(n) for n in range(len(clients))))
+
+        try:
+            asyncio.run(main())
+        except Exception as e:
+            raise CommandError(f"{name}: {e!r}") from e
+        return samples
+
+    # -------------------- output --------------------
+    def print_report(self, results, baseline):
+        previous = (baseline or {}).get('endpoints', {})
+        if baseline:
+            self.stdout.write(f"compared with {baseline.get('commit') or 'baseline'}:")
+        self.stdout.write(
+            f"{'endpoint':<24}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'queries':>9}{'errors':>8}"
+        )
+        for name, r in results.items():
+            line = (f"{name:<24}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+                    f"{r['throughput_rps']:>10.1f}{r['queries_mean']:>9.1f}{r['errors']:>8}")
+            old = previous.get(name)
+            if old:
+                changes = [
+                    f"{label} {(r[key] - old[key]) / old[key]:+.0%}"
+                    for key, label in (('p50_ms', 'p50'), ('p95_ms', 'p95'), ('throughput_rps', 'req/s'))
+                    if old.get(key)
+                ]
+                if r['queries_mean'] != old.get('queries_mean'):
+                    changes.append(f"queries {old.get('queries_mean')} -> {r['queries_mean']}")
+                line += '   ' + ', '.join(changes)
+            self.stdout.write(line)
@@ -0,0 +1,58 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+ENGINES = [
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+    'django.contrib.sessions.backends.cache',
+    'booking.signed_cookie_sessions',
+]
+
+
+class Command(BaseCommand):
+    help = ("Compare per-request latency and database queries of the session engines "
+            "on a logged-in student page. Sessions are written inside a transaction "
+            "that is rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--engine', action='append', dest='engines',
+                            help='Session engine to include (repeatable); default: all')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"database: {connection.vendor}, {options['requests']} requests per engine")
+        for engine in options['engines'] or ENGINES:
+            with transaction.atomic(), override_settings(SESSION_ENGINE=engine, ALLOWED_HOSTS=['*']):
+                self.run_engine(engine, options['requests'])
+                transaction.set_rollback(True)
+
+    def run_engine(self, engine, n):
+        client = Client()
+        session = client.session
+        session['student_email'] = 'bench@vit.edu.in'
+        session.save()
+        client.cookies['sessionid'] = session.session_key
+        url = reverse('student_dashboard')
+        client.get(url)  # warm templates and the session cache
+
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(n):
+                started = time.perf_counter()
+                resp = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+        if resp.status_code != 200:
+            self.stderr.write(f"{engine}: unexpected status {resp.status_code}")
+            return
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(
+            f"{engine}: p50={statistics.median(timings):.2f} ms p95={p95:.2f} ms "
+            f"db queries/request={len(queries) / n:.2f}"
+        )
@@ -0,0 +1,74 @@
+import random
+import statistics
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from booking import student_search
+from booking.models import StudentUser
+
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Vihaan', 'Arjun', 'Sai', 'Reyansh', 'Ayaan', 'Krishna', 'Ishaan',
+               'Ananya', 'Diya', 'Aadhya', 'Saanvi', 'Pari', 'Anika', 'Navya', 'Myra', 'Sara', 'Ira']
+LAST_NAMES = ['Sharma', 'Verma', 'Patil', 'Kulkarni', 'Deshmukh', 'Joshi', 'Mahajan', 'Iyer', 'Nair', 'Reddy',
+              'Gupta', 'Mehta', 'Shah', 'Kapoor', 'Chopra', 'Pawar', 'Jadhav', 'Shinde', 'More', 'Kale']
+
+
+class Command(BaseCommand):
+    help = ("Benchmark fetch_student_data search latency against N synthetic students. "
+            "Data is seeded inside a transaction that is rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=50000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        n = options['students']
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            StudentUser.objects.bulk_create([
+                StudentUser(
+                    full_name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {''.join(rng.choices(string.ascii_lowercase, k=4))}",
+                    email=f"bench{i}@vit.edu.in",
+                    roll_number=f"{20000000 + i}",
+                    branch='CSE', year='TE', division='A',
+                ) for i in range(n)
+            ], batch_size=2000)
+            student_search.invalidate()  # bulk_create skips the save signals
+            self.stdout.write(f"seeded {n} students in {time.perf_counter() - started:.2f}s ({connection.vendor})")
+
+            # Mostly real prefixes plus some typos that match nothing (worst case for a scan)
+            queries = [
+                rng.choice(FIRST_NAMES + LAST_NAMES)[:rng.randint(2, 5)] if rng.random() < 0.8
+                else ''.join(rng.choices(string.ascii_lowercase, k=4)) + 'q'
+                for _ in range(options['queries'])
+            ]
+
+            started = time.perf_counter()
+            student_search.search_students(queries[0])
+            self.stdout.write(f"first search (includes any index build): {(time.perf_counter() - started) * 1000:.1f} ms")
+
+            self.report('search_students', [lambda q=q: student_search.search_students(q) for q in queries])
+            # The previous implementation: icontains scan plus a count() for logging
+            self.report('legacy icontains + count', [
+                lambda q=q: (list(StudentUser.objects.filter(full_name__icontains=q)[:10]),
+                             StudentUser.objects.filter(full_name__icontains=q)[:10].count())
+                for q in queries
+            ])
+
+            transaction.set_rollback(True)
+        student_search.invalidate()
+
+    def report(self, label, calls):
+        timings = []
+        for call in calls:
+            started = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(f"{label}: p50={statistics.median(timings):.2f} ms p95={p95:.2f} ms over {len(timings)} queries")
@@ -0,0 +1,37 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from booking.models import OTPVerification
+
+
+class Command(BaseCommand):
+    help = ("Delete expired OTPs in batches. Each batch is a short delete by primary key "
+            "found through the expires_at index, so the table is never locked for long.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per statement.')
+        parser.add_argument('--grace-minutes', type=int, default=60,
+                            help='Keep codes this long after expiry so users still see "expired" rather than "not found".')
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between batches.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['grace_minutes'])
+        batch_size = options['batch_size']
+        expired = OTPVerification.objects.filter(expires_at__lt=cutoff)
+
+        deleted = batches = 0
+        while True:
+            ids = list(expired.order_by('expires_at').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            deleted += OTPVerification.objects.filter(id__in=ids, expires_at__lt=cutoff).delete()[0]
+            batches += 1
+            if len(ids) < batch_size:
+                break
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(f"[purge_otps] deleted={deleted} batches={batches}")
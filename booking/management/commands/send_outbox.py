@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking.outbox import deliver_due
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails from the EmailOutbox table (runs as a long-lived worker unless --once is given)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the due queue once and exit.')
+        parser.add_argument('--batch-size', type=int, default=50, help='Emails sent per SMTP connection.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when the queue is empty.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        interval = options['interval']
+
+        while True:
+            sent, failed = deliver_due(batch_size)
+            if sent or failed:
+                self.stdout.write(f"[send_outbox] sent={sent} failed={len(failed)}")
+                for row in failed:
+                    self.stderr.write(f"[send_outbox] failed to={row.recipients} attempt={row.attempts}: {row.last_error}")
+                # More rows may be due already; go straight to the next batch
+                continue
+            if options['once']:
+                break
+            time.sleep(interval)
@@ -0,0 +1,299 @@
+"""
+Application metrics in the Prometheus text format.
+
+Request latency per URL name, database queries and time per request, SMTP
+send durations and failures, and approve/reject decisions are recorded in
+per-process counters, so recording costs no I/O. At most every
+METRICS_FLUSH_INTERVAL seconds a process adds its deltas to `MetricCounter`
+rows with `F()` increments. The increments are atomic and the rows are
+never evicted, so `/metrics` renders exact totals over every gunicorn
+worker and the outbox worker, which share only the database. Seconds are
+stored as integer microseconds.
+
+A request only flushes outside a transaction, so it never holds the
+counters' row locks while other work runs. A flush locks its rows in key
+order, so two workers flushing at once cannot deadlock. A scrape first
+flushes its own process.
+
+Every series is known up front: the `view` label takes the URL names from
+`booking/urls.py` (anything else is "other"), and a series with no row yet
+renders as 0.
+
+Queries are counted through `track_queries`, which follows the request's
+context rather than a thread: under ASGI an async view's ORM calls run on
+another thread (with its own connection) than the middleware.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import Case, F, Value, When
+from django.dispatch import receiver
+
+from .models import MetricCounter
+
+logger = logging.getLogger('booking.metrics')
+
+KEY_PREFIX = 'metrics'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SMTP_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+MICROSECONDS = 1_000_000
+
+
+def view_names():
+    from .urls import urlpatterns
+
+    return sorted({p.name for p in urlpatterns if p.name}) + ['other']
+
+
+class Metric:
+    def __init__(self, name, kind, help, labels=(), values=None, buckets=None, scale=1):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.labels = labels
+        self._values = values
+        self.buckets = buckets
+        self.scale = scale
+
+    def label_sets(self):
+        """Every label-value tuple this metric can have."""
+        if not self.labels:
+            return [()]
+        return [(value,) for value in self._values()]
+
+    def key(self, label_values, part):
+        return f"{KEY_PREFIX}:{self.name}:{'|'.join(label_values)}:{part}"
+
+
+METRICS = {m.name: m for m in [
+    Metric('booking_http_request_duration_seconds', 'histogram',
+           'Request latency by URL name.', ('view',), view_names, LATENCY_BUCKETS, MICROSECONDS),
+    Metric('booking_db_queries_total', 'counter',
+           'Database queries run while serving requests, by URL name.', ('view',), view_names),
+    Metric('booking_db_query_duration_seconds_total', 'counter',
+           'Time spent in database queries while serving requests, by URL name.', ('view',), view_names,
+           scale=MICROSECONDS),
+    Metric('booking_smtp_send_duration_seconds', 'histogram',
+           'Time to hand one outbox email to the SMTP server.', buckets=SMTP_BUCKETS, scale=MICROSECONDS),
+    Metric('booking_smtp_failures_total', 'counter', 'Outbox emails that failed to send.'),
+    Metric('booking_decisions_total', 'counter',
+           'Bookings approved or rejected.', ('decision',), lambda: ['approved', 'rejected']),
+    Metric('booking_availability_cache_lookups_total', 'counter',
+           'check_availability cache lookups, by result.', ('result',), lambda: ['hit', 'miss']),
+]}
+
+_pending = {}
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def _add(key, amount):
+    with _lock:
+        _pending[key] = _pending.get(key, 0) + amount
+
+
+def inc(name, labels=(), amount=1):
+    metric = METRICS[name]
+    if amount:
+        _add(metric.key(labels, 'v'), round(amount * metric.scale))
+
+
+def observe(name, value, labels=()):
+    metric = METRICS[name]
+    bucket = next((i for i, le in enumerate(metric.buckets) if value <= le), len(metric.buckets))
+    _add(metric.key(labels, f'b{bucket}'), 1)
+    _add(metric.key(labels, 'count'), 1)
+    _add(metric.key(labels, 'sum'), round(value * metric.scale))
+
+
+def inc_on_commit(name, labels=(), amount=1):
+    """Count once the surrounding transaction commits, so rolled back work is not counted."""
+    if amount:
+        transaction.on_commit(lambda: inc(name, labels, amount))
+
+
+def flush():
+    """Add this process's pending deltas to the shared counters."""
+    global _last_flush
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not pending:
+        return
+    keys = sorted(pending)
+    try:
+        MetricCounter.objects.bulk_create([MetricCounter(key=key) for key in keys], ignore_conflicts=True)
+        with transaction.atomic():
+            list(MetricCounter.objects.select_for_update().filter(key__in=keys).order_by('key').values_list('key'))
+            MetricCounter.objects.filter(key__in=keys).update(
+                value=F('value') + Case(*(When(key=key, then=Value(pending[key])) for key in keys), default=Value(0))
+            )
+    except DatabaseError:
+        # Keep the counts for the next flush rather than failing the request
+        logger.warning("Could not flush %d metric counters", len(keys), exc_info=True)
+        for key in keys:
+            _add(key, pending[key])
+
+
+def flush_due():
+    return time.monotonic() - _last_flush >= getattr(settings, 'METRICS_FLUSH_INTERVAL', 10.0)
+
+
+def maybe_flush():
+    # Inside a transaction the counter rows would stay locked until it ends; a later request flushes
+    if flush_due() and not connection.in_atomic_block:
+        flush()
+
+
+def total(name, labels=()):
+    """A counter's shared total, including this process's pending count."""
+    flush()
+    metric = METRICS[name]
+    value = MetricCounter.objects.filter(key=metric.key(labels, 'v')).values_list('value', flat=True).first() or 0
+    return value if metric.scale == 1 else value / metric.scale
+
+
+def reset(name):
+    """Zero every series of `name` (Prometheus treats the drop as a counter reset)."""
+    flush()
+    MetricCounter.objects.filter(key__startswith=f'{KEY_PREFIX}:{name}:').delete()
+
+
+def _format(value, scale):
+    return str(value) if scale == 1 else repr(value / scale)
+
+
+def _labels(metric, label_values, extra=None):
+    pairs = [f'{name}="{value}"' for name, value in zip(metric.labels, label_values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def render():
+    """The shared totals in Prometheus text exposition format (version 0.0.4)."""
+    flush()
+    values = dict(MetricCounter.objects.values_list('key', 'value'))
+
+    lines = []
+    for metric in METRICS.values():
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for label_values in metric.label_sets():
+            if metric.kind == 'counter':
+                value = values.get(metric.key(label_values, 'v'), 0)
+                lines.append(f'{metric.name}{_labels(metric, label_values)} {_format(value, metric.scale)}')
+                continue
+            cumulative = 0
+            for i, le in enumerate((*metric.buckets, '+Inf')):
+                cumulative += values.get(metric.key(label_values, f'b{i}'), 0)
+                bucket = _labels(metric, label_values, f'le="{le}"')
+                lines.append(f'{metric.name}_bucket{bucket} {cumulative}')
+            lines.append(f'{metric.name}_sum{_labels(metric, label_values)} '
+                         f'{_format(values.get(metric.key(label_values, "sum"), 0), metric.scale)}')
+            lines.append(f'{metric.name}_count{_labels(metric, label_values)} '
+                         f'{values.get(metric.key(label_values, "count"), 0)}')
+    return '\n'.join(lines) + '\n'
+
+
+class QueryStats:
+    """`connection.execute_wrapper` that counts and times the queries it sees."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+_tracked = ContextVar('booking_tracked_queries', default=())
+
+
+def _dispatch(execute, sql, params, many, context):
+    # Installed on every connection; runs the wrappers of the current context, outermost first
+    for wrapper in reversed(_tracked.get()):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def _install_dispatch(sender, connection, **kwargs):
+    if _dispatch not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_dispatch)
+
+
+@contextmanager
+def track_queries(wrapper):
+    """
+    Like `connection.execute_wrapper(wrapper)`, but for every query run in
+    this context, including ORM calls an async view makes through
+    `sync_to_async` on other threads and connections.
+    """
+    _install_dispatch(None, connection)  # connections opened before this module was imported
+    token = _tracked.set(_tracked.get() + (wrapper,))
+    try:
+        yield wrapper
+    finally:
+        _tracked.reset(token)
+
+
+def untrack_queries():
+    """Stop counting this context's queries for the wrappers it inherited (e.g. in a task spawned by a request)."""
+    _tracked.set(())
+
+
+class MetricsMiddleware:
+    """Records latency and database use for every request that reaches Django."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.views = set(view_names())
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        queries = QueryStats()
+        started = time.perf_counter()
+        with track_queries(queries):
+            response = self.get_response(request)
+        self.record(request, time.perf_counter() - started, queries)
+        maybe_flush()
+        return response
+
+    async def __acall__(self, request):
+        queries = QueryStats()
+        started = time.perf_counter()
+        with track_queries(queries):
+            response = await self.get_response(request)
+        self.record(request, time.perf_counter() - started, queries)
+        if flush_due():
+            await sync_to_async(maybe_flush)()
+        return response
+
+    def record(self, request, elapsed, queries):
+        match = request.resolver_match
+        view = match.url_name if match is not None and match.url_name in self.views else 'other'
+        observe('booking_http_request_duration_seconds', elapsed, (view,))
+        inc('booking_db_queries_total', (view,), queries.count)
+        inc('booking_db_query_duration_seconds_total', (view,), queries.duration)
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:59
+
+from django.db import migrations, models
+
+from booking.slots import parse_slot_range
+
+
+def backfill_slot_minutes(apps, schema_editor):
+    """Populate start_minute/end_minute from the existing time_slot strings."""
+    for model_name in ('Booking', 'AllotedGroundBooking'):
+        model = apps.get_model('booking', model_name)
+        # Parse each distinct slot string once and update all its rows together
+        slots = (model.objects.filter(start_minute__isnull=True)
+                 .values_list('time_slot', flat=True).distinct())
+        for time_slot in list(slots):
+            start, end = parse_slot_range(time_slot)
+            if start is None:
+                continue
+            model.objects.filter(time_slot=time_slot).update(start_minute=start, end_minute=end)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0012_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='allotedgroundbooking',
+            name='end_minute',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='allotedgroundbooking',
+            name='start_minute',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='end_minute',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='start_minute',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['date', 'status', 'start_minute', 'end_minute'], name='idx_date_status_minutes'),
+        ),
+        migrations.RunPython(backfill_slot_minutes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Trigram indexes for the student typeahead (PostgreSQL only)
+
+from django.db import migrations
+
+# Django compiles icontains to UPPER(col) LIKE UPPER(%s), so index the same expression
+TRGM_INDEXES = {
+    'idx_student_name_trgm': 'full_name',
+    'idx_student_email_trgm': 'email',
+    'idx_student_roll_trgm': 'roll_number',
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    for name, column in TRGM_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON booking_studentuser '
+            f'USING gin (UPPER("{column}"::text) gin_trgm_ops);'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in TRGM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name};")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0013_slot_minutes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
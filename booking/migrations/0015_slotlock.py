@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:07
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0014_studentuser_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotLock',
+            fields=[
+                ('key', models.CharField(max_length=200, primary_key=True, serialize=False)),
+                ('acquired_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
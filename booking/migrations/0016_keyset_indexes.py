@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0015_slotlock'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='allotedgroundbooking',
+            index=models.Index(fields=['date', 'id'], name='idx_allot_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['student_email', 'date', 'created_at', 'id'], name='idx_history_keyset'),
+        ),
+    ]
@@ -0,0 +1,119 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:12
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.db import migrations, models
+
+from booking.slots import parse_slot_range
+
+REFERENCES = {
+    # column: (reference model, reference field)
+    'ground': ('Ground', 'name'),
+    'sport': ('Sport', 'name'),
+    'time_slot': ('TimeSlot', 'label'),
+}
+
+
+def backfill_references(apps, schema_editor):
+    """Create a reference row per distinct value and point the *_ref columns at it."""
+    for model_name, columns in (('Booking', ('ground', 'sport', 'time_slot')),
+                                ('AllotedGroundBooking', ('ground', 'time_slot'))):
+        model = apps.get_model('booking', model_name)
+        for column in columns:
+            ref_model_name, field = REFERENCES[column]
+            ref_model = apps.get_model('booking', ref_model_name)
+            values = model.objects.exclude(**{f'{column}__isnull': True}).exclude(**{column: ''})
+            for value in list(values.values_list(column, flat=True).distinct()):
+                # Names match case-insensitively, slot labels exactly
+                lookup = field if column == 'time_slot' else f'{field}__iexact'
+                ref = ref_model.objects.filter(**{lookup: value}).first()
+                if ref is None:
+                    extra = {}
+                    if column == 'time_slot':
+                        extra['start_minute'], extra['end_minute'] = parse_slot_range(value)
+                    ref = ref_model.objects.create(**{field: value}, **extra)
+                model.objects.filter(**{column: value}).update(**{f'{column}_ref': ref})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0016_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ground',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Sport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TimeSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=50, unique=True)),
+                ('start_minute', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('end_minute', models.PositiveSmallIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['start_minute', 'label'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='idx_sport_date_slot_status',
+        ),
+        migrations.AddConstraint(
+            model_name='ground',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), name='uniq_ground_name_ci'),
+        ),
+        migrations.AddField(
+            model_name='allotedgroundbooking',
+            name='ground_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='booking.ground'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='ground_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='booking.ground'),
+        ),
+        migrations.AddConstraint(
+            model_name='sport',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), name='uniq_sport_name_ci'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='sport_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='booking.sport'),
+        ),
+        migrations.AddField(
+            model_name='allotedgroundbooking',
+            name='time_slot_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='booking.timeslot'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='time_slot_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='booking.timeslot'),
+        ),
+        migrations.RunPython(backfill_references, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['date', 'sport_ref', 'time_slot_ref', 'status'], name='idx_date_sport_slot_ref'),
+        ),
+    ]
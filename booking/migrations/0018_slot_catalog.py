@@ -0,0 +1,51 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:15
+
+from django.db import migrations, models
+
+# The slots the availability endpoint offered so far, frozen here so later
+# edits to booking.slots do not change what this migration seeds
+SEEDED_SLOTS = [
+    ('07:00 AM - 09:00 AM', 420, 540),
+    ('04:00 PM - 06:00 PM', 960, 1080),
+]
+
+
+def seed_catalog(apps, schema_editor):
+    """Mark the slots the availability endpoint offered so far as bookable."""
+    TimeSlot = apps.get_model('booking', 'TimeSlot')
+    for position, (label, start, end) in enumerate(SEEDED_SLOTS):
+        TimeSlot.objects.update_or_create(
+            label=label,
+            defaults={'bookable': True, 'position': position, 'start_minute': start, 'end_minute': end},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0017_reference_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeslot',
+            name='bookable',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='timeslot',
+            name='grounds',
+            field=models.ManyToManyField(blank=True, related_name='time_slots', to='booking.ground'),
+        ),
+        migrations.AddField(
+            model_name='timeslot',
+            name='position',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='timeslot',
+            name='sports',
+            field=models.ManyToManyField(blank=True, related_name='time_slots', to='booking.sport'),
+        ),
+        migrations.RunPython(seed_catalog, migrations.RunPython.noop),
+    ]
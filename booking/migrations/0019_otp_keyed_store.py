@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:17
+
+from django.db import migrations, models
+
+
+def keep_latest_pending(apps, schema_editor):
+    """Drop used OTPs and keep only the newest pending one per email."""
+    OTPVerification = apps.get_model('booking', 'OTPVerification')
+    OTPVerification.objects.filter(is_verified=True).delete()
+    seen = set()
+    stale = []
+    for pk, email in OTPVerification.objects.order_by('email', '-created_at', '-id').values_list('id', 'email'):
+        if email in seen:
+            stale.append(pk)
+        seen.add(email)
+    for i in range(0, len(stale), 500):
+        OTPVerification.objects.filter(id__in=stale[i:i + 500]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0018_slot_catalog'),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_latest_pending, migrations.RunPython.noop),
+        migrations.AlterModelOptions(
+            name='otpverification',
+            options={},
+        ),
+        migrations.RemoveField(
+            model_name='otpverification',
+            name='is_verified',
+        ),
+        migrations.AlterField(
+            model_name='otpverification',
+            name='email',
+            field=models.EmailField(max_length=254, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='otpverification',
+            index=models.Index(fields=['expires_at'], name='idx_otp_expires_at'),
+        ),
+    ]
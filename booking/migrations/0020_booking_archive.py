@@ -0,0 +1,110 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+PARTITIONED = ('ArchivedBooking', 'ArchivedAllotment')
+
+
+def create_partitioned_tables(apps, schema_editor):
+    """
+    On PostgreSQL create the archive tables range partitioned by `date`
+    (partitions are added per year by booking/archive.py). A partitioned
+    table's primary key must contain the partition column, so it is
+    (id, date); Django still treats `id` as the key, which stays unique.
+    Other databases get plain tables.
+    """
+    for name in PARTITIONED:
+        model = apps.get_model('booking', name)
+        if schema_editor.connection.vendor != 'postgresql':
+            schema_editor.create_model(model)
+            continue
+        sql, params = schema_editor.table_sql(model)
+        sql = sql.replace(' PRIMARY KEY', '', 1)
+        assert sql.endswith(')')
+        sql = sql[:-1] + ', PRIMARY KEY ("id", "date")) PARTITION BY RANGE ("date")'
+        schema_editor.execute(sql, params or None)
+        schema_editor.deferred_sql.extend(schema_editor._model_indexes_sql(model))
+
+
+def drop_partitioned_tables(apps, schema_editor):
+    for name in PARTITIONED:
+        # Dropping a partitioned table drops its partitions too
+        schema_editor.delete_model(apps.get_model('booking', name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0019_otp_keyed_store'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ArchivedAllotment',
+                    fields=[
+                        ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                        ('booking_id', models.BigIntegerField(blank=True, db_index=True, null=True)),
+                        ('date', models.DateField()),
+                        ('ground', models.CharField(max_length=100)),
+                        ('time_slot', models.CharField(max_length=50)),
+                        ('start_minute', models.PositiveSmallIntegerField(blank=True, null=True)),
+                        ('end_minute', models.PositiveSmallIntegerField(blank=True, null=True)),
+                        ('allotted_to', models.CharField(max_length=100)),
+                        ('roll_number', models.CharField(max_length=20)),
+                        ('purpose', models.TextField(blank=True, null=True)),
+                        ('players', models.PositiveIntegerField(default=0)),
+                        ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('ground_ref', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='booking.ground')),
+                        ('time_slot_ref', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='booking.timeslot')),
+                    ],
+                ),
+                migrations.CreateModel(
+                    name='ArchivedBooking',
+                    fields=[
+                        ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                        ('student_name', models.CharField(max_length=100)),
+                        ('student_email', models.EmailField(max_length=254)),
+                        ('student_branch', models.CharField(blank=True, max_length=50, null=True)),
+                        ('student_year', models.CharField(blank=True, max_length=20, null=True)),
+                        ('student_division', models.CharField(blank=True, max_length=10, null=True)),
+                        ('roll_number', models.CharField(blank=True, max_length=20, null=True)),
+                        ('ground', models.CharField(max_length=100)),
+                        ('sport', models.CharField(blank=True, max_length=50, null=True)),
+                        ('date', models.DateField()),
+                        ('time_slot', models.CharField(max_length=50)),
+                        ('start_minute', models.PositiveSmallIntegerField(blank=True, null=True)),
+                        ('end_minute', models.PositiveSmallIntegerField(blank=True, null=True)),
+                        ('purpose', models.TextField()),
+                        ('equipment', models.TextField(blank=True, null=True)),
+                        ('number_of_players', models.PositiveIntegerField(default=1)),
+                        ('status', models.CharField(choices=[('Pending', 'Pending'), ('Approved', 'Approved'), ('Rejected', 'Rejected')], max_length=20)),
+                        ('created_at', models.DateTimeField()),
+                        ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('ground_ref', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='booking.ground')),
+                        ('sport_ref', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='booking.sport')),
+                        ('time_slot_ref', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='booking.timeslot')),
+                    ],
+                    options={
+                        'indexes': [models.Index(fields=['student_email', 'date', 'created_at', 'id'], name='idx_archive_history_keyset')],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_partitioned_tables, drop_partitioned_tables),
+        migrations.CreateModel(
+            name='ArchivedPlayer',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('branch', models.CharField(choices=[('CSE', 'Computer Science & Engineering'), ('IT', 'Information Technology'), ('EXCS', 'Electronics & Computer Science'), ('EXTC', 'Electronics & Telecommunication'), ('BIOM', 'Biomedical Engineering')], max_length=50)),
+                ('year', models.CharField(choices=[('FE', 'First Year'), ('SE', 'Second Year'), ('TE', 'Third Year'), ('BE', 'Final Year')], max_length=10)),
+                ('division', models.CharField(choices=[('A', 'Division A'), ('B', 'Division B'), ('C', 'Division C')], max_length=10)),
+                ('booking', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='players', to='booking.archivedbooking')),
+            ],
+        ),
+    ]
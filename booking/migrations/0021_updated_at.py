@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0020_booking_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='allotedgroundbooking',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='allotedgroundbooking',
+            index=models.Index(fields=['updated_at', 'id'], name='idx_allot_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['updated_at', 'id'], name='idx_booking_updated'),
+        ),
+    ]
@@ -1,10 +1,84 @@
 from django.db import models
 from django.db.models import Q
+from django.db.models.functions import Lower
 from django.contrib.auth.hashers import make_password, check_password
 from django.utils import timezone
 from datetime import timedelta
 import random
 
+from .slots import parse_slot_range
+
+
+def _save_with_slot_minutes(instance, kwargs):
+    """Keep start_minute/end_minute in sync with time_slot before saving."""
+    instance.start_minute, instance.end_minute = parse_slot_range(instance.time_slot)
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'time_slot' in update_fields:
+        kwargs['update_fields'] = set(update_fields) | {'start_minute', 'end_minute'}
+
+
+def _save_with_refs(instance, kwargs, names):
+    """Point the *_ref foreign keys at the reference rows for the text columns in `names`."""
+    from . import reference
+
+    for name in names:
+        setattr(instance, f'{name}_ref_id', reference.get_id(name, getattr(instance, name), create=True))
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None:
+        changed = {f'{name}_ref' for name in names if name in update_fields}
+        if changed:
+            kwargs['update_fields'] = set(update_fields) | changed
+
+
+class Ground(models.Model):
+    """Reference row for a ground name; bookings point at it by integer id."""
+    name = models.CharField(max_length=100)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(Lower('name'), name='uniq_ground_name_ci'),
+        ]
+
+
+class Sport(models.Model):
+    name = models.CharField(max_length=50)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(Lower('name'), name='uniq_sport_name_ci'),
+        ]
+
+
+class TimeSlot(models.Model):
+    label = models.CharField(max_length=50, unique=True)
+    start_minute = models.PositiveSmallIntegerField(blank=True, null=True)
+    end_minute = models.PositiveSmallIntegerField(blank=True, null=True)
+    # Slot catalog configuration (booking/slot_catalog.py): bookable slots are
+    # offered by the booking form and the availability endpoints, in position
+    # order. Empty sports/grounds means the slot is offered for all of them.
+    bookable = models.BooleanField(default=False)
+    position = models.PositiveSmallIntegerField(default=0)
+    sports = models.ManyToManyField(Sport, blank=True, related_name='time_slots')
+    grounds = models.ManyToManyField(Ground, blank=True, related_name='time_slots')
+
+    def __str__(self):
+        return self.label
+
+    def save(self, *args, **kwargs):
+        self.start_minute, self.end_minute = parse_slot_range(self.label)
+        super().save(*args, **kwargs)
+
+    class Meta:
+        ordering = ['start_minute', 'label']
+
 
 class Booking(models.Model):
     STATUS_CHOICES = [
@@ -25,6 +99,14 @@ class Booking(models.Model):
     sport = models.CharField(max_length=50, blank=True, null=True)
     date = models.DateField()
     time_slot = models.CharField(max_length=50)
+    # Integer references kept in sync with the text columns above on save;
+    # lookups filter on these, the text stays for display
+    ground_ref = models.ForeignKey(Ground, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    sport_ref = models.ForeignKey(Sport, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    time_slot_ref = models.ForeignKey(TimeSlot, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    # Minutes since midnight parsed from time_slot on save, used for overlap queries
+    start_minute = models.PositiveSmallIntegerField(blank=True, null=True)
+    end_minute = models.PositiveSmallIntegerField(blank=True, null=True)
     purpose = models.TextField()
     equipment = models.TextField(blank=True, null=True)  
     number_of_players = models.PositiveIntegerField(default=1)
@@ -34,15 +116,28 @@ class Booking(models.Model):
         default='Pending'
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set on every write (bulk UPDATEs set it explicitly); read by the admin change feed
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.student_name} - {self.ground} - {self.date}"
 
+    def save(self, *args, **kwargs):
+        _save_with_slot_minutes(self, kwargs)
+        _save_with_refs(self, kwargs, ('ground', 'sport', 'time_slot'))
+        super().save(*args, **kwargs)
+
     class Meta:
         indexes = [
-            # Index to speed up FCFS/auto-reject lookups by sport/date/slot/status
-            models.Index(fields=["date", "sport", "time_slot", "status"], name="idx_sport_date_slot_status"),
+            # Index to speed up FCFS/auto-reject lookups by sport/date/slot/status (integer keys)
+            models.Index(fields=["date", "sport_ref", "time_slot_ref", "status"], name="idx_date_sport_slot_ref"),
             models.Index(fields=["created_at"], name="idx_created_at"),
+            # Range overlap lookups for availability (start_minute < end AND end_minute > start)
+            models.Index(fields=["date", "status", "start_minute", "end_minute"], name="idx_date_status_minutes"),
+            # Keyset pagination of student_history: (-date, -created_at, -id) per student
+            models.Index(fields=["student_email", "date", "created_at", "id"], name="idx_history_keyset"),
+            # Admin change feed: rows written since a cursor
+            models.Index(fields=["updated_at", "id"], name="idx_booking_updated"),
         ]
         constraints = [
             # Ensure only one Approved booking exists for a given (date, sport, time_slot)
@@ -122,21 +217,124 @@ class AllotedGroundBooking(models.Model):
     date = models.DateField()
     ground = models.CharField(max_length=100)  
     time_slot = models.CharField(max_length=50)  
+    ground_ref = models.ForeignKey(Ground, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    time_slot_ref = models.ForeignKey(TimeSlot, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    start_minute = models.PositiveSmallIntegerField(blank=True, null=True)
+    end_minute = models.PositiveSmallIntegerField(blank=True, null=True)
     allotted_to = models.CharField(max_length=100)  
     roll_number = models.CharField(max_length=20)
     purpose = models.TextField(blank=True, null=True)
     players = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.date} | {self.ground} | {self.time_slot}"
+
+    def save(self, *args, **kwargs):
+        _save_with_slot_minutes(self, kwargs)
+        _save_with_refs(self, kwargs, ('ground', 'time_slot'))
+        super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the admin allotments list: (-date, -id)
+            models.Index(fields=["date", "id"], name="idx_allot_keyset"),
+            # Admin change feed: rows written since a cursor
+            models.Index(fields=["updated_at", "id"], name="idx_allot_updated"),
+        ]
+
+
+class ArchivedBooking(models.Model):
+    """
+    A Booking moved out of the live table by `manage.py archive_bookings`
+    (booking/archive.py). Keeps the original id, so archived players and
+    allotments still point at it. On PostgreSQL the table is range
+    partitioned by `date`, one partition per year, and its real primary key
+    is (id, date).
+    """
+    id = models.BigIntegerField(primary_key=True)
+    student_name = models.CharField(max_length=100)
+    student_email = models.EmailField()
+    student_branch = models.CharField(max_length=50, blank=True, null=True)
+    student_year = models.CharField(max_length=20, blank=True, null=True)
+    student_division = models.CharField(max_length=10, blank=True, null=True)
+    roll_number = models.CharField(max_length=20, blank=True, null=True)
+    ground = models.CharField(max_length=100)
+    sport = models.CharField(max_length=50, blank=True, null=True)
+    date = models.DateField()
+    time_slot = models.CharField(max_length=50)
+    ground_ref = models.ForeignKey(Ground, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    sport_ref = models.ForeignKey(Sport, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    time_slot_ref = models.ForeignKey(TimeSlot, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    start_minute = models.PositiveSmallIntegerField(blank=True, null=True)
+    end_minute = models.PositiveSmallIntegerField(blank=True, null=True)
+    purpose = models.TextField()
+    equipment = models.TextField(blank=True, null=True)
+    number_of_players = models.PositiveIntegerField(default=1)
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.student_name} - {self.ground} - {self.date}"
+
+    class Meta:
+        indexes = [
+            # Same keyset as idx_history_keyset, for history pages that reach the archive
+            models.Index(fields=["student_email", "date", "created_at", "id"], name="idx_archive_history_keyset"),
+        ]
+
+
+class ArchivedPlayer(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    # No database constraint: a foreign key into a partitioned table would
+    # have to include the partition column
+    booking = models.ForeignKey(
+        ArchivedBooking,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="players"
+    )
+    name = models.CharField(max_length=100)
+    branch = models.CharField(max_length=50, choices=Player.BRANCH_CHOICES)
+    year = models.CharField(max_length=10, choices=Player.YEAR_CHOICES)
+    division = models.CharField(max_length=10, choices=Player.DIVISION_CHOICES)
+
+    def __str__(self):
+        return f"{self.name} ({self.branch} - {self.year}{self.division})"
+
+
+class ArchivedAllotment(models.Model):
+    """An AllotedGroundBooking moved to the archive; partitioned by `date` like ArchivedBooking."""
+    id = models.BigIntegerField(primary_key=True)
+    booking_id = models.BigIntegerField(blank=True, null=True, db_index=True)
+    date = models.DateField()
+    ground = models.CharField(max_length=100)
+    time_slot = models.CharField(max_length=50)
+    ground_ref = models.ForeignKey(Ground, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    time_slot_ref = models.ForeignKey(TimeSlot, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    start_minute = models.PositiveSmallIntegerField(blank=True, null=True)
+    end_minute = models.PositiveSmallIntegerField(blank=True, null=True)
+    allotted_to = models.CharField(max_length=100)
+    roll_number = models.CharField(max_length=20)
+    purpose = models.TextField(blank=True, null=True)
+    players = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
         return f"{self.date} | {self.ground} | {self.time_slot}"
 
 
 class OTPVerification(models.Model):
-    email = models.EmailField()
+    """
+    The pending OTP for an email address: at most one row per email, looked
+    up by the unique key and deleted once used. Expired rows are removed by
+    `manage.py purge_otps`.
+    """
+    email = models.EmailField(unique=True)
     otp = models.CharField(max_length=6)
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()
-    is_verified = models.BooleanField(default=False)
     
     # Temporary storage of signup data
     full_name = models.CharField(max_length=100)
@@ -157,5 +355,68 @@ class OTPVerification(models.Model):
         return str(random.randint(100000, 999999))
     
     class Meta:
-        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['expires_at'], name='idx_otp_expires_at'),
+        ]
+
+
+
+class EmailOutbox(models.Model):
+    """Outgoing email persisted by the views and delivered by `manage.py send_outbox`."""
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Sent', 'Sent'),
+        ('Failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True, default='')
+    from_email = models.CharField(max_length=254, blank=True, default='')
+    # Comma separated list of recipient addresses
+    recipients = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.recipients} - {self.subject} ({self.status})"
 
+    def recipient_list(self):
+        return [r.strip() for r in self.recipients.split(',') if r.strip()]
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            # The worker polls for due Pending rows
+            models.Index(fields=["status", "next_attempt_at"], name="idx_outbox_status_due"),
+        ]
+
+
+class SlotLock(models.Model):
+    """
+    One row per (date, sport, time_slot) key, written to serialize approvals
+    of that slot on databases without advisory locks (see booking/slot_locks.py).
+    """
+    key = models.CharField(max_length=200, primary_key=True)
+    acquired_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.key
+
+
+class MetricCounter(models.Model):
+    """
+    One row per metric series part (see booking/metrics.py). Every process
+    adds its deltas with an `F()` increment, so totals from all workers
+    and the outbox worker add up exactly.
+    """
+    key = models.CharField(max_length=200, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
@@ -0,0 +1,50 @@
+"""
+Booking status notification emails, written to the outbox (see outbox.py).
+"""
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.html import strip_tags
+
+from .outbox import enqueue_email, enqueue_many
+
+
+def render_booking_status_email(booking, status):
+    """Return (subject, plain, html) for the booking status email.
+
+    Reads players through `booking.players.all()` so a prefetch is reused.
+    """
+    players = [
+        {'name': p.name, 'branch': p.branch, 'year': p.year, 'division': p.division}
+        for p in booking.players.all()
+    ]
+    html = render_to_string(
+        'booking/emails/booking_status_email.html',
+        {
+            'site_name': 'SportDeck',
+            'status': status,
+            'booking': booking,
+            'players': players,
+        }
+    )
+    return f'Booking {status} — {booking.ground} on {booking.date}', strip_tags(html), html
+
+
+def queue_booking_status_email(booking, status):
+    """Render the booking status email and add it to the outbox."""
+    subject, plain, html = render_booking_status_email(booking, status)
+    return enqueue_email(subject, plain, [booking.student_email], html_body=html)
+
+
+def queue_booking_status_emails(bookings, status):
+    """
+    Bulk variant for many bookings (e.g. FCFS auto-rejects): players for all
+    bookings are fetched in one query and the outbox rows are written in one
+    INSERT. The worker then sends them over a single mail connection.
+    """
+    bookings = list(bookings)
+    prefetch_related_objects(bookings, 'players')
+    emails = []
+    for b in bookings:
+        subject, plain, html = render_booking_status_email(b, status)
+        emails.append((subject, plain, [b.student_email], html))
+    return enqueue_many(emails)
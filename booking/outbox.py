@@ -0,0 +1,160 @@
+"""
+Durable email outbox.
+
+Views call `enqueue_email` inside the same transaction as the state change
+they are notifying about, so a booking is never approved without its email
+being recorded (and no email is recorded for a rolled back change). The
+`send_outbox` management command drains the table over a single SMTP
+connection per batch, retrying failures with exponential backoff.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from . import metrics
+from .models import EmailOutbox
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _outbox_row(subject, body, recipients, html_body='', from_email=None):
+    if isinstance(recipients, str):
+        recipients = [recipients]
+    return EmailOutbox(
+        subject=subject[:255],
+        body=body,
+        html_body=html_body or '',
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=','.join(r for r in recipients if r),
+        max_attempts=_setting('OUTBOX_MAX_ATTEMPTS', 5),
+    )
+
+
+def enqueue_email(subject, body, recipients, html_body='', from_email=None):
+    """Persist an outgoing email. Returns the created EmailOutbox row."""
+    row = _outbox_row(subject, body, recipients, html_body, from_email)
+    row.save()
+    return row
+
+
+def enqueue_many(emails):
+    """
+    Persist several emails with a single INSERT.
+
+    `emails` is an iterable of (subject, body, recipients, html_body) tuples.
+    """
+    rows = [_outbox_row(*email) for email in emails]
+    return EmailOutbox.objects.bulk_create(rows) if rows else []
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base, 2*base, 4*base ... capped at OUTBOX_RETRY_MAX_SECONDS."""
+    base = _setting('OUTBOX_RETRY_BASE_SECONDS', 30)
+    cap = _setting('OUTBOX_RETRY_MAX_SECONDS', 3600)
+    return timedelta(seconds=min(base * (2 ** max(attempts - 1, 0)), cap))
+
+
+def claim_due(batch_size=50):
+    """
+    Lock and lease a batch of due Pending rows.
+
+    The lease pushes `next_attempt_at` forward so other workers skip these rows
+    while they are being delivered; if this worker dies mid-batch the rows
+    simply become due again once the lease runs out.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=_setting('OUTBOX_LEASE_SECONDS', 300))
+    with transaction.atomic():
+        rows = list(
+            EmailOutbox.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='Pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if rows:
+            EmailOutbox.objects.filter(id__in=[r.id for r in rows]).update(next_attempt_at=now + lease)
+    return rows
+
+
+def _build_message(row, connection):
+    msg = EmailMultiAlternatives(
+        row.subject,
+        row.body,
+        row.from_email or settings.DEFAULT_FROM_EMAIL,
+        row.recipient_list(),
+        connection=connection,
+    )
+    if row.html_body:
+        msg.attach_alternative(row.html_body, "text/html")
+    return msg
+
+
+def _mark_sent(row):
+    row.status = 'Sent'
+    row.attempts += 1
+    row.sent_at = timezone.now()
+    row.last_error = ''
+    row.save(update_fields=['status', 'attempts', 'sent_at', 'last_error'])
+
+
+def _mark_failed(row, error):
+    row.attempts += 1
+    row.last_error = str(error)[:2000]
+    if row.attempts >= row.max_attempts:
+        row.status = 'Failed'
+    else:
+        row.next_attempt_at = timezone.now() + retry_delay(row.attempts)
+    row.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at'])
+
+
+def deliver_due(batch_size=50):
+    """
+    Send one batch of due emails over a single mail connection.
+
+    Messages go through `send_messages` one at a time on the shared
+    connection so a bad recipient only fails its own row. Returns
+    `(sent, failed)` where `failed` is the list of rows that did not go out
+    (with `last_error` set).
+    """
+    rows = claim_due(batch_size)
+    if not rows:
+        return 0, []
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        for row in rows:
+            _mark_failed(row, e)
+        metrics.inc('booking_smtp_failures_total', amount=len(rows))
+        metrics.flush()
+        return 0, rows
+
+    sent = 0
+    failed = []
+    try:
+        for row in rows:
+            started = time.perf_counter()
+            try:
+                delivered = connection.send_messages([_build_message(row, connection)])
+                if not delivered:
+                    raise RuntimeError('Mail backend did not accept the message')
+            except Exception as e:
+                _mark_failed(row, e)
+                failed.append(row)
+                metrics.inc('booking_smtp_failures_total')
+            else:
+                _mark_sent(row)
+                sent += 1
+            metrics.observe('booking_smtp_send_duration_seconds', time.perf_counter() - started)
+    finally:
+        connection.close()
+    # The outbox worker serves no requests, so publish its counts per batch
+    metrics.flush()
+    return sent, failed
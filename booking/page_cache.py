@@ -0,0 +1,120 @@
+"""
+Caching for pages whose content changes only on deploy.
+
+`home`, `rules_regulations`, `booking_success` and the student dashboard
+shell render the same HTML for everyone in the same login state. The
+`cached_page` decorator gives them:
+
+- an ETag and Last-Modified derived from the deploy and the login state, so
+  a browser revisiting the page gets a 304 without the view running;
+- the rendered body in the 'bulk' cache alias per (view, login state,
+  deploy), so other visitors in the same state skip the template engine.
+  A page that also varies per user (the dashboard greets the student by
+  name) keeps only the ETag. One body per student would fill the cache and
+  give each body a single reader.
+
+Responses are `Cache-Control: private, no-cache` with `Vary: Cookie`: the
+browser revalidates every time and shared caches keep nothing. A request
+with flash messages waiting is rendered normally, since the page shows them.
+
+The navbar partial is also a `{% cache %}` fragment in the same alias, keyed
+on the login state (the `navbar` context processor). It helps every other
+page that extends base.html.
+
+The deploy is the newest template mtime plus PAGE_CACHE_VERSION (Render's
+RENDER_GIT_COMMIT by default), read once per process. With DEBUG on nothing
+is cached, so template edits show up at once.
+"""
+import functools
+import hashlib
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.template.autoreload import get_template_directories
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.connection import ConnectionProxy
+from django.utils.http import http_date, quote_etag
+
+KEY_PREFIX = 'page'
+CACHE_ALIAS = 'bulk'
+
+pages = ConnectionProxy(caches, CACHE_ALIAS)
+
+
+@functools.cache
+def deploy_stamp():
+    """(version, last modified timestamp) of the running deploy."""
+    newest = 0
+    for directory in get_template_directories():
+        for path in directory.rglob('*'):
+            if path.is_file():
+                newest = max(newest, int(path.stat().st_mtime))
+    return f"{getattr(settings, 'PAGE_CACHE_VERSION', '')}:{newest}", newest
+
+
+def login_state(request):
+    """What the navbar and footer depend on: admin name, student or anonymous."""
+    session = request.session
+    if session.get('is_admin_logged_in'):
+        return ('admin', session.get('admin_username') or '')
+    if session.get('student_email'):
+        return ('student',)
+    return ('anonymous',)
+
+
+def _timeout():
+    return 0 if settings.DEBUG else getattr(settings, 'PAGE_CACHE_TIMEOUT', 86400)
+
+
+def navbar(request):
+    """Context processor: the navbar fragment's cache key and timeout."""
+    version, _ = deploy_stamp()
+    return {
+        'navbar_cache_key': ':'.join((version, *login_state(request))),
+        'navbar_cache_timeout': _timeout(),
+        'navbar_cache_alias': CACHE_ALIAS,
+    }
+
+
+def cached_page(vary_on=None):
+    """
+    Cache a page per login state. Pages that show something of the user's
+    own (e.g. their name) pass `vary_on(request)`, which goes into the ETag
+    only; their body is rendered each time the browser's copy is stale.
+    Only 200 responses are cached; anything else (a login redirect) passes
+    through untouched.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if settings.DEBUG or request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+                return view(request, *args, **kwargs)
+
+            version, last_modified = deploy_stamp()
+            variant = (view.__name__, *login_state(request))
+            if vary_on is not None:
+                variant += (str(vary_on(request)),)
+            digest = hashlib.md5(repr((version, variant)).encode()).hexdigest()
+            etag = quote_etag(digest)
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                key = f'{KEY_PREFIX}:{digest}'
+                content = pages.get(key) if vary_on is None else None
+                if content is not None:
+                    response = HttpResponse(content)
+                else:
+                    response = view(request, *args, **kwargs)
+                    if response.status_code != 200 or response.streaming:
+                        return response
+                    if vary_on is None:
+                        pages.set(key, response.content, _timeout())
+                response['ETag'] = etag
+                response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,150 @@
+"""
+Keyset (cursor) pagination.
+
+`Paginator` needs a COUNT(*) and an OFFSET scan per page, so deep pages get
+slower as tables grow. Here a page is "the next `per_page` rows after this
+key": the last row's ordering values are signed into an opaque token, and
+the next page is a WHERE on those values that a composite index over the
+same columns serves directly. Every page costs the same as the first; the
+trade-off is no page numbers or total count.
+
+The ordering must end in a unique column (normally `id`) and its columns
+must be non-null.
+"""
+from functools import cmp_to_key
+
+from django.core import signing
+from django.db.models import Q
+
+SALT = 'booking.pagination'
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+
+def _split(ordering):
+    return [(f[1:], True) if f.startswith('-') else (f, False) for f in ordering]
+
+
+def _after(fields, values):
+    """Q for rows strictly after `values` in the (field, descending) ordering."""
+    q = Q()
+    for i in reversed(range(len(fields))):
+        name, desc = fields[i]
+        beyond = Q(**{f'{name}__{"lt" if desc else "gt"}': values[i]})
+        q = beyond if i == len(fields) - 1 else beyond | (Q(**{name: values[i]}) & q)
+    # Redundant bound on the leading column gives the index a range to scan
+    name, desc = fields[0]
+    return Q(**{f'{name}__{"lte" if desc else "gte"}': values[0]}) & q
+
+
+def _value(obj, name):
+    return getattr(obj, obj._meta.get_field(name).attname)
+
+
+def _compare(fields, a, b):
+    for name, desc in fields:
+        x, y = _value(a, name), _value(b, name)
+        if x != y:
+            return (1 if x > y else -1) * (-1 if desc else 1)
+    return 0
+
+
+def _encode(fields, obj, direction):
+    values = []
+    for name, _ in fields:
+        value = _value(obj, name)
+        values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+    return signing.dumps({'k': values, 'd': direction}, salt=SALT, compress=True)
+
+
+def _decode(model, fields, cursor):
+    try:
+        data = signing.loads(cursor, salt=SALT)
+        values = [model._meta.get_field(name).to_python(v) for (name, _), v in zip(fields, data['k'], strict=True)]
+        direction = data['d']
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None, 'n'
+    return values, 'p' if direction == 'p' else 'n'
+
+
+def decode_cursor(model, ordering, cursor):
+    """The ordering values and direction ('n'/'p') in `cursor`; (None, 'n') if missing or invalid."""
+    if not cursor:
+        return None, 'n'
+    return _decode(model, _split(ordering), cursor)
+
+
+def _order_by(fields):
+    return [('-' if desc else '') + name for name, desc in fields]
+
+
+def paginate(queryset, ordering, cursor=None, per_page=10):
+    """
+    Return the CursorPage of `queryset` sorted by `ordering` that `cursor`
+    points to (the first page when it is missing or invalid).
+    """
+    return paginate_union([queryset], ordering, cursor, per_page)
+
+
+def paginate_union(querysets, ordering, cursor=None, per_page=10):
+    """
+    Like `paginate`, over the rows of several querysets (e.g. a live and an
+    archive table with the same ordering columns) merged into one ordering.
+    Each queryset is read with the same keyset filter and limit, so a page
+    costs one query per queryset.
+    """
+    fields = _split(ordering)
+    values, direction = decode_cursor(querysets[0].model, ordering, cursor)
+
+    # Walk backwards from the key for a previous page, then restore display order
+    walk = [(name, not desc) for name, desc in fields] if direction == 'p' else fields
+    rows = []
+    for queryset in querysets:
+        qs = queryset.order_by(*_order_by(walk))
+        if values is not None:
+            qs = qs.filter(_after(walk, values))
+        rows.extend(qs[:per_page + 1])
+    if len(querysets) > 1:
+        rows.sort(key=cmp_to_key(lambda a, b: _compare(walk, a, b)))
+    rows = rows[:per_page + 1]
+
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == 'p':
+        rows.reverse()
+        has_next, has_previous = True, more
+    else:
+        has_next, has_previous = more, values is not None
+
+    if not rows:
+        return CursorPage([], None, None)
+    return CursorPage(
+        rows,
+        _encode(fields, rows[-1], 'n') if has_next else None,
+        _encode(fields, rows[0], 'p') if has_previous else None,
+    )
@@ -0,0 +1,152 @@
+"""
+Per-view query budgets.
+
+`settings.QUERY_BUDGETS` maps a URL name to the most database work one
+request to that view may do: `{'queries': n, 'db_ms': ms}`, either key
+optional. `QueryBudgetMiddleware` counts and times every query of a request
+and logs a warning on the `booking.query_budget` logger when a budgeted view
+goes over, with the SQL and call site of the queries past the budget. Any
+single query slower than `settings.SLOW_QUERY_MS` is logged the same way,
+for every view.
+
+Call sites are only captured for queries past the budget or over the slow
+threshold, so requests within budget pay for a counter and a timer only.
+
+Tests use the same budgets through `QueryBudgetAssertions.assertWithinQueryBudget`,
+so an N+1 regression in a budgeted view fails the suite.
+"""
+import logging
+import time
+import traceback
+from contextlib import contextmanager
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+
+from .metrics import QueryStats, track_queries
+
+logger = logging.getLogger('booking.query_budget')
+
+APP_DIR = str(Path(__file__).resolve().parent)
+
+
+def get_budget(view_name):
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+
+
+def _call_site():
+    """The innermost frames of this app that led to the current query."""
+    frames = [
+        f for f in traceback.extract_stack()
+        if f.filename.startswith(APP_DIR) and Path(f.filename).name not in ('query_budget.py', 'metrics.py')
+    ]
+    if not frames:
+        # An async view's ORM call runs on a sync_to_async thread, away from the view's frames
+        return 'sync_to_async thread (async view)'
+    return ' <- '.join(f'{Path(f.filename).name}:{f.lineno} {f.name}' for f in reversed(frames[-4:]))
+
+
+class QueryRecorder(QueryStats):
+    """QueryStats that keeps the SQL and call site of queries past `max_queries` or slower than `slow_ms`."""
+
+    def __init__(self, max_queries=None, slow_ms=None):
+        super().__init__()
+        self.max_queries = max_queries
+        self.slow_ms = slow_ms
+        self.over_budget = []  # (sql, ms, call site)
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            ms = elapsed * 1000
+            over = self.max_queries is not None and self.count > self.max_queries
+            slow = self.slow_ms is not None and ms >= self.slow_ms
+            if over or slow:
+                entry = (sql, ms, _call_site())
+                if over:
+                    self.over_budget.append(entry)
+                if slow:
+                    self.slow.append(entry)
+
+    def violations(self, budget, timing=True):
+        """Human-readable list of the ways this request broke `budget`."""
+        problems = []
+        if budget.get('queries') is not None and self.count > budget['queries']:
+            problems.append(f"{self.count} queries > budget {budget['queries']}")
+        if timing and budget.get('db_ms') is not None and self.duration * 1000 > budget['db_ms']:
+            problems.append(f"{self.duration * 1000:.1f} ms in the database > budget {budget['db_ms']} ms")
+        return problems
+
+
+def _format(entries):
+    return '\n'.join(f'  [{ms:.1f} ms] {sql}\n    at {site}' for sql, ms, site in entries)
+
+
+class QueryBudgetMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        recorder = request._query_recorder = QueryRecorder(slow_ms=getattr(settings, 'SLOW_QUERY_MS', None))
+        with track_queries(recorder):
+            response = self.get_response(request)
+        self.report(request, recorder)
+        return response
+
+    async def __acall__(self, request):
+        recorder = request._query_recorder = QueryRecorder(slow_ms=getattr(settings, 'SLOW_QUERY_MS', None))
+        with track_queries(recorder):
+            response = await self.get_response(request)
+        self.report(request, recorder)
+        return response
+
+    def report(self, request, recorder):
+        match = request.resolver_match
+        view_name = match.url_name if match is not None else None
+        budget = get_budget(view_name) or {}
+        problems = recorder.violations(budget)
+        if problems:
+            logger.warning(
+                "Query budget exceeded for %s (%s): %s\n%s",
+                view_name, request.path, '; '.join(problems), _format(recorder.over_budget),
+            )
+        if recorder.slow:
+            logger.warning("Slow queries in %s (%s):\n%s", view_name, request.path, _format(recorder.slow))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # The URL is resolved now: start keeping SQL once the view's budget is used up
+        budget = get_budget(request.resolver_match.url_name) or {}
+        request._query_recorder.max_queries = budget.get('queries')
+
+
+class QueryBudgetAssertions:
+    """TestCase mixin: hold a block of test code to a view's configured budget."""
+
+    @contextmanager
+    def assertWithinQueryBudget(self, view_name):
+        budget = get_budget(view_name)
+        if budget is None:
+            self.fail(f"No query budget configured for {view_name!r}")
+        recorder = QueryRecorder(budget.get('queries'))
+        with connection.execute_wrapper(recorder):
+            yield recorder
+        # Query counts are deterministic; database time is not, so it is left to the middleware
+        problems = recorder.violations(budget, timing=False)
+        if problems:
+            self.fail(f"{view_name}: {'; '.join(problems)}\n{_format(recorder.over_budget)}")
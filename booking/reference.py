@@ -0,0 +1,179 @@
+"""
+In-process cache of the Ground / Sport / TimeSlot reference tables.
+
+Booking rows carry integer `*_ref` foreign keys next to their display text,
+so lookups that used `sport__iexact` or a DISTINCT scan over bookings become
+integer equality on a small index. Each web worker loads all three tables
+when it starts (`warm`, called from the WSGI/ASGI entry points; management
+commands load them on first use outside a transaction) and then maps names
+to ids from memory.
+
+The tables are append-only: a name this process has not seen yet costs one
+query and is remembered once its row is known to be committed, so a rolled
+back insert can never leave a dangling id in the cache. Ground and sport
+names match case-insensitively, like the `iexact` filters they replace;
+slot labels match exactly, like `time_slot=` did.
+
+A row created in another process is found by `get_id` through its DB
+fallback, but `names()` lists the whole table. Each creation therefore
+bumps a per-kind version stamp in the shared cache on commit, like the
+slot catalog, and `names()` reloads the table when the stamp it was
+loaded under has moved.
+"""
+import logging
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import SynchronousOnlyOperation
+from django.db import DatabaseError, IntegrityError, connection, transaction
+
+from .models import Ground, Sport, TimeSlot
+
+logger = logging.getLogger('booking.reference')
+
+KINDS = {
+    'ground': (Ground, 'name'),
+    'sport': (Sport, 'name'),
+    'time_slot': (TimeSlot, 'label'),
+}
+
+VERSION_KEY = 'reference:v:{}'
+
+_tables = {}  # kind -> {normalized name: (id, display name)}
+_versions = {}  # kind -> stamp the table was loaded under
+_lock = threading.Lock()
+
+
+def _norm(kind, value):
+    value = value or ''
+    return value if kind == 'time_slot' else value.lower()
+
+
+def _version(kind):
+    key = VERSION_KEY.format(kind)
+    version = cache.get(key)
+    if version is None:
+        # Clock seed so a stamp lost to eviction never matches an old one
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(kind):
+    key = VERSION_KEY.format(kind)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def _load(kind):
+    # Stamp first: a row created during the load bumps it again and is picked up next time
+    _versions[kind] = _version(kind)
+    model, field = KINDS[kind]
+    _tables[kind] = {_norm(kind, v): (pk, v) for pk, v in model.objects.values_list('id', field)}
+
+
+def _table(kind):
+    table = _tables.get(kind)
+    if table is None:
+        table = {}
+        # Inside a transaction the table could include this transaction's own
+        # uncommitted rows, so the full load waits for an autocommit caller
+        if not connection.in_atomic_block:
+            with _lock:
+                if kind not in _tables:
+                    _load(kind)
+                table = _tables[kind]
+    return table
+
+
+def _remember(kind, key, pk, value):
+    def store():
+        table = _tables.get(kind)
+        if table is not None:
+            table[key] = (pk, value)
+    transaction.on_commit(store)
+
+
+def get_id(kind, value, create=False):
+    """
+    Id of the `kind` reference row for `value`, or None for an empty or
+    unknown value. With `create`, a missing row is inserted.
+    """
+    key = _norm(kind, value)
+    if not key:
+        return None
+    hit = _table(kind).get(key)
+    if hit is not None:
+        return hit[0]
+
+    model, field = KINDS[kind]
+    lookup = field if kind == 'time_slot' else f'{field}__iexact'
+    rows = model.objects.filter(**{lookup: value}).values_list('id', field)
+    row = rows.first()
+    if row is None and create:
+        try:
+            with transaction.atomic():
+                row = (model.objects.create(**{field: value}).id, value)
+            transaction.on_commit(lambda: _bump(kind))
+        except IntegrityError:
+            # Created concurrently under the same (case-insensitive) name
+            row = rows.get()
+    if row is None:
+        return None
+    _remember(kind, key, *row)
+    return row[0]
+
+
+async def aget_id(kind, value):
+    """Async `get_id` (lookup only): answered from memory once the table is loaded."""
+    key = _norm(kind, value)
+    if not key:
+        return None
+    hit = _tables.get(kind, {}).get(key)
+    if hit is not None:
+        return hit[0]
+    return await sync_to_async(get_id)(kind, value)
+
+
+def names(kind):
+    """Sorted display names of every `kind` row (e.g. the dashboard ground filter)."""
+    if kind in _tables and _versions.get(kind) != _version(kind):
+        with _lock:
+            _tables.pop(kind, None)  # created elsewhere since the load
+    table = _table(kind)
+    if table:
+        return sorted(display for _, display in table.values())
+    model, field = KINDS[kind]
+    return list(model.objects.order_by(field).values_list(field, flat=True))
+
+
+def load():
+    """Load every reference table into this process now (e.g. at worker start)."""
+    with _lock:
+        for kind in KINDS:
+            _load(kind)
+
+
+def warm():
+    """
+    `load()` at web worker start (groundbooking/wsgi.py, asgi.py), so the
+    first requests answer from memory. Before `migrate` the tables do not
+    exist yet (and a server that imports the app inside its event loop
+    cannot query); the worker then starts anyway and loads them on first use.
+    """
+    try:
+        load()
+    except (DatabaseError, SynchronousOnlyOperation):
+        logger.warning('Reference tables not loaded at startup; loading on first use', exc_info=True)
+        clear()
+
+
+def clear():
+    """Drop the cached tables; the next lookup reloads them."""
+    with _lock:
+        _tables.clear()
+        _versions.clear()
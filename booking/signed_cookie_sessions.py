@@ -0,0 +1,37 @@
+"""
+Signed-cookie session engine with a one-time hand-over from database sessions.
+
+Set SESSION_ENGINE = 'booking.signed_cookie_sessions' to keep session data
+in the signed cookie itself, with no per-request lookup. A browser that
+still carries an old database session key has its data loaded from
+`django_session` once and re-issued as a signed cookie on that response,
+so switching engines does not log anyone out. `manage.py clearsessions`
+removes the leftover rows as they expire.
+"""
+from django.contrib.sessions.backends import db, signed_cookies
+from django.core import signing
+
+# Keys issued by the database backends (get_random_string(32) in SessionBase)
+DB_KEY_LENGTH = 32
+
+
+class SessionStore(signed_cookies.SessionStore):
+    def load(self):
+        key = self.session_key
+        try:
+            return signing.loads(
+                key,
+                serializer=self.serializer,
+                max_age=self.get_session_cookie_age(),
+                salt='django.contrib.sessions.backends.signed_cookies',
+            )
+        except Exception:
+            pass
+        if key and len(key) == DB_KEY_LENGTH and key.isalnum():
+            data = db.SessionStore(key).load()
+            if data:
+                # Set the signed cookie on this response
+                self.modified = True
+                return data
+        self.create()
+        return {}
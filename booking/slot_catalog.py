@@ -0,0 +1,150 @@
+"""
+Slot catalog: the single list of bookable time slots.
+
+Built from the TimeSlot rows marked `bookable` (or `slots.DEFAULT_SLOTS` when
+none are), with every label parsed to minutes once when the catalog is
+built. The booking form, `check_availability` and `availability_grid` all
+read from it, so they always offer and check the same slots.
+
+Each process keeps one immutable catalog and rebuilds it when the version
+stamp in the shared cache changes. The stamp is bumped by the TimeSlot
+signals below, so a configuration change reaches every worker.
+"""
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import TimeSlot
+from .slots import DEFAULT_SLOTS, parse_slot_range
+
+VERSION_KEY = 'slot_catalog:v'
+
+
+class Slot(NamedTuple):
+    label: str
+    start_minute: Optional[int]
+    end_minute: Optional[int]
+
+
+class SlotCatalog:
+    """
+    Ordered bookable slots with O(1) lookup by label.
+
+    `sports` and `grounds` map a slot label to the lowercased names it is
+    restricted to; a label missing from a map is offered everywhere.
+    """
+
+    def __init__(self, slots, sports=None, grounds=None, version=None):
+        self.slots = tuple(slots)
+        self.version = version
+        self._by_label = {slot.label: slot for slot in self.slots}
+        self._sports = sports or {}
+        self._grounds = grounds or {}
+
+    def get(self, label):
+        return self._by_label.get(label)
+
+    def __contains__(self, label):
+        return label in self._by_label
+
+    def __iter__(self):
+        return iter(self.slots)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def slots_for(self, sport=None, ground=None):
+        """Slots offered for `sport` at `ground` (None means any)."""
+        if not self._sports and not self._grounds:
+            return self.slots
+        sport = (sport or '').lower()
+        ground = (ground or '').lower()
+        return tuple(
+            slot for slot in self.slots
+            if (not sport or sport in self._sports.get(slot.label, (sport,)))
+            and (not ground or ground in self._grounds.get(slot.label, (ground,)))
+        )
+
+    def choices(self):
+        return [(slot.label, slot.label) for slot in self.slots]
+
+
+def build():
+    """Build a catalog from the database (three queries)."""
+    rows = list(
+        TimeSlot.objects.filter(bookable=True)
+        .order_by('position', 'start_minute', 'label')
+        .prefetch_related('sports', 'grounds')
+    )
+    if not rows:
+        return SlotCatalog(Slot(label, *parse_slot_range(label)) for label in DEFAULT_SLOTS)
+    sports, grounds = {}, {}
+    for row in rows:
+        if row.sports.all():
+            sports[row.label] = frozenset(s.name.lower() for s in row.sports.all())
+        if row.grounds.all():
+            grounds[row.label] = frozenset(g.name.lower() for g in row.grounds.all())
+    return SlotCatalog(
+        (Slot(row.label, row.start_minute, row.end_minute) for row in rows),
+        sports, grounds,
+    )
+
+
+_catalog = None
+_lock = threading.Lock()
+
+
+def get_catalog():
+    """The current catalog, rebuilt at most once per version change per process."""
+    global _catalog
+    version = cache.get(VERSION_KEY)
+    catalog = _catalog
+    if catalog is None or catalog.version != version:
+        with _lock:
+            if _catalog is None or _catalog.version != version:
+                catalog = build()
+                catalog.version = version
+                _catalog = catalog
+            catalog = _catalog
+    return catalog
+
+
+async def aget_catalog():
+    """Async `get_catalog`: a single cache read while this process's catalog is current."""
+    catalog = _catalog
+    if catalog is not None and catalog.version == await cache.aget(VERSION_KEY):
+        return catalog
+    return await sync_to_async(get_catalog)()
+
+
+def invalidate():
+    """Make every process rebuild its catalog on next use."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # Clock seed so a stamp lost to eviction never matches an old one
+        cache.add(VERSION_KEY, time.time_ns(), None)
+
+
+@receiver(post_save, sender=TimeSlot)
+def _slot_saved(sender, instance, created, **kwargs):
+    # New labels are recorded for every booking; only bookable ones matter here
+    if instance.bookable or not created:
+        invalidate()
+
+
+@receiver(post_delete, sender=TimeSlot)
+def _slot_deleted(sender, **kwargs):
+    invalidate()
+
+
+@receiver(m2m_changed, sender=TimeSlot.sports.through)
+@receiver(m2m_changed, sender=TimeSlot.grounds.through)
+def _slot_restrictions_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate()
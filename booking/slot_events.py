@@ -0,0 +1,167 @@
+"""
+Live slot status for (date, sport) subscriptions, pushed as Server-Sent Events.
+
+Each event loop (one per ASGI worker process) has one `SlotHub`. The SSE
+view subscribes a queue per client; the hub keeps the last known slot
+statuses per (date, sport) and a single watcher task for all of them. Every
+SLOT_EVENTS_POLL_INTERVAL seconds the watcher reads the availability
+version stamps of all subscribed keys in one cache round trip. Approve and
+reject already bump those stamps on commit (`availability_cache`), so a
+decision taken in any worker is noticed within one interval. A decision
+taken in this process wakes the watcher at once (`notify`).
+
+For each changed key the statuses are recomputed with one query and only
+the slots that changed are pushed to the subscribers. The work per change
+is one query per worker process, however many clients are watching.
+"""
+import asyncio
+import logging
+import threading
+import weakref
+
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.db.models import Count, Q
+
+from . import availability_cache, metrics, reference
+from .models import Booking
+from .slot_catalog import aget_catalog
+
+QUEUE_SIZE = 16
+
+logger = logging.getLogger('booking.slot_events')
+
+
+def subscription_key(date, sport):
+    return (str(date), (sport or '').strip().lower())
+
+
+async def aslot_statuses(date, sport, slots):
+    """{label: 'booked' | 'available'} for `slots` on `date`, from one indexed range query."""
+    # An unknown sport has no bookings at all
+    sport_id = await reference.aget_id('sport', sport)
+    overlap_counts = {}
+    if sport_id is not None:
+        overlap_counts = await Booking.objects.filter(
+            date=date,
+            status='Approved',
+            sport_ref_id=sport_id,
+        ).aaggregate(**{
+            f'slot_{i}': Count('id', filter=Q(start_minute__lt=slot.end_minute, end_minute__gt=slot.start_minute))
+            for i, slot in enumerate(slots)
+            if slot.start_minute is not None
+        })
+    return {
+        slot.label: 'booked' if overlap_counts.get(f'slot_{i}') else 'available'
+        for i, slot in enumerate(slots)
+    }
+
+
+class SlotHub:
+    """Fan-out of slot status changes to the SSE clients of one event loop."""
+
+    def __init__(self, loop):
+        self.loop = weakref.ref(loop)  # the hub registry is keyed weakly by its loop
+        self.subscribers = {}  # key -> set of queues
+        self.versions = {}     # key -> availability version the statuses were read at
+        self.statuses = {}     # key -> {label: status}
+        self.wake = asyncio.Event()
+        self.watcher = None
+
+    async def subscribe(self, key):
+        """A queue that starts with a snapshot of `key` and then receives its deltas."""
+        if key not in self.subscribers:
+            # Nobody was watching, so nothing kept the statuses current
+            await self._refresh([key])
+        queue = asyncio.Queue(QUEUE_SIZE)
+        queue.put_nowait(('snapshot', self.statuses[key]))
+        self.subscribers.setdefault(key, set()).add(queue)
+        if self.watcher is None:
+            self.watcher = asyncio.create_task(self._watch())
+        return queue
+
+    def unsubscribe(self, key, queue):
+        queues = self.subscribers.get(key)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[key]
+                self.versions.pop(key, None)
+                self.statuses.pop(key, None)
+
+    async def _watch(self):
+        # Spawned from a request; its queries are not that request's
+        metrics.untrack_queries()
+        try:
+            while self.subscribers:
+                try:
+                    await asyncio.wait_for(self.wake.wait(), getattr(settings, 'SLOT_EVENTS_POLL_INTERVAL', 1.0))
+                except asyncio.TimeoutError:
+                    pass
+                self.wake.clear()
+                keys = list(self.subscribers)
+                try:
+                    versions = await availability_cache.aget_versions(keys)
+                    await self._refresh([key for key in keys if versions[key] != self.versions.get(key)], versions)
+                except Exception:
+                    # A cache or database blip must not end the stream for every client;
+                    # a key whose refresh failed keeps its old version and is retried next pass
+                    logger.exception('Slot status refresh failed; retrying next poll')
+        finally:
+            self.watcher = None
+
+    async def _refresh(self, keys, versions=None):
+        if not keys:
+            return
+        # Sync ORM work of this pass shares one thread, like a request's
+        async with ThreadSensitiveContext():
+            if versions is None:
+                versions = await availability_cache.aget_versions(keys)
+            catalog = await aget_catalog()
+            for key in keys:
+                date, sport = key
+                new = await aslot_statuses(date, sport, catalog.slots_for(sport))
+                # The stamp was read before the statuses, so a change in between is seen next pass
+                self.versions[key] = versions[key]
+                old = self.statuses.get(key)
+                self.statuses[key] = new
+                delta = {label: status for label, status in new.items() if old is not None and old.get(label) != status}
+                if delta:
+                    self._publish(key, delta)
+
+    def _publish(self, key, delta):
+        for queue in self.subscribers.get(key, ()):
+            if queue.full():
+                # A client this far behind gets the full state instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(('snapshot', self.statuses[key]))
+            else:
+                queue.put_nowait(('delta', delta))
+
+
+_hubs = weakref.WeakKeyDictionary()  # event loop -> SlotHub
+_hubs_lock = threading.Lock()
+
+
+def get_hub():
+    loop = asyncio.get_running_loop()
+    with _hubs_lock:
+        hub = _hubs.get(loop)
+        if hub is None:
+            hub = _hubs[loop] = SlotHub(loop)
+    return hub
+
+
+def notify():
+    """Wake every hub in this process to check its subscriptions now (safe from any thread)."""
+    with _hubs_lock:
+        hubs = list(_hubs.values())
+    for hub in hubs:
+        loop = hub.loop()
+        if loop is None:
+            continue
+        try:
+            loop.call_soon_threadsafe(hub.wake.set)
+        except RuntimeError:
+            pass  # loop closed
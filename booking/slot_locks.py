@@ -0,0 +1,50 @@
+"""
+Per-slot mutual exclusion for FCFS approval.
+
+A slot key (date, sport, time_slot) is locked for the rest of the current
+transaction. PostgreSQL uses `pg_advisory_xact_lock` on a 64-bit hash of
+the key, so no table rows are touched and approvals of different slots never
+wait on each other. Other backends write the key's `SlotLock` row; the
+write lock is held until commit (on SQLite it is the database write lock).
+
+Keys are always acquired in one global order so callers locking several
+slots cannot deadlock.
+"""
+import hashlib
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import SlotLock
+
+
+def _key_string(key):
+    date, sport, time_slot = key
+    return f'{date}|{(sport or "").lower()}|{time_slot}'
+
+
+def lock_id(key):
+    """Signed 64-bit advisory lock id for a slot key."""
+    digest = hashlib.blake2b(_key_string(key).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def acquire(keys):
+    """Lock every slot in `keys` until the surrounding transaction ends."""
+    if connection.vendor == 'postgresql':
+        ids = sorted({lock_id(k) for k in keys})
+        if ids:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT pg_advisory_xact_lock(id) FROM (SELECT unnest(%s::bigint[]) AS id ORDER BY id) ids',
+                    [ids],
+                )
+        return
+    for name in sorted({_key_string(k) for k in keys}):
+        # Write first so SQLite takes its write lock before any read in this transaction
+        rows = SlotLock.objects.filter(key=name)
+        if not rows.update(acquired_at=timezone.now()):
+            _, created = SlotLock.objects.get_or_create(key=name)
+            if not created:
+                # Lost the insert race; the winner has committed, take the lock now
+                rows.update(acquired_at=timezone.now())
@@ -0,0 +1,48 @@
+"""
+Time slot helpers.
+
+Slots are stored as display strings (e.g. "07:00 AM - 09:00 AM" or
+"9:00-11:00"); these helpers turn them into minutes since midnight so
+overlap checks can run as integer comparisons in the database.
+"""
+from datetime import datetime
+
+TIME_FORMATS = ["%I:%M %p", "%I:%M%p", "%H:%M", "%I %p"]
+
+
+def parse_time_to_minutes(tstr):
+    """Parse a single time like "07:00 AM", "7:00PM", "13:00" or "7 PM"; None if unparseable."""
+    tstr = (tstr or '').strip()
+    for fmt in TIME_FORMATS:
+        try:
+            dt = datetime.strptime(tstr, fmt)
+            return dt.hour * 60 + dt.minute
+        except ValueError:
+            continue
+    try:
+        parts = tstr.split(':')
+        if len(parts) == 2:
+            h = int(parts[0])
+            m = int(''.join(ch for ch in parts[1] if ch.isdigit()))
+            return h * 60 + m
+    except ValueError:
+        pass
+    return None
+
+
+def parse_slot_range(rng):
+    """Parse "start - end" into a (start_minute, end_minute) tuple, (None, None) if invalid."""
+    if not rng or '-' not in rng:
+        return (None, None)
+    a, b = rng.split('-', 1)
+    start = parse_time_to_minutes(a)
+    end = parse_time_to_minutes(b)
+    if start is None or end is None:
+        return (None, None)
+    return (start, end)
+
+
+# Bookable slots used when no TimeSlot is marked bookable (see slot_catalog.py)
+DEFAULT_SLOTS = [
+    "07:00 AM - 09:00 AM", "04:00 PM - 06:00 PM",
+]
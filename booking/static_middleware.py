@@ -0,0 +1,58 @@
+"""
+WhiteNoise for both WSGI and ASGI.
+
+`WhiteNoiseMiddleware` is sync-only, and one sync middleware in the stack
+makes Django run everything below it in a thread under ASGI, so each
+in-flight request would hold a thread for its whole duration. This subclass
+serves static files the same way and passes other requests straight to an
+async handler. Under ASGI the file body is read in a thread pool chunk by
+chunk instead of being loaded into memory by Django's sync-iterator
+fallback.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseFileResponse, WhiteNoiseMiddleware
+
+CHUNK_SIZE = 64 * 1024
+
+
+async def _read_chunks(file):
+    read = sync_to_async(file.read, thread_sensitive=False)
+    try:
+        while chunk := await read(CHUNK_SIZE):
+            yield chunk
+    finally:
+        file.close()
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, **kwargs):
+        super().__init__(get_response, **kwargs)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return await self.get_response(request)
+
+        response = await sync_to_async(static_file.get_response, thread_sensitive=False)(
+            request.method, request.META
+        )
+        body = _read_chunks(response.file) if response.file is not None else ()
+        http_response = WhiteNoiseFileResponse(body, status=int(response.status))
+        del http_response['content-type']  # WhiteNoise sends its own
+        for key, value in response.headers:
+            http_response[key] = value
+        return http_response
@@ -0,0 +1,38 @@
+"""
+Static files storage: content-hashed names, precompressed copies and
+responsive image variants.
+
+WhiteNoise's CompressedManifestStaticFilesStorage hashes every collected
+file into its name (base.css -> base.1a2b3c4d5e6f.css). It writes the
+mapping to staticfiles.json and saves gzip and brotli copies of the text
+assets (brotli when the Brotli package is installed). Because a hashed name
+never changes content, WhiteNoise serves it with a one-year `immutable`
+Cache-Control, and a deploy that changes a file changes its URL. Before
+hashing, `post_process` adds the AVIF/WebP variants from booking.images so
+they get the same treatment.
+"""
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from . import images
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for name in images.write_variants(self, paths):
+                paths[name] = (self, name)
+            images.variants.cache_clear()
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def stored_name(self, name):
+        """
+        The hashed name, or `name` itself when it is not in the manifest.
+        That happens before the first collectstatic, or when a template names
+        a file that does not exist. Without this fallback the page would fail
+        with a 500 instead of a 404 for that one asset.
+        """
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
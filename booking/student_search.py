@@ -0,0 +1,154 @@
+"""
+Student typeahead search used by `fetch_student_data`.
+
+PostgreSQL: one ranked query. The `icontains` filters compile to
+`UPPER(col) LIKE UPPER('%q%')`, which the pg_trgm GIN indexes created in
+migration 0014 on `UPPER(full_name)`, `UPPER(email)` and `UPPER(roll_number)`
+serve without a table scan.
+
+Other backends (SQLite in development): an in-process sorted prefix index
+over name words, email and roll number. It is rebuilt lazily when the
+StudentUser version stamp in the shared cache changes (bumped by the
+save/delete signals below), and results are loaded with one `in_bulk` query.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import StudentUser
+
+VERSION_KEY = 'student_search:v'
+
+# Lower rank sorts first
+RANK_NAME_PREFIX = 0
+RANK_WORD_PREFIX = 1
+RANK_EMAIL_OR_ROLL = 2
+RANK_CONTAINS = 3
+
+
+def search_students(q, limit=10):
+    """Return up to `limit` StudentUser rows matching `q`, best matches first."""
+    q = (q or '').strip()
+    if not q:
+        return []
+    if connection.vendor == 'postgresql':
+        return _search_sql(q, limit)
+    ids = _get_index().search(q.lower(), limit)
+    students = StudentUser.objects.in_bulk(ids)
+    return [students[i] for i in ids if i in students]
+
+
+async def asearch_students(q, limit=10):
+    """Async `search_students`."""
+    q = (q or '').strip()
+    if not q:
+        return []
+    if connection.vendor == 'postgresql':
+        return [s async for s in _search_queryset(q)[:limit]]
+    index = _index
+    if index is None or await cache.aget(VERSION_KEY) != _index_version:
+        index = await sync_to_async(_get_index)()
+    ids = index.search(q.lower(), limit)
+    students = await StudentUser.objects.ain_bulk(ids)
+    return [students[i] for i in ids if i in students]
+
+
+def _search_sql(q, limit):
+    return list(_search_queryset(q)[:limit])
+
+
+def _search_queryset(q):
+    rank = Case(
+        When(full_name__istartswith=q, then=Value(RANK_NAME_PREFIX)),
+        When(full_name__icontains=f' {q}', then=Value(RANK_WORD_PREFIX)),
+        When(Q(email__istartswith=q) | Q(roll_number__istartswith=q), then=Value(RANK_EMAIL_OR_ROLL)),
+        default=Value(RANK_CONTAINS),
+        output_field=IntegerField(),
+    )
+    return (
+        StudentUser.objects
+        .filter(full_name__isnull=False)
+        .exclude(full_name='')
+        .filter(Q(full_name__icontains=q) | Q(email__icontains=q) | Q(roll_number__icontains=q))
+        .annotate(rank=rank)
+        .order_by('rank', 'full_name')
+    )
+
+
+class PrefixIndex:
+    """
+    One sorted token list per rank tier, searched with bisect.
+
+    Results are ordered by (rank, matched token, name), so each tier is
+    walked in order and the search stops as soon as `limit` students are
+    found: O(log n + limit) per keystroke.
+    """
+
+    def __init__(self, rows):
+        tiers = {RANK_NAME_PREFIX: [], RANK_WORD_PREFIX: [], RANK_EMAIL_OR_ROLL: []}
+        for pk, full_name, email, roll_number in rows:
+            if not full_name:
+                continue
+            name = full_name.lower()
+            tiers[RANK_NAME_PREFIX].append((name, pk))
+            for word in name.split()[1:]:
+                tiers[RANK_WORD_PREFIX].append((f'{word} {name}', pk))
+            if email:
+                tiers[RANK_EMAIL_OR_ROLL].append((email.lower(), pk))
+            if roll_number:
+                tiers[RANK_EMAIL_OR_ROLL].append((roll_number.lower(), pk))
+        self.tiers = [sorted(tiers[rank]) for rank in sorted(tiers)]
+
+    def search(self, prefix, limit):
+        found = []
+        seen = set()
+        for entries in self.tiers:
+            i = bisect_left(entries, (prefix,))
+            while i < len(entries) and len(found) < limit and entries[i][0].startswith(prefix):
+                pk = entries[i][1]
+                if pk not in seen:
+                    seen.add(pk)
+                    found.append(pk)
+                i += 1
+            if len(found) >= limit:
+                break
+        return found
+
+
+_index = None
+_index_version = None
+_lock = threading.Lock()
+
+
+def _get_index():
+    global _index, _index_version
+    version = cache.get(VERSION_KEY)
+    if _index is None or version != _index_version:
+        with _lock:
+            if _index is None or version != _index_version:
+                rows = StudentUser.objects.values_list('id', 'full_name', 'email', 'roll_number')
+                _index = PrefixIndex(rows.iterator())
+                _index_version = version
+    return _index
+
+
+def invalidate():
+    """Make every process rebuild its prefix index on the next search."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # Clock seed so a stamp lost to eviction never matches an old one
+        cache.add(VERSION_KEY, time.time_ns(), None)
+
+
+@receiver(post_save, sender=StudentUser)
+@receiver(post_delete, sender=StudentUser)
+def _student_changed(sender, **kwargs):
+    invalidate()
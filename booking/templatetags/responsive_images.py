@@ -0,0 +1,33 @@
+from django import template
+from django.forms.utils import flatatt
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from .. import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(name, alt='', sizes='100vw', **attrs):
+    """
+    {% responsive_image 'images/VitGround1.jpg' alt='...' sizes='(min-width: 768px) 50vw, 100vw' class='...' %}
+
+    A <picture> with an AVIF and a WebP srcset from the collected variants of
+    `name`, falling back to the original. `sizes` is the image's rendered
+    width and picks the variant, so give the layout width, not 100vw, for
+    small images. Any other keyword becomes an <img> attribute. The <picture>
+    is display:contents, so the <img> is laid out exactly as it would be alone.
+    """
+    img = format_html('<img src="{}" alt="{}"{}>', static(name), alt, flatatt(attrs))
+    found = images.variants().get(name)
+    if not found:
+        return img
+    sources = format_html_join(
+        '', '<source type="image/{}" srcset="{}" sizes="{}">',
+        (
+            (fmt, ', '.join(f'{static(variant)} {width}w' for width, variant in found[fmt]), sizes)
+            for fmt in found
+        ),
+    )
+    return format_html('<picture style="display:contents">{}{}</picture>', sources, img)
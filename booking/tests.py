@@ -1,7 +1,41 @@
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client, AsyncClient, AsyncRequestFactory, RequestFactory, override_settings
 from django.urls import reverse
-from .models import Booking, Player
-from datetime import date
+from django.template import Context, Template, engines
+from django.core import mail
+from django.core.cache import cache, caches
+from django.utils import timezone
+from unittest import mock
+from .models import Booking, Player, EmailOutbox, StudentUser, AllotedGroundBooking, Sport, Ground, TimeSlot, OTPVerification
+from .models import ArchivedBooking, ArchivedPlayer, ArchivedAllotment, MetricCounter
+from .outbox import deliver_due, enqueue_email
+from . import allocation, archive, availability_cache, change_feed, images, metrics, reference, slot_catalog, slot_events, slot_locks
+from .pagination import paginate
+from .query_budget import QueryBudgetAssertions
+from .static_middleware import StaticFilesMiddleware
+from datetime import date, timedelta
+from io import StringIO
+from urllib.parse import urlencode
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
+from django.http import HttpResponse
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from pathlib import Path
+from PIL import features
+import asyncio
+import json
+import shutil
+import tempfile
+import threading
+
+
+def make_booking(email='s@example.com', **fields):
+	"""A booking for today's morning football slot on Ground A; keyword arguments override any field."""
+	defaults = dict(
+		student_name=email.split('@')[0], student_email=email, ground='Ground A', sport='Football',
+		date=date.today(), time_slot='07:00 AM - 09:00 AM', purpose='Practice', roll_number='',
+	)
+	return Booking.objects.create(**{**defaults, **fields})
 
 
 class StudentHistoryViewTests(TestCase):
@@ -72,3 +106,1317 @@ class StudentHistoryViewTests(TestCase):
 		self.assertEqual(resp.status_code, 200)
 		self.assertContains(resp, 'Approved')
 		self.assertNotContains(resp, 'Rejected')
+
+
+class EmailOutboxTests(TestCase):
+	def setUp(self):
+		self.client = Client()
+		session = self.client.session
+		session['is_admin_logged_in'] = True
+		session.save()
+
+	def test_approve_enqueues_instead_of_sending(self):
+		first = make_booking('first@example.com')
+		make_booking('second@example.com')
+
+		resp = self.client.get(reverse('approve_booking', args=[first.id]))
+		self.assertEqual(resp.status_code, 302)
+		self.assertEqual(len(mail.outbox), 0)
+		queued = {row.recipients: row.subject for row in EmailOutbox.objects.all()}
+		self.assertIn('Approved', queued['first@example.com'])
+		self.assertIn('Rejected', queued['second@example.com'])
+
+	def test_deliver_due_sends_and_marks_sent(self):
+		row = enqueue_email('Hello', 'Body', ['a@example.com'], html_body='<p>Body</p>')
+		self.assertEqual(deliver_due(), (1, []))
+		row.refresh_from_db()
+		self.assertEqual(row.status, 'Sent')
+		self.assertEqual(len(mail.outbox), 1)
+		self.assertEqual(mail.outbox[0].to, ['a@example.com'])
+
+	def test_failed_send_is_retried_with_backoff(self):
+		row = enqueue_email('Hello', 'Body', ['a@example.com'])
+		with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('smtp down')):
+			sent, failed = deliver_due()
+		self.assertEqual((sent, failed), (0, [row]))
+		row.refresh_from_db()
+		self.assertEqual(row.status, 'Pending')
+		self.assertEqual(row.attempts, 1)
+		self.assertGreater(row.next_attempt_at, timezone.now())
+		self.assertIn('smtp down', row.last_error)
+		# Not due again until the backoff elapses
+		self.assertEqual(deliver_due(), (0, []))
+
+	def test_auto_reject_notifications_are_batched(self):
+		first = make_booking('first@example.com')
+		for i in range(5):
+			rival = make_booking(f'rival{i}@example.com')
+			Player.objects.create(booking=rival, name=f'Player {i}', branch='CSE', year='TE', division='A')
+
+		self.client.get(reverse('approve_booking', args=[first.id]))
+		rejected = EmailOutbox.objects.filter(subject__startswith='Booking Rejected')
+		self.assertEqual(rejected.count(), 5)
+		self.assertIn('Player 3', rejected.get(recipients='rival3@example.com').html_body)
+
+		# One connection for the whole batch; a bad recipient fails only its own row
+		real_send = mail.get_connection().__class__.send_messages
+
+		def flaky_send(backend, messages):
+			if messages[0].to == ['rival2@example.com']:
+				raise OSError('mailbox unavailable')
+			return real_send(backend, messages)
+
+		with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', flaky_send), \
+				mock.patch('booking.outbox.get_connection', wraps=mail.get_connection) as get_conn:
+			sent, failed = deliver_due()
+		self.assertEqual(get_conn.call_count, 1)
+		self.assertEqual(sent, 5)
+		self.assertEqual([row.recipients for row in failed], ['rival2@example.com'])
+
+
+def warm_references():
+	"""Cache reference ids and the slot catalog like a long-running worker; dropped again after the test."""
+	reference.load()
+	slot_catalog.get_catalog()
+
+
+class SlotMinutesTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.addCleanup(reference.clear)
+
+	def test_minutes_populated_on_save(self):
+		booking = make_booking(time_slot='9:00-11:00', status='Approved')
+		self.assertEqual((booking.start_minute, booking.end_minute), (540, 660))
+		booking.time_slot = '04:00 PM - 06:00 PM'
+		booking.save(update_fields=['time_slot'])
+		booking.refresh_from_db()
+		self.assertEqual((booking.start_minute, booking.end_minute), (960, 1080))
+
+	def test_unparseable_slot_leaves_minutes_empty(self):
+		booking = make_booking(time_slot='Evening', status='Approved')
+		self.assertIsNone(booking.start_minute)
+		self.assertIsNone(booking.end_minute)
+
+	def test_availability_uses_overlap_query(self):
+		# 08:00-10:00 overlaps the 07:00-09:00 slot only
+		make_booking(time_slot='08:00 AM - 10:00 AM', status='Approved')
+		make_booking(time_slot='04:00 PM - 06:00 PM', sport='Cricket', status='Approved')
+		make_booking(time_slot='04:00 PM - 06:00 PM')
+		warm_references()
+
+		with self.assertNumQueries(1):
+			resp = self.client.get(reverse('check_availability'), {
+				'ground': 'Ground A', 'date': date.today().isoformat(), 'sport': 'football',
+			})
+		statuses = {s['time']: s['status'] for s in resp.json()['slots']}
+		self.assertEqual(statuses, {
+			'07:00 AM - 09:00 AM': 'booked',
+			'04:00 PM - 06:00 PM': 'available',
+		})
+
+
+class AvailabilityCacheTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.params = {'ground': 'Ground A', 'date': date.today().isoformat(), 'sport': 'Football'}
+		self.booking = Booking.objects.create(
+			student_name='Student', student_email='s@example.com', ground='Ground A', sport='Football',
+			date=date.today(), time_slot='07:00 AM - 09:00 AM', purpose='Practice', roll_number='',
+		)
+
+	def slot_statuses(self):
+		resp = self.client.get(reverse('check_availability'), self.params)
+		return [s['status'] for s in resp.json()['slots']]
+
+	def test_repeat_lookup_served_from_cache(self):
+		before = availability_cache.stats()
+		self.assertEqual(self.slot_statuses(), ['available', 'available'])
+		with self.assertNumQueries(0):
+			self.assertEqual(self.slot_statuses(), ['available', 'available'])
+		after = availability_cache.stats()
+		self.assertEqual(after['hits'] - before['hits'], 1)
+		self.assertEqual(after['misses'] - before['misses'], 1)
+
+	def test_miss_is_stored_under_the_version_it_read(self):
+		slots, key = availability_cache.get_slots(date.today(), 'Football', 'Ground A')
+		self.assertIsNone(slots)
+		# An approval commits while the miss is being computed
+		availability_cache.bump_version(date.today(), 'Football')
+		availability_cache.set_slots(key, [{'time': '07:00 AM - 09:00 AM', 'status': 'available'}])
+		self.assertEqual(availability_cache.get_slots(date.today(), 'Football', 'Ground A')[0], None)
+
+	def test_approve_and_reject_invalidate(self):
+		session = self.client.session
+		session['is_admin_logged_in'] = True
+		session.save()
+		self.slot_statuses()
+
+		with self.captureOnCommitCallbacks(execute=True):
+			self.client.get(reverse('approve_booking', args=[self.booking.id]))
+		self.assertEqual(self.slot_statuses(), ['booked', 'available'])
+
+		with self.captureOnCommitCallbacks(execute=True):
+			self.client.get(reverse('reject_booking', args=[self.booking.id]))
+		self.assertEqual(self.slot_statuses(), ['available', 'available'])
+
+	def test_entries_never_evict_the_stamps(self):
+		small = {
+			alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'cull-{alias}', 'OPTIONS': {'MAX_ENTRIES': 5}}
+			for alias in ('default', 'bulk')
+		}
+		with self.settings(CACHES=small):
+			version = availability_cache.get_version(date.today(), 'Football')
+			for n in range(20):
+				_, key = availability_cache.get_slots(date.today(), 'Football', f'Ground {n}')
+				availability_cache.set_slots(key, [])
+			self.assertEqual(availability_cache.get_version(date.today(), 'Football'), version)
+			self.assertEqual(availability_cache.get_slots(date.today(), 'Football', 'Ground 19')[0], [])
+
+
+class AvailabilityGridTests(TestCase):
+	def test_grid_marks_booked_slots_in_one_query(self):
+		today = date.today()
+		Booking.objects.create(
+			student_name='Student', student_email='s@example.com', ground='Ground B', sport='Football',
+			date=today + timedelta(days=2), time_slot='04:00 PM - 06:00 PM', purpose='Match', status='Approved',
+		)
+		Booking.objects.create(
+			student_name='Student', student_email='s@example.com', ground='Ground A', sport='Cricket',
+			date=today, time_slot='07:00 AM - 09:00 AM', purpose='Match', status='Pending',
+		)
+		warm_references()
+		self.addCleanup(reference.clear)
+
+		with self.assertNumQueries(1):
+			resp = self.client.get(reverse('availability_grid'), {
+				'start': today.isoformat(), 'end': (today + timedelta(days=3)).isoformat(),
+				'sports': 'Football,cricket',
+			})
+		data = resp.json()
+		self.assertEqual(len(data['dates']), 4)
+		self.assertEqual(data['sports'], ['cricket', 'football'])
+		self.assertEqual(data['booked']['football'], [[0, 0, 0, 0], [0, 0, 1, 0]])
+		self.assertEqual(data['booked']['cricket'], [[0, 0, 0, 0], [0, 0, 0, 0]])
+
+	def test_grid_rejects_bad_range(self):
+		resp = self.client.get(reverse('availability_grid'), {'start': '2025-01-10', 'end': '2025-01-01', 'sports': 'Football'})
+		self.assertEqual(resp.status_code, 400)
+
+
+class StudentSearchTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		StudentUser.objects.create(full_name='Rahul Patil', email='rahul.patil@vit.edu.in', roll_number='22101')
+		StudentUser.objects.create(full_name='Anita Rao', email='anita@vit.edu.in', roll_number='22102')
+		StudentUser.objects.create(full_name='Raj Kumar', email='kumar@vit.edu.in', roll_number='22103')
+		StudentUser.objects.create(full_name='', email='noname@vit.edu.in', roll_number='22104')
+
+	def search(self, q):
+		resp = self.client.get(reverse('fetch_student_data'), {'q': q})
+		return [s['full_name'] for s in resp.json()]
+
+	def test_results_ranked_name_prefix_first(self):
+		self.assertEqual(self.search('ra'), ['Rahul Patil', 'Raj Kumar', 'Anita Rao'])
+		self.assertEqual(self.search('2210'), ['Rahul Patil', 'Anita Rao', 'Raj Kumar'])
+		self.assertEqual(self.search('kumar@'), ['Raj Kumar'])
+
+	def test_single_query_once_index_is_warm(self):
+		self.search('ra')
+		with self.assertNumQueries(1):
+			self.search('pat')
+
+	def test_new_student_visible_after_save(self):
+		self.assertEqual(self.search('zoya'), [])
+		StudentUser.objects.create(full_name='Zoya Khan', email='zoya@vit.edu.in', roll_number='22105')
+		self.assertEqual(self.search('zoya'), ['Zoya Khan'])
+
+
+class StudentBookingSubmitTests(TestCase):
+	def setUp(self):
+		for i in range(1, 12):
+			StudentUser.objects.create(
+				full_name=f'Player {i}', email=f'p{i}@vit.edu.in', roll_number=f'22{i:03}',
+				branch='CSE', year='TE', division='A',
+			)
+
+	def post_booking(self, players):
+		data = {
+			'student_name': 'Organizer', 'student_email': 'organizer@vit.edu.in', 'roll_number': '',
+			'ground': 'Ground A', 'sport': 'Football', 'date': date.today().isoformat(),
+			'time_slot': '07:00 AM - 09:00 AM', 'purpose': 'Practice', 'number_of_players': len(players) or 1,
+		}
+		for i, email in enumerate(players, start=1):
+			data[f'player{i}_name'] = email
+		return self.client.post(reverse('student_booking'), data)
+
+	def test_eleven_players_resolved_in_constant_queries(self):
+		emails = [f'p{i}@vit.edu.in' for i in range(1, 11)] + ['guest@example.com']
+		for kind, value in (('ground', 'Ground A'), ('sport', 'Football'), ('time_slot', '07:00 AM - 09:00 AM')):
+			reference.get_id(kind, value, create=True)
+		warm_references()
+		self.addCleanup(reference.clear)
+		# restriction check, student lookup, booking insert, players bulk insert (+ savepoint pair)
+		with self.assertNumQueries(6):
+			resp = self.post_booking(emails)
+		self.assertRedirects(resp, reverse('booking_success'), fetch_redirect_response=False)
+		booking = Booking.objects.get()
+		names = sorted(booking.players.values_list('name', flat=True))
+		self.assertEqual(len(names), 11)
+		self.assertIn('guest@example.com', names)
+		self.assertEqual(booking.players.get(name='Player 3').branch, 'CSE')
+
+	def test_recently_booked_player_is_rejected(self):
+		Booking.objects.create(
+			student_name='Player 2', student_email='p2@vit.edu.in', ground='Ground B', sport='Cricket',
+			date=date.today(), time_slot='9:00-11:00', purpose='Match', status='Approved',
+		)
+		resp = self.post_booking(['p1@vit.edu.in', 'p2@vit.edu.in'])
+		self.assertEqual(resp.status_code, 200)
+		self.assertContains(resp, 'cannot be added: Player 2')
+		self.assertEqual(Booking.objects.count(), 1)
+
+
+class BulkBookingActionTests(TestCase):
+	def setUp(self):
+		session = self.client.session
+		session['is_admin_logged_in'] = True
+		session.save()
+
+	def post(self, action, bookings):
+		return self.client.post(
+			reverse('bulk_booking_action'),
+			{'action': action, 'booking_ids': [b.id for b in bookings]},
+			HTTP_ACCEPT='application/json',
+		)
+
+	def test_bulk_approve_applies_fcfs_per_slot(self):
+		morning = [make_booking(f'm{i}@example.com') for i in range(3)]
+		evening = [make_booking(f'e{i}@example.com', time_slot='04:00 PM - 06:00 PM') for i in range(2)]
+
+		# Selecting a newer request still approves the oldest one in its slot
+		resp = self.post('approve', [morning[2], evening[0]])
+		data = resp.json()
+		self.assertEqual(sorted(data['approved']), sorted([morning[0].id, evening[0].id]))
+		self.assertEqual(sorted(data['rejected']), sorted([morning[1].id, morning[2].id, evening[1].id]))
+		self.assertEqual(AllotedGroundBooking.objects.count(), 2)
+		self.assertEqual(EmailOutbox.objects.count(), 5)
+
+	def test_slot_already_taken_rejects_pending(self):
+		first = make_booking('first@example.com')
+		self.post('approve', [first])
+		late = make_booking('late@example.com')
+		data = self.post('approve', [late]).json()
+		self.assertEqual(data, {'approved': [], 'rejected': [late.id]})
+
+	def test_bulk_reject(self):
+		bookings = [make_booking(f'r{i}@example.com', sport=f'Sport{i}') for i in range(3)]
+		data = self.post('reject', bookings).json()
+		self.assertEqual(sorted(data['rejected']), sorted(b.id for b in bookings))
+		self.assertFalse(Booking.objects.exclude(status='Rejected').exists())
+
+	def test_requires_admin(self):
+		self.client.session.flush()
+		self.client.cookies.clear()
+		resp = self.post('approve', [make_booking('x@example.com')])
+		self.assertEqual(resp.status_code, 403)
+
+
+class AllocateSlotsCommandTests(TestCase):
+	def setUp(self):
+		self.today = date.today()
+		self.tomorrow = self.today + timedelta(days=1)
+		self.first = make_booking('a@example.com', date=self.today)
+		self.second = make_booking('b@example.com', date=self.today)
+		self.taken = make_booking('c@example.com', date=self.tomorrow, status='Approved')
+		self.late = make_booking('d@example.com', date=self.tomorrow)
+		self.outside = make_booking('e@example.com', date=self.today + timedelta(days=5))
+
+	def run_command(self, *args):
+		out = StringIO()
+		call_command('allocate_slots', '--start', self.today.isoformat(),
+					 '--end', self.tomorrow.isoformat(), *args, stdout=out)
+		return out.getvalue()
+
+	def test_dry_run_prints_plan_without_writing(self):
+		out = self.run_command('--dry-run')
+		self.assertIn(f'approve #{self.first.id}', out)
+		self.assertIn('already taken, reject 1', out)
+		self.assertIn('decide=', out)
+		self.assertEqual(Booking.objects.filter(status='Pending').count(), 4)
+		self.assertFalse(EmailOutbox.objects.exists())
+
+	def test_allocates_range(self):
+		self.run_command()
+		statuses = dict(Booking.objects.values_list('id', 'status'))
+		self.assertEqual(statuses[self.first.id], 'Approved')
+		self.assertEqual(statuses[self.second.id], 'Rejected')
+		self.assertEqual(statuses[self.late.id], 'Rejected')
+		self.assertEqual(statuses[self.outside.id], 'Pending')
+		self.assertEqual(AllotedGroundBooking.objects.get().booking_id, self.first.id)
+		self.assertEqual(EmailOutbox.objects.count(), 3)
+
+
+class SlotLockTests(TestCase):
+	def test_lock_id_ignores_sport_case(self):
+		day = date.today()
+		self.assertEqual(slot_locks.lock_id((day, 'Football', '07:00 AM - 09:00 AM')),
+						 slot_locks.lock_id((day, 'football', '07:00 AM - 09:00 AM')))
+		self.assertNotEqual(slot_locks.lock_id((day, 'football', '07:00 AM - 09:00 AM')),
+							slot_locks.lock_id((day, 'football', '04:00 PM - 06:00 PM')))
+
+	def test_approve_locks_only_pending_rows(self):
+		day = date.today()
+		for status in ('Rejected', 'Rejected', 'Pending'):
+			Booking.objects.create(
+				student_name='s', student_email='s@example.com', ground='Ground A', sport='Football',
+				date=day, time_slot='07:00 AM - 09:00 AM', purpose='Practice', roll_number='', status=status,
+			)
+		pending = Booking.objects.get(status='Pending')
+		with mock.patch('django.db.models.query.QuerySet.select_for_update', autospec=True,
+						side_effect=lambda qs, *a, **kw: qs) as sfu:
+			allocation.approve([pending])
+		locked = [call.args[0] for call in sfu.call_args_list if call.args[0].model is Booking]
+		self.assertEqual(len(locked), 1)
+		self.assertEqual([b.id for b in locked[0]], [pending.id])
+
+
+class ParallelApprovalTests(TransactionTestCase):
+	def test_parallel_approvals_keep_one_winner_per_slot(self):
+		if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+			self.skipTest('shared-cache in-memory SQLite fails concurrent writers instead of waiting')
+		day = date.today() + timedelta(days=1)
+		slots = ['07:00 AM - 09:00 AM', '04:00 PM - 06:00 PM']
+		bookings = [
+			Booking.objects.create(
+				student_name=f's{i}', student_email=f's{i}@example.com', ground='Ground A', sport='Football',
+				date=day, time_slot=slot, purpose='Practice', roll_number='',
+			)
+			for slot in slots for i in range(4)
+		]
+		barrier = threading.Barrier(len(bookings))
+		errors = []
+
+		def approve(booking):
+			try:
+				barrier.wait()
+				allocation.approve([booking])
+			except Exception as exc:
+				errors.append(exc)
+			finally:
+				connection.close()
+
+		threads = [threading.Thread(target=approve, args=(b,)) for b in bookings]
+		for t in threads:
+			t.start()
+		for t in threads:
+			t.join()
+
+		self.assertEqual(errors, [])
+		for slot in slots:
+			statuses = list(Booking.objects.filter(time_slot=slot).values_list('status', flat=True))
+			self.assertEqual(statuses.count('Approved'), 1)
+			self.assertEqual(statuses.count('Rejected'), 3)
+		self.assertEqual(AllotedGroundBooking.objects.count(), 2)
+
+
+class AdminDashboardPendingQueueTests(TestCase):
+	def setUp(self):
+		session = self.client.session
+		session['is_admin_logged_in'] = True
+		session.save()
+
+	def add_pending(self, n):
+		for i in range(n):
+			booking = Booking.objects.create(
+				student_name=f'Student {i}', student_email=f's{i}@example.com', ground='Ground A', sport='Football',
+				date=date.today(), time_slot='07:00 AM - 09:00 AM', purpose='Practice', roll_number='',
+			)
+			Player.objects.bulk_create([Player(booking=booking, name=f'P{i}-{j}', branch='CSE', year='TE', division='A') for j in range(3)])
+
+	def render(self, **params):
+		with CaptureQueriesContext(connection) as queries:
+			resp = self.client.get(reverse('custom_admin_dashboard'), params)
+		self.assertEqual(resp.status_code, 200)
+		return resp, len(queries)
+
+	def test_queries_and_rows_stay_flat_as_backlog_grows(self):
+		self.add_pending(5)
+		resp, small = self.render()
+		self.add_pending(60)
+		resp, large = self.render()
+		self.assertEqual(small, large)
+		self.assertEqual(len(resp.context['bookings'].object_list), 25)
+		self.assertContains(resp, '65 Pending')
+		players = resp.context['pending_players']
+		self.assertEqual(len(players), 25)
+		self.assertTrue(all(len(p) == 3 for p in players.values()))
+		self.assertEqual(resp.context['bookings'][0].player_count, 3)
+
+	def test_allotments_use_cursor_pages(self):
+		for i in range(12):
+			AllotedGroundBooking.objects.create(
+				date=date.today() - timedelta(days=i % 3), ground='Ground A', time_slot='07:00 AM - 09:00 AM',
+				allotted_to=f'Student {i}', roll_number='',
+			)
+		resp, _ = self.render()
+		first = resp.context['allotments']
+		self.assertEqual(len(first), 10)
+		self.assertContains(resp, '10+ Active')
+		resp, _ = self.render(cursor=first.next_cursor)
+		self.assertEqual(len(resp.context['allotments']), 2)
+		self.assertTrue(resp.context['allotments'].has_previous)
+
+	def test_second_page_keeps_filters(self):
+		self.add_pending(30)
+		resp, _ = self.render(pending_page=2, ground='Ground A')
+		self.assertEqual(len(resp.context['bookings'].object_list), 5)
+		self.assertContains(resp, '?pending_page=1&amp;ground=Ground+A')
+
+
+class ChangeFeedTests(TestCase):
+	def setUp(self):
+		session = self.client.session
+		session['is_admin_logged_in'] = True
+		session.save()
+
+	def age(self, *models):
+		# Written well before the dashboard was rendered
+		for model in models:
+			model.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+	def dashboard_cursor(self, **params):
+		resp = self.client.get(reverse('custom_admin_dashboard'), params)
+		return resp.context['change_feed']
+
+	def changes(self, feed):
+		resp = self.client.get(f"{feed['url']}&{urlencode({'since': feed['cursor']})}")
+		self.assertEqual(resp.status_code, 200)
+		return resp.json()
+
+	def test_decisions_arrive_as_deltas(self):
+		first, second = make_booking('a@example.com'), make_booking('b@example.com')
+		untouched = make_booking('c@example.com', time_slot='04:00 PM - 06:00 PM')
+		self.age(Booking)
+		feed = self.dashboard_cursor()
+		self.assertEqual(self.changes(feed)['bookings'], [])
+
+		self.client.post(reverse('bulk_booking_action'), {'action': 'approve', 'booking_ids': [second.id]}, HTTP_ACCEPT='application/json')
+		data = self.changes(feed)
+		self.assertFalse(data['reload'])
+		self.assertEqual(data['pending_count'], 1)
+		# FCFS approved the older request and rejected the other; neither is pending any more
+		self.assertEqual(sorted((b['id'], b['status'], b['html']) for b in data['bookings']), [
+			(first.id, 'Approved', None), (second.id, 'Rejected', None),
+		])
+		self.assertNotIn(untouched.id, [b['id'] for b in data['bookings']])
+		[allotment] = data['allotments']
+		self.assertEqual(allotment['date'], date.today().isoformat())
+		self.assertIn(f'data-allotment-id="{allotment["id"]}"', allotment['html'])
+
+	def test_new_requests_carry_their_row(self):
+		feed = self.dashboard_cursor()
+		booking = make_booking('new@example.com')
+		[row] = self.changes(feed)['bookings']
+		self.assertEqual(row['status'], 'Pending')
+		self.assertIn(f'data-booking-id="{booking.id}"', row['html'])
+
+	def test_feed_keeps_the_dashboard_filters(self):
+		feed = self.dashboard_cursor(ground='Ground B')
+		self.assertIn('ground=Ground+B', feed['url'])
+		make_booking('a@example.com')
+		wanted = make_booking('b@example.com', ground='Ground B')
+		data = self.changes(feed)
+		self.assertEqual([b['id'] for b in data['bookings']], [wanted.id])
+		self.assertEqual(data['pending_count'], 1)
+
+	def test_too_many_changes_asks_for_a_reload(self):
+		feed = self.dashboard_cursor()
+		for i in range(3):
+			make_booking(f's{i}@example.com')
+		with mock.patch.object(change_feed, 'MAX_ROWS', 2):
+			data = self.changes(feed)
+		self.assertEqual(data['reload'], True)
+		self.assertNotIn('bookings', data)
+
+	def test_needs_admin_and_a_valid_cursor(self):
+		self.assertEqual(self.client.get(reverse('admin_changes'), {'since': 'forged'}).status_code, 400)
+		self.client.session.flush()
+		self.client.cookies.clear()
+		feed_cursor = change_feed.make_cursor()
+		self.assertEqual(self.client.get(reverse('admin_changes'), {'since': feed_cursor}).status_code, 403)
+
+
+class KeysetPaginationTests(TestCase):
+	def setUp(self):
+		self.email = 'keyset@example.com'
+		# Several bookings share a date so the created_at/id tie-breakers matter
+		for i in range(25):
+			Booking.objects.create(
+				student_name='Keyset', student_email=self.email, ground='Ground A', sport='Football',
+				date=date.today() - timedelta(days=i // 4), time_slot='07:00 AM - 09:00 AM', purpose='Practice',
+			)
+		self.expected = list(Booking.objects.order_by('-date', '-created_at', '-id').values_list('id', flat=True))
+		self.qs = Booking.objects.filter(student_email=self.email)
+
+	def test_walks_forward_and_back(self):
+		ordering = ('-date', '-created_at', '-id')
+		pages = [paginate(self.qs, ordering, per_page=10)]
+		while pages[-1].has_next:
+			pages.append(paginate(self.qs, ordering, pages[-1].next_cursor, per_page=10))
+		self.assertEqual([b.id for page in pages for b in page], self.expected)
+		self.assertEqual([len(p) for p in pages], [10, 10, 5])
+		self.assertFalse(pages[0].has_previous)
+
+		back = paginate(self.qs, ordering, pages[2].previous_cursor, per_page=10)
+		self.assertEqual([b.id for b in back], [b.id for b in pages[1]])
+		self.assertTrue(back.has_next and back.has_previous)
+
+	def test_tampered_cursor_falls_back_to_first_page(self):
+		page = paginate(self.qs, ('-date', '-created_at', '-id'), 'not-a-cursor', per_page=10)
+		self.assertEqual([b.id for b in page], self.expected[:10])
+
+	def test_deep_page_costs_the_same_as_first(self):
+		session = self.client.session
+		session['student_email'] = self.email
+		session.save()
+		url = reverse('student_history')
+		archive.horizon()
+		with CaptureQueriesContext(connection) as first:
+			resp = self.client.get(url)
+		cursor = resp.context['page_obj'].next_cursor
+		with CaptureQueriesContext(connection) as second:
+			resp = self.client.get(url, {'cursor': cursor})
+		self.assertEqual(len(first), len(second))
+		self.assertFalse(any('COUNT(' in q['sql'] or 'OFFSET' in q['sql'] for q in second.captured_queries))
+		self.assertEqual([b.id for b in resp.context['page_obj']], self.expected[10:20])
+
+
+class ReferenceTableTests(TestCase):
+	def setUp(self):
+		self.addCleanup(reference.clear)
+
+	def test_save_points_at_shared_reference_rows(self):
+		first = make_booking()
+		second = make_booking(sport='football', ground='ground a')
+		self.assertEqual(first.sport_ref_id, second.sport_ref_id)
+		self.assertEqual(first.ground_ref_id, second.ground_ref_id)
+		self.assertEqual(first.sport_ref.name, 'Football')
+		self.assertEqual((first.time_slot_ref.start_minute, first.time_slot_ref.end_minute), (420, 540))
+		self.assertIsNone(make_booking(sport='').sport_ref_id)
+
+	def test_lookups_are_cached_once_loaded(self):
+		make_booking()
+		warm_references()
+		with self.assertNumQueries(0):
+			sport_id = reference.get_id('sport', 'FOOTBALL')
+			self.assertEqual(reference.names('ground'), ['Ground A'])
+		self.assertEqual(sport_id, Sport.objects.get().id)
+
+	def test_ids_created_in_a_rolled_back_transaction_are_not_cached(self):
+		warm_references()
+		# TestCase never commits, so the new row must not reach the process cache
+		reference.get_id('sport', 'Hockey', create=True)
+		self.assertNotIn('hockey', reference._tables['sport'])
+
+	def test_names_created_by_another_worker_appear(self):
+		make_booking()
+		warm_references()
+		self.assertEqual(reference.names('ground'), ['Ground A'])
+		# Another worker creates a ground and commits; this process never saw the row
+		Ground.objects.create(name='Ground C')
+		reference._bump('ground')
+		self.assertEqual(reference.names('ground'), ['Ground A', 'Ground C'])
+
+	def test_startup_warm_survives_a_database_without_the_tables(self):
+		make_booking()
+		with mock.patch.object(Ground.objects, 'values_list', side_effect=DatabaseError('no such table')), \
+				self.assertLogs('booking.reference', 'WARNING'):
+			reference.warm()
+		self.assertEqual(reference._tables, {})
+		self.assertEqual(reference.get_id('ground', 'Ground A'), Booking.objects.get().ground_ref_id)
+
+	def test_dashboard_ground_filter_uses_reference_ids(self):
+		make_booking(ground='Ground A')
+		make_booking(ground='Ground B', time_slot='04:00 PM - 06:00 PM')
+		session = self.client.session
+		session['is_admin_logged_in'] = True
+		session.save()
+		resp = self.client.get(reverse('custom_admin_dashboard'), {'ground': 'ground b'})
+		self.assertEqual([b.ground for b in resp.context['bookings']], ['Ground B'])
+		self.assertEqual(resp.context['grounds'], ['Ground A', 'Ground B'])
+
+
+class SlotCatalogTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		# Start from no configured slots: migration 0018 seeds the defaults as bookable
+		TimeSlot.objects.update(bookable=False)
+		slot_catalog.invalidate()
+		self.addCleanup(slot_catalog.invalidate)
+
+	def test_defaults_when_nothing_is_configured(self):
+		catalog = slot_catalog.get_catalog()
+		self.assertEqual([s.label for s in catalog], ['07:00 AM - 09:00 AM', '04:00 PM - 06:00 PM'])
+		self.assertEqual(catalog.get('04:00 PM - 06:00 PM')[1:], (960, 1080))
+		self.assertIsNone(catalog.get('9:00-11:00'))
+
+	def test_database_config_with_sport_and_ground_sets(self):
+		evening = TimeSlot.objects.create(label='05:00 PM - 07:00 PM', bookable=True, position=1)
+		morning = TimeSlot.objects.create(label='06:00 AM - 08:00 AM', bookable=True, position=0)
+		TimeSlot.objects.create(label='9:00-11:00')  # recorded from a booking, not offered
+		evening.sports.add(Sport.objects.create(name='Cricket'))
+		morning.grounds.add(Ground.objects.create(name='Ground B'))
+
+		catalog = slot_catalog.get_catalog()
+		self.assertEqual([s.label for s in catalog], ['06:00 AM - 08:00 AM', '05:00 PM - 07:00 PM'])
+		self.assertEqual([s.label for s in catalog.slots_for('football', 'Ground B')], ['06:00 AM - 08:00 AM'])
+		self.assertEqual([s.label for s in catalog.slots_for('CRICKET', 'Ground A')], ['05:00 PM - 07:00 PM'])
+		with self.assertNumQueries(0):
+			self.assertIs(slot_catalog.get_catalog(), catalog)
+
+		resp = self.client.get(reverse('check_availability'), {'ground': 'Ground A', 'date': '', 'sport': 'cricket'})
+		self.assertEqual([s['time'] for s in resp.json()['slots']], ['05:00 PM - 07:00 PM'])
+
+	def test_form_offers_and_validates_catalog_slots(self):
+		from .forms import BookingForm
+		form = BookingForm()
+		self.assertEqual([v for v, _ in form.fields['time_slot'].widget.choices][1:],
+						 ['07:00 AM - 09:00 AM', '04:00 PM - 06:00 PM'])
+		form = BookingForm(data={
+			'student_name': 'S', 'student_email': 's@example.com', 'ground': 'Ground A', 'date': date.today(),
+			'time_slot': '9:00-11:00', 'purpose': 'Practice', 'number_of_players': 1,
+		})
+		self.assertIn('time_slot', form.errors)
+
+	def test_form_rejects_a_slot_not_offered_for_the_sport_or_ground(self):
+		from .forms import BookingForm
+		evening = TimeSlot.objects.create(label='05:00 PM - 07:00 PM', bookable=True, position=1)
+		morning = TimeSlot.objects.create(label='06:00 AM - 08:00 AM', bookable=True, position=0)
+		evening.sports.add(Sport.objects.create(name='Cricket'))
+		morning.grounds.add(Ground.objects.create(name='Ground B'))
+		slot_catalog.invalidate()
+
+		def errors(sport, ground, time_slot):
+			return BookingForm(data={
+				'student_name': 'S', 'student_email': 's@example.com', 'ground': ground, 'sport': sport,
+				'date': date.today(), 'time_slot': time_slot, 'purpose': 'Practice', 'number_of_players': 1,
+			}).errors
+
+		self.assertIn('time_slot', errors('Football', 'Ground A', '05:00 PM - 07:00 PM'))
+		self.assertIn('time_slot', errors('Cricket', 'Ground A', '06:00 AM - 08:00 AM'))
+		self.assertNotIn('time_slot', errors('cricket', 'Ground A', '05:00 PM - 07:00 PM'))
+		self.assertNotIn('time_slot', errors('Football', 'Ground B', '06:00 AM - 08:00 AM'))
+
+
+class SessionEngineTests(TestCase):
+	def test_cached_db_serves_logged_in_requests_without_queries(self):
+		session = self.client.session
+		session['student_email'] = 'student@example.com'
+		session.save()
+		self.client.get(reverse('student_dashboard'))
+		with self.assertNumQueries(0):
+			resp = self.client.get(reverse('student_dashboard'))
+		self.assertEqual(resp.status_code, 200)
+
+	def test_signed_cookie_engine_adopts_live_database_session(self):
+		from django.contrib.sessions.backends.db import SessionStore as DatabaseStore
+		old = DatabaseStore()
+		old['student_email'] = 'student@example.com'
+		old.save()
+
+		with self.settings(SESSION_ENGINE='booking.signed_cookie_sessions'):
+			self.client.cookies['sessionid'] = old.session_key
+			resp = self.client.get(reverse('student_dashboard'))
+			self.assertEqual(resp.status_code, 200)
+			signed = resp.cookies['sessionid'].value
+			self.assertNotEqual(signed, old.session_key)
+
+			# The re-issued cookie carries the data itself
+			with self.assertNumQueries(0):
+				resp = self.client.get(reverse('student_dashboard'))
+			self.assertEqual(resp.status_code, 200)
+
+	def test_signed_cookie_engine_ignores_unknown_keys(self):
+		with self.settings(SESSION_ENGINE='booking.signed_cookie_sessions'):
+			self.client.cookies['sessionid'] = 'x' * 32
+			resp = self.client.get(reverse('student_dashboard'))
+		self.assertRedirects(resp, reverse('student_login'), fetch_redirect_response=False)
+
+
+class OTPStoreTests(TestCase):
+	def make_otp(self, email, expires_in):
+		return OTPVerification.objects.create(
+			email=email, otp='123456', expires_at=timezone.now() + expires_in,
+			full_name='New Student', roll_number='R9', branch='CSE', year='SE', division='A',
+			password='pw12345!',
+		)
+
+	def test_verify_consumes_otp_with_keyed_lookup(self):
+		self.make_otp('new@example.com', timedelta(minutes=10))
+		session = self.client.session
+		session['signup_email'] = 'new@example.com'
+		session.save()
+
+		resp = self.client.post(reverse('verify_otp'), {'otp': '123456'})
+		self.assertRedirects(resp, reverse('student_login'), fetch_redirect_response=False)
+		self.assertTrue(StudentUser.objects.filter(email='new@example.com').exists())
+		self.assertFalse(OTPVerification.objects.filter(email='new@example.com').exists())
+
+	def test_new_code_replaces_previous_one(self):
+		StudentUser.objects.create(email='old@example.com', full_name='Old Student', password='x')
+		for _ in range(2):
+			self.client.post(reverse('forgot_password'), {'email': 'old@example.com'})
+		self.assertEqual(OTPVerification.objects.filter(email='old@example.com').count(), 1)
+
+	def test_purge_deletes_expired_codes_in_batches(self):
+		for i in range(5):
+			self.make_otp(f'stale{i}@example.com', -timedelta(hours=2))
+		self.make_otp('recent@example.com', -timedelta(minutes=5))
+		self.make_otp('live@example.com', timedelta(minutes=10))
+
+		out = StringIO()
+		call_command('purge_otps', batch_size=2, stdout=out)
+		self.assertIn('deleted=5 batches=3', out.getvalue())
+		self.assertEqual(
+			set(OTPVerification.objects.values_list('email', flat=True)),
+			{'recent@example.com', 'live@example.com'},
+		)
+
+
+class ArchiveTests(TestCase):
+	def setUp(self):
+		self.email = 'archive@example.com'
+		cache.delete(archive.HORIZON_KEY)
+		self.addCleanup(cache.delete, archive.HORIZON_KEY)
+		self.today = date.today()
+		for i in range(20):
+			booking = Booking.objects.create(
+				student_name='Archive', student_email=self.email, ground='Ground A', sport='Football',
+				date=self.today - timedelta(days=30 * i), time_slot='07:00 AM - 09:00 AM', purpose='Practice',
+				status='Approved',
+			)
+			Player.objects.create(booking=booking, name=f'Player {i}', branch='CSE', year='TE', division='A')
+			AllotedGroundBooking.objects.create(
+				booking=booking, date=booking.date, ground='Ground A', time_slot=booking.time_slot,
+				allotted_to='Archive', roll_number='R1',
+			)
+		self.expected = list(Booking.objects.order_by('-date', '-created_at', '-id').values_list('id', flat=True))
+
+	def login(self):
+		session = self.client.session
+		session['student_email'] = self.email
+		session.save()
+
+	def test_command_moves_old_rows_in_batches(self):
+		cutoff = self.today - timedelta(days=200)
+		old_ids = set(Booking.objects.filter(date__lt=cutoff).values_list('id', flat=True))
+		out = StringIO()
+		call_command('archive_bookings', before=cutoff, batch_size=5, stdout=out)
+
+		self.assertIn(f'bookings={len(old_ids)} players={len(old_ids)} allotments={len(old_ids)}', out.getvalue())
+		self.assertFalse(Booking.objects.filter(date__lt=cutoff).exists())
+		self.assertFalse(AllotedGroundBooking.objects.filter(date__lt=cutoff).exists())
+		self.assertEqual(set(ArchivedBooking.objects.values_list('id', flat=True)), old_ids)
+		self.assertEqual(set(ArchivedPlayer.objects.values_list('booking_id', flat=True)), old_ids)
+		self.assertEqual(set(ArchivedAllotment.objects.values_list('booking_id', flat=True)), old_ids)
+		self.assertEqual(archive.horizon(), max(ArchivedBooking.objects.values_list('date', flat=True)))
+
+	def test_horizon_cached_from_uncommitted_state_is_replaced_on_commit(self):
+		raise_horizon = archive._raise_horizon
+
+		def evicted_mid_batch(day):
+			raise_horizon(day)
+			# The key is culled and a reader that cannot see the batch yet caches the old horizon
+			cache.delete(archive.HORIZON_KEY)
+			cache.add(archive.HORIZON_KEY, date.min, None)
+
+		with mock.patch.object(archive, '_raise_horizon', evicted_mid_batch), self.captureOnCommitCallbacks(execute=True):
+			archive.archive_before(self.today - timedelta(days=200))
+		self.assertEqual(archive.horizon(), max(ArchivedBooking.objects.values_list('date', flat=True)))
+
+	def test_history_reads_archive_only_when_paging_that_far_back(self):
+		archive.archive_before(self.today - timedelta(days=400))
+		self.login()
+		url = reverse('student_history')
+
+		with CaptureQueriesContext(connection) as queries:
+			resp = self.client.get(url)
+		self.assertFalse(any('archivedbooking' in q['sql'] for q in queries.captured_queries))
+
+		pages = [resp.context['page_obj']]
+		while pages[-1].has_next:
+			resp = self.client.get(url, {'cursor': pages[-1].next_cursor})
+			pages.append(resp.context['page_obj'])
+		self.assertEqual([b.id for page in pages for b in page], self.expected)
+		self.assertEqual(len(pages), 2)
+		# The last page mixes live and archived bookings, with archived players
+		self.assertContains(resp, 'Player 13')
+		self.assertContains(resp, 'Player 19')
+
+		back = self.client.get(url, {'cursor': pages[1].previous_cursor}).context['page_obj']
+		self.assertEqual([b.id for b in back], [b.id for b in pages[0]])
+
+	def test_small_pages_walk_across_the_archive_boundary_both_ways(self):
+		archive.archive_before(self.today - timedelta(days=250))
+		pages = [archive.history_page(self.email, per_page=3)]
+		while pages[-1].has_next:
+			pages.append(archive.history_page(self.email, cursor=pages[-1].next_cursor, per_page=3))
+		self.assertEqual([b.id for page in pages for b in page], self.expected)
+
+		for i in range(len(pages) - 1, 0, -1):
+			back = archive.history_page(self.email, cursor=pages[i].previous_cursor, per_page=3)
+			self.assertEqual([b.id for b in back], [b.id for b in pages[i - 1]])
+
+
+@override_settings(METRICS_FLUSH_INTERVAL=0, METRICS_TOKEN='scrape-token')
+class MetricsTests(TestCase):
+	def scrape(self):
+		resp = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-token')
+		self.assertEqual(resp.status_code, 200)
+		samples = {}
+		for line in resp.content.decode().splitlines():
+			if line and not line.startswith('#'):
+				name, value = line.rsplit(' ', 1)
+				samples[name] = float(value)
+		return samples
+
+	def test_requires_admin_session_or_token(self):
+		self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+		resp = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong')
+		self.assertEqual(resp.status_code, 403)
+
+		session = self.client.session
+		session['is_admin_logged_in'] = True
+		session.save()
+		resp = self.client.get(reverse('metrics'))
+		self.assertEqual(resp.status_code, 200)
+		self.assertIn('# TYPE booking_http_request_duration_seconds histogram', resp.content.decode())
+
+	def test_records_latency_and_queries_per_url_name(self):
+		before = self.scrape()
+		for _ in range(2):
+			self.client.get(reverse('student_history'))
+		after = self.scrape()
+
+		count = 'booking_http_request_duration_seconds_count{view="student_history"}'
+		inf = 'booking_http_request_duration_seconds_bucket{view="student_history",le="+Inf"}'
+		self.assertEqual(after[count] - before.get(count, 0), 2)
+		self.assertEqual(after[inf], after[count])
+		self.assertIn('booking_db_queries_total{view="student_history"}', after)
+
+	def test_counts_decisions_and_smtp_sends(self):
+		bookings = [
+			Booking.objects.create(
+				student_name=f'S{i}', student_email=f's{i}@example.com', ground='Ground A', sport='Football',
+				date=date.today(), time_slot='07:00 AM - 09:00 AM', purpose='Match',
+			)
+			for i in range(3)
+		]
+		before = self.scrape()
+		with self.captureOnCommitCallbacks(execute=True):
+			allocation.approve(bookings[:1])
+		sent, failed = deliver_due(batch_size=10)
+		after = self.scrape()
+
+		def delta(name):
+			return after[name] - before.get(name, 0)
+		self.assertEqual(delta('booking_decisions_total{decision="approved"}'), 1)
+		self.assertEqual(delta('booking_decisions_total{decision="rejected"}'), 2)
+		self.assertEqual(delta('booking_smtp_send_duration_seconds_count'), sent + len(failed))
+		self.assertEqual(delta('booking_smtp_failures_total'), len(failed))
+
+	def test_flushes_from_each_process_add_up(self):
+		before = self.scrape()
+		for amount in (2, 5):  # two workers' deltas
+			metrics.inc('booking_decisions_total', ('approved',), amount)
+			metrics.flush()
+		for view in metrics.view_names():
+			metrics.observe('booking_http_request_duration_seconds', 0.01, (view,))
+		after = self.scrape()  # flushes this process's pending counts first
+
+		approved = 'booking_decisions_total{decision="approved"}'
+		self.assertEqual(after[approved] - before.get(approved, 0), 7)
+		for view in metrics.view_names():
+			count = f'booking_http_request_duration_seconds_count{{view="{view}"}}'
+			self.assertGreaterEqual(after[count] - before.get(count, 0), 1)
+		self.assertTrue(MetricCounter.objects.filter(key__startswith='metrics:booking_http_request_duration_seconds:').exists())
+
+	def test_requests_in_a_transaction_leave_the_flush_for_later(self):
+		metrics.inc('booking_decisions_total', ('rejected',))
+		with self.settings(METRICS_FLUSH_INTERVAL=0), self.assertNumQueries(0):
+			metrics.maybe_flush()  # a TestCase runs inside a transaction
+		metrics.flush()
+		self.assertTrue(MetricCounter.objects.filter(key='metrics:booking_decisions_total:rejected:v').exists())
+
+
+class QueryBudgetTests(QueryBudgetAssertions, TestCase):
+	def setUp(self):
+		cache.clear()
+		for kind, value in (('ground', 'Ground A'), ('sport', 'Football'), ('time_slot', '07:00 AM - 09:00 AM')):
+			reference.get_id(kind, value, create=True)
+		warm_references()
+		self.addCleanup(reference.clear)
+		for i in range(30):
+			booking = Booking.objects.create(
+				student_name=f'Student {i}', student_email='budget@example.com', ground='Ground A', sport='Football',
+				date=date.today() + timedelta(days=i % 3), time_slot='07:00 AM - 09:00 AM', purpose='Practice',
+				roll_number='',
+			)
+			Player.objects.bulk_create([Player(booking=booking, name=f'P{i}-{j}', branch='CSE', year='TE', division='A') for j in range(3)])
+
+	def login(self, **values):
+		session = self.client.session
+		session.update(values)
+		session.save()
+
+	def test_check_availability(self):
+		params = {'ground': 'Ground A', 'date': date.today().isoformat(), 'sport': 'Football'}
+		with self.assertWithinQueryBudget('check_availability'):
+			self.assertEqual(self.client.get(reverse('check_availability'), params).status_code, 200)
+
+	def test_custom_admin_dashboard(self):
+		self.login(is_admin_logged_in=True)
+		with self.assertWithinQueryBudget('custom_admin_dashboard'):
+			self.assertEqual(self.client.get(reverse('custom_admin_dashboard')).status_code, 200)
+
+	def test_admin_changes(self):
+		self.login(is_admin_logged_in=True)
+		since = change_feed.make_cursor(timezone.now() - timedelta(minutes=1))
+		with self.assertWithinQueryBudget('admin_changes'):
+			resp = self.client.get(reverse('admin_changes'), {'since': since})
+		self.assertEqual(len(resp.json()['bookings']), 30)
+
+	def test_student_history(self):
+		self.login(student_email='budget@example.com')
+		with self.assertWithinQueryBudget('student_history'):
+			self.assertEqual(self.client.get(reverse('student_history')).status_code, 200)
+
+	def test_student_booking_with_a_full_team(self):
+		StudentUser.objects.bulk_create([
+			StudentUser(full_name=f'Player {i}', email=f'p{i}@vit.edu.in', branch='CSE', year='TE', division='A')
+			for i in range(1, 12)
+		])
+		data = {
+			'student_name': 'Organizer', 'student_email': 'organizer@vit.edu.in', 'roll_number': '',
+			'ground': 'Ground A', 'sport': 'Football', 'date': date.today().isoformat(),
+			'time_slot': '07:00 AM - 09:00 AM', 'purpose': 'Practice', 'number_of_players': 11,
+		}
+		data.update({f'player{i}_name': f'p{i}@vit.edu.in' for i in range(1, 12)})
+		with self.assertWithinQueryBudget('student_booking'):
+			resp = self.client.post(reverse('student_booking'), data)
+		self.assertRedirects(resp, reverse('booking_success'), fetch_redirect_response=False)
+
+	def test_over_budget_request_is_logged_with_its_sql(self):
+		self.login(student_email='budget@example.com')
+		with self.settings(QUERY_BUDGETS={'student_history': {'queries': 0}}):
+			with self.assertLogs('booking.query_budget', 'WARNING') as logs:
+				self.client.get(reverse('student_history'))
+		self.assertIn('Query budget exceeded for student_history', logs.output[0])
+		self.assertIn('FROM "booking_booking"', logs.output[0])
+		self.assertIn('views.py', logs.output[0])
+
+	def test_assertion_fails_past_the_budget(self):
+		with self.settings(QUERY_BUDGETS={'student_history': {'queries': 1}}):
+			with self.assertRaises(AssertionError):
+				with self.assertWithinQueryBudget('student_history'):
+					list(Booking.objects.all())
+					list(Player.objects.all())
+
+
+class PageCacheTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		caches['bulk'].clear()
+
+	def login_student(self, email='jane.doe@vit.edu.in'):
+		session = self.client.session
+		session['student_email'] = email
+		session.save()
+
+	def test_revisit_is_a_304_and_other_visitors_skip_rendering(self):
+		first = self.client.get(reverse('rules_regulations'))
+		self.assertEqual(first.status_code, 200)
+		self.assertIn('private', first['Cache-Control'])
+		self.assertIn('Cookie', first['Vary'])
+		again = self.client.get(reverse('rules_regulations'), HTTP_IF_NONE_MATCH=first['ETag'])
+		self.assertEqual(again.status_code, 304)
+		since = self.client.get(reverse('rules_regulations'), HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+		self.assertEqual(since.status_code, 304)
+
+		other = Client().get(reverse('rules_regulations'))
+		self.assertEqual(other.content, first.content)
+		self.assertEqual(other.templates, [])  # served from the cache
+
+	def test_login_state_and_name_are_part_of_the_key(self):
+		anonymous = self.client.get(reverse('home'))
+		self.login_student()
+		student = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=anonymous['ETag'])
+		self.assertEqual(student.status_code, 200)
+		self.assertNotEqual(student['ETag'], anonymous['ETag'])
+		self.assertContains(student, 'History')
+
+		jane = self.client.get(reverse('student_dashboard'))
+		self.assertContains(jane, 'Welcome, Jane!')
+		self.assertEqual(self.client.get(reverse('student_dashboard'), HTTP_IF_NONE_MATCH=jane['ETag']).status_code, 304)
+		again = self.client.get(reverse('student_dashboard'))
+		self.assertNotEqual(again.templates, [])  # per-student bodies are not stored
+		self.login_student('sam.roe@vit.edu.in')
+		self.assertContains(self.client.get(reverse('student_dashboard')), 'Welcome, Sam!')
+
+	def test_login_redirect_and_pending_messages_are_not_cached(self):
+		resp = self.client.get(reverse('student_dashboard'))
+		self.assertRedirects(resp, reverse('student_login'), fetch_redirect_response=False)
+		self.assertFalse(resp.has_header('ETag'))
+
+		self.client.get(reverse('booking_success'))
+		session = self.client.session
+		session['_messages'] = '[["__json_message",0,25,"Booking submitted"]]'
+		session.save()
+		with self.settings(MESSAGE_STORAGE='django.contrib.messages.storage.session.SessionStorage'):
+			resp = self.client.get(reverse('booking_success'))
+		self.assertContains(resp, 'Booking submitted')
+		self.assertFalse(resp.has_header('ETag'))
+
+	def test_navbar_fragment_follows_login_state(self):
+		self.assertContains(self.client.get(reverse('student_login')), 'Admin Login')
+		self.login_student()
+		resp = self.client.get(reverse('student_history'))
+		self.assertContains(resp, 'History')
+		self.assertNotContains(resp, 'Admin Login')
+
+	def test_production_uses_the_cached_template_loader(self):
+		loaders = engines['django'].engine.loaders
+		self.assertEqual(loaders[0][0], 'django.template.loaders.cached.Loader')
+
+
+class StaticImageTests(TestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.root = tempfile.mkdtemp()
+		cls.addClassCleanup(shutil.rmtree, cls.root)
+		overrides = override_settings(STATIC_ROOT=cls.root, RESPONSIVE_IMAGES={'images/rules-banner.jpeg': (200, 640)})
+		overrides.enable()
+		cls.addClassCleanup(overrides.disable)
+		images.variants.cache_clear()
+		cls.addClassCleanup(images.variants.cache_clear)
+		call_command('collectstatic', interactive=False, verbosity=0)
+
+	def render(self, source):
+		return Template('{% load responsive_images %}' + source).render(Context())
+
+	def test_collectstatic_hashes_variants_and_compresses_text(self):
+		manifest = json.loads(Path(self.root, 'staticfiles.json').read_text())['paths']
+		formats = [fmt for fmt in images.FORMATS if features.check(fmt)]
+		self.assertIn('webp', formats)
+		for fmt in formats:
+			self.assertIn(f'images/rules-banner-200w.{fmt}', manifest)
+			self.assertIn(f'images/rules-banner-373w.{fmt}', manifest)  # 640 capped at the original width
+			self.assertNotIn(f'images/rules-banner-640w.{fmt}', manifest)
+		self.assertNotIn('images/VitGround1-640w.webp', manifest)
+
+		css = manifest['admin/css/base.css']
+		self.assertNotEqual(css, 'admin/css/base.css')
+		self.assertTrue(Path(self.root, css + '.br').exists())
+		self.assertTrue(Path(self.root, css + '.gz').exists())
+
+	def test_tag_renders_hashed_srcsets_best_format_first(self):
+		html = self.render("{% responsive_image 'images/rules-banner.jpeg' alt='Banner' sizes='50vw' class='w-full' %}")
+		webp = html.index('<source type="image/webp"')
+		if features.check('avif'):
+			self.assertLess(html.index('<source type="image/avif"'), webp)
+		self.assertRegex(
+			html[webp:],
+			r'^<source type="image/webp" srcset="/static/images/rules-banner-200w\.\w{12}\.webp 200w, '
+			r'/static/images/rules-banner-373w\.\w{12}\.webp 373w" sizes="50vw">',
+		)
+		self.assertRegex(html, r'<img src="/static/images/rules-banner\.\w{12}\.jpeg" alt="Banner" class="w-full"></picture>')
+
+		# No variants, or no such file at all: a plain <img>
+		self.assertEqual(
+			self.render("{% responsive_image 'images/missing.png' alt='x' %}"),
+			'<img src="/static/images/missing.png" alt="x">',
+		)
+
+	def test_hashed_files_are_immutable_and_served_precompressed(self):
+		middleware = StaticFilesMiddleware(lambda request: HttpResponse('view'))
+		url = '/static/' + json.loads(Path(self.root, 'staticfiles.json').read_text())['paths']['admin/css/base.css']
+		resp = middleware(RequestFactory().get(url, HTTP_ACCEPT_ENCODING='gzip, br'))
+		self.assertEqual(resp.status_code, 200)
+		self.assertIn('immutable', resp['Cache-Control'])
+		self.assertIn('max-age=315360000', resp['Cache-Control'])
+		self.assertEqual(resp['Content-Encoding'], 'br')
+		resp.close()
+
+		resp = middleware(RequestFactory().get('/static/admin/css/base.css'))
+		self.assertNotIn('immutable', resp['Cache-Control'])
+		resp.close()
+
+	def test_without_a_manifest_the_tag_renders_the_original(self):
+		with self.settings(STATIC_ROOT=tempfile.mkdtemp()):
+			images.variants.cache_clear()
+			self.addCleanup(images.variants.cache_clear)
+			self.assertEqual(
+				self.render("{% responsive_image 'images/rules-banner.jpeg' %}"),
+				'<img src="/static/images/rules-banner.jpeg" alt="">',
+			)
+
+
+@override_settings(METRICS_FLUSH_INTERVAL=0, METRICS_TOKEN='scrape-token')
+class AsyncViewTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.async_client = AsyncClient()
+		self.booking = Booking.objects.create(
+			student_name='Organizer', student_email='o@example.com', ground='Ground A', sport='Football',
+			date=date.today(), time_slot='07:00 AM - 09:00 AM', purpose='Practice', roll_number='',
+			equipment='Football x2', status='Approved',
+		)
+		Player.objects.create(booking=self.booking, name='Asha', branch='CSE', year='TE', division='A')
+		self.allotment = AllotedGroundBooking.objects.create(
+			booking=self.booking, date=self.booking.date, ground='Ground A', time_slot=self.booking.time_slot,
+			allotted_to='Organizer', roll_number='',
+		)
+		StudentUser.objects.create(full_name='Asha Patil', email='asha@vit.edu.in', roll_number='2201', branch='CSE')
+
+	async def test_check_availability_matches_and_caches(self):
+		params = {'ground': 'Ground A', 'date': date.today().isoformat(), 'sport': 'Football'}
+		first = await self.async_client.get(reverse('check_availability'), params)
+		second = await self.async_client.get(reverse('check_availability'), params)
+		self.assertEqual([s['status'] for s in first.json()['slots']], ['booked', 'available'])
+		self.assertEqual(second.json(), first.json())
+		stats = await sync_to_async(availability_cache.stats)()
+		self.assertEqual((stats['misses'], stats['hits']), (1, 1))
+
+	async def test_typeahead_and_detail_endpoints(self):
+		resp = await self.async_client.get(reverse('fetch_student_data'), {'q': 'ash'})
+		self.assertEqual([s['email'] for s in resp.json()], ['asha@vit.edu.in'])
+
+		resp = await self.async_client.get(reverse('get_players', args=[self.booking.id]))
+		self.assertEqual(resp.json()['players'], [{'name': 'Asha', 'branch': 'CSE', 'year': 'TE', 'division': 'A'}])
+		resp = await self.async_client.get(reverse('get_allotment_players', args=[self.allotment.id]))
+		self.assertEqual([p['name'] for p in resp.json()['players']], ['Asha'])
+		resp = await self.async_client.get(reverse('get_equipment_for_booking', args=[self.booking.id]))
+		self.assertEqual(resp.json(), {'equipment': 'Football x2'})
+		resp = await self.async_client.get(reverse('get_allotment_equipment', args=[self.allotment.id]))
+		self.assertEqual(resp.json(), {'equipment': 'Football x2'})
+		resp = await self.async_client.get(reverse('get_players', args=[self.booking.id + 100]))
+		self.assertEqual(resp.status_code, 404)
+
+	async def test_async_requests_count_their_queries(self):
+		def scrape():
+			resp = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-token')
+			line = next(l for l in resp.content.decode().splitlines() if l.startswith('booking_db_queries_total{view="get_players"}'))
+			return float(line.rsplit(' ', 1)[1])
+
+		before = await sync_to_async(scrape)()
+		await self.async_client.get(reverse('get_players', args=[self.booking.id]))
+		self.assertEqual(await sync_to_async(scrape)() - before, 2)
+
+	async def test_static_files_served_without_a_sync_middleware(self):
+		root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, root)
+		Path(root, 'app.css').write_text('body { color: red; }')
+
+		async def app(request):
+			return HttpResponse('view')
+
+		middleware = StaticFilesMiddleware(app)
+		middleware.add_files(root, prefix='/static/')
+		self.assertTrue(iscoroutinefunction(middleware))
+
+		resp = await middleware(AsyncRequestFactory().get('/static/app.css'))
+		self.assertEqual(resp.status_code, 200)
+		self.assertTrue(resp.is_async)
+		self.assertEqual(b''.join([chunk async for chunk in resp]), b'body { color: red; }')
+		self.assertEqual((await middleware(AsyncRequestFactory().get('/other/'))).content, b'view')
+
+
+class SlotEventsTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.async_client = AsyncClient()
+		self.params = {'date': date.today().isoformat(), 'sport': 'Football'}
+		self.booking = Booking.objects.create(
+			student_name='Student', student_email='s@example.com', ground='Ground A', sport='Football',
+			date=date.today(), time_slot='07:00 AM - 09:00 AM', purpose='Practice', roll_number='',
+		)
+
+	async def open_stream(self):
+		resp = await self.async_client.get(reverse('slot_events'), self.params)
+		self.assertEqual(resp['Content-Type'], 'text/event-stream')
+		stream = aiter(resp.streaming_content)
+		self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+		return stream
+
+	async def next_event(self, stream):
+		chunk = (await asyncio.wait_for(anext(stream), 5)).decode()
+		kind, data = chunk.strip().split('\n')
+		return kind.removeprefix('event: '), json.loads(data.removeprefix('data: '))['slots']
+
+	def approve(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			allocation.approve([self.booking])
+
+	def test_needs_a_date_and_sport_and_the_asgi_stack(self):
+		self.assertEqual(self.client.get(reverse('slot_events'), {'sport': 'Football'}).status_code, 400)
+		self.assertEqual(self.client.get(reverse('slot_events'), {'date': date.today().isoformat()}).status_code, 400)
+		# Under WSGI a stream would pin a worker; 204 stops EventSource from reconnecting
+		self.assertEqual(self.client.get(reverse('slot_events'), self.params).status_code, 204)
+
+	async def test_snapshot_then_delta_when_a_booking_is_approved(self):
+		stream = await self.open_stream()
+		self.assertEqual(await self.next_event(stream), ('snapshot', {
+			'07:00 AM - 09:00 AM': 'available', '04:00 PM - 06:00 PM': 'available',
+		}))
+		await sync_to_async(self.approve)()
+		self.assertEqual(await self.next_event(stream), ('delta', {'07:00 AM - 09:00 AM': 'booked'}))
+		await stream.aclose()
+
+	@override_settings(SLOT_EVENTS_POLL_INTERVAL=0.05)
+	async def test_decisions_from_other_processes_arrive_by_polling_the_version_stamp(self):
+		stream = await self.open_stream()
+		await self.next_event(stream)
+
+		def approve_elsewhere():
+			# What another worker does: write the row and bump the stamp, with no notify() here
+			Booking.objects.filter(id=self.booking.id).update(status='Approved')
+			availability_cache.bump_version(date.today(), 'football')
+
+		await sync_to_async(approve_elsewhere)()
+		self.assertEqual(await self.next_event(stream), ('delta', {'07:00 AM - 09:00 AM': 'booked'}))
+		await stream.aclose()
+
+	async def test_clients_on_one_key_share_one_query_per_change(self):
+		streams = [await self.open_stream() for _ in range(3)]
+		for stream in streams:
+			await self.next_event(stream)
+		# The hub queries in its own thread, so count the status reads rather than capture SQL
+		with mock.patch.object(slot_events, 'aslot_statuses', wraps=slot_events.aslot_statuses) as statuses:
+			await sync_to_async(self.approve)()
+			for stream in streams:
+				self.assertEqual((await self.next_event(stream))[0], 'delta')
+		self.assertEqual(statuses.await_count, 1)
+		for stream in streams:
+			await stream.aclose()
+
+	@override_settings(SLOT_EVENTS_POLL_INTERVAL=0.05)
+	async def test_watcher_keeps_polling_after_a_failed_refresh(self):
+		stream = await self.open_stream()
+		await self.next_event(stream)
+		real = slot_events.aslot_statuses
+		calls = []
+
+		async def flaky(*args):
+			calls.append(args)
+			if len(calls) == 1:
+				raise ConnectionError('database went away')
+			return await real(*args)
+
+		with mock.patch.object(slot_events, 'aslot_statuses', flaky), \
+				self.assertLogs('booking.slot_events', 'ERROR'):
+			await sync_to_async(self.approve)()
+			self.assertEqual(await self.next_event(stream), ('delta', {'07:00 AM - 09:00 AM': 'booked'}))
+		self.assertEqual(len(calls), 2)
+		await stream.aclose()
@@ -24,10 +24,15 @@ urlpatterns = [
     path('booking/success/', views.booking_success, name='booking_success'),
    path('approve-booking/<int:booking_id>/', views.approve_booking, name='approve_booking'),
 path('reject-booking/<int:booking_id>/', views.reject_booking, name='reject_booking'),
+    path('custom-admin/bulk-action/', views.bulk_booking_action, name='bulk_booking_action'),
+    path('custom-admin/changes/', views.admin_changes, name='admin_changes'),
     path('check-availability/', views.check_availability, name='check_availability'),
+    path('availability-grid/', views.availability_grid, name='availability_grid'),
+    path('slot-events/', views.slot_events_stream, name='slot_events'),
     path('get-players/<int:booking_id>/', views.get_players, name='get_players'),
        path('get-allotment-players/<int:allot_id>/', views.get_allotment_players, name='get_allotment_players'),
     path('get-equipment/<int:booking_id>/', views.get_equipment_for_booking, name='get_equipment_for_booking'),
     path('get-allotment-equipment/<int:allot_id>/', views.get_equipment_for_allotment, name='get_allotment_equipment'),
     path('fetch-student-data/', views.fetch_student_data, name='fetch_student_data'),
+    path('metrics', views.prometheus_metrics, name='metrics'),
 ]
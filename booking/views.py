@@ -1,21 +1,33 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.forms import formset_factory
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.template.loader import render_to_string
+from django.urls import reverse
+from urllib.parse import urlencode
 from datetime import date, timedelta, datetime
+import asyncio
+import hmac
+import json
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.core.handlers.asgi import ASGIRequest
 from django.core.paginator import Paginator
 from .forms import BookingForm, PlayerForm, StudentSignupForm, OTPVerificationForm, ForgotPasswordForm, ResetPasswordForm
 from .models import Player, Booking, AllotedGroundBooking
 from .models import StudentUser, AdminUser, OTPVerification
 from django.contrib import messages
 from django.contrib.auth import authenticate, login
-from django.core.mail import send_mail, EmailMultiAlternatives
 from django.utils.html import strip_tags
 from django.conf import settings
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Count, Max, Prefetch
 from django.utils import timezone
+from .outbox import enqueue_email
+from .page_cache import cached_page
+from .pagination import paginate
+from .slot_catalog import aget_catalog, get_catalog
+from . import allocation, archive, availability_cache, change_feed, metrics, reference, slot_events
+from .student_search import asearch_students
 
 
 # -------------------- HELPER FUNCTIONS --------------------
@@ -34,6 +46,7 @@ def mask_email(email):
 
 
 # -------------------- HOME --------------------
+@cached_page()
 def home(request):
     return render(request, 'booking/home.html')
 
@@ -46,18 +59,14 @@ def student_history(request):
 
     status_filter = (request.GET.get('status') or '').strip()
 
-    bookings = (
-        Booking.objects
-        .filter(student_email=student_email)
-        .prefetch_related('players')
-        .order_by('-date', '-created_at')
+    # Keyset pagination over idx_history_keyset; archived bookings are read
+    # only once the pages reach the archive (booking/archive.py)
+    page_obj = archive.history_page(
+        student_email,
+        status_filter if status_filter in {"Pending", "Approved", "Rejected"} else None,
+        request.GET.get('cursor'),
+        per_page=10,
     )
-    if status_filter in {"Pending", "Approved", "Rejected"}:
-        bookings = bookings.filter(status=status_filter)
-
-    paginator = Paginator(bookings, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
 
     return render(request, 'booking/student_history.html', {
         'page_obj': page_obj,
@@ -100,34 +109,16 @@ def student_signup(request):
             otp = OTPVerification.generate_otp()
             expires_at = timezone.now() + timedelta(minutes=10)
             
-            # Delete any existing OTP for this email
-            OTPVerification.objects.filter(email=form.cleaned_data['email']).delete()
-            
-            # Create OTP record with signup data
-            otp_record = OTPVerification.objects.create(
-                email=form.cleaned_data['email'],
-                otp=otp,
-                expires_at=expires_at,
-                full_name=form.cleaned_data['full_name'],
-                roll_number=form.cleaned_data['roll_number'],
-                branch=form.cleaned_data['branch'],
-                year=form.cleaned_data['year'],
-                division=form.cleaned_data['division'],
-                password=form.cleaned_data['password']
-            )
-            
-            # Send OTP email
-            try:
-                subject = 'Email Verification - SportsDeck Ground Booking'
-                
-                # Render HTML email template
-                html_content = render_to_string('booking/emails/signup_otp.html', {
-                    'full_name': form.cleaned_data['full_name'],
-                    'otp': otp,
-                })
-                
-                # Plain text fallback
-                text_content = f'''
+            subject = 'Email Verification - SportsDeck Ground Booking'
+
+            # Render HTML email template
+            html_content = render_to_string('booking/emails/signup_otp.html', {
+                'full_name': form.cleaned_data['full_name'],
+                'otp': otp,
+            })
+
+            # Plain text fallback
+            text_content = f'''
 Hello {form.cleaned_data['full_name']},
 
 Thank you for signing up for SportsDeck Ground Booking System!
@@ -140,26 +131,31 @@ If you did not request this registration, please ignore this email.
 
 Best regards,
 SportsDeck Admin Team
-                '''
-                
-                # Create email with both HTML and plain text
-                email = EmailMultiAlternatives(
-                    subject,
-                    text_content,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [form.cleaned_data['email']]
+            '''
+
+            # OTP record and its email are committed together; the outbox worker sends it
+            with transaction.atomic():
+                # One OTP per email: replaces any earlier signup or reset code
+                OTPVerification.objects.update_or_create(
+                    email=form.cleaned_data['email'],
+                    defaults=dict(
+                        otp=otp,
+                        created_at=timezone.now(),
+                        expires_at=expires_at,
+                        full_name=form.cleaned_data['full_name'],
+                        roll_number=form.cleaned_data['roll_number'],
+                        branch=form.cleaned_data['branch'],
+                        year=form.cleaned_data['year'],
+                        division=form.cleaned_data['division'],
+                        password=form.cleaned_data['password'],
+                    ),
                 )
-                email.attach_alternative(html_content, "text/html")
-                email.send(fail_silently=False)
-                
-                # Store email in session for verification page
-                request.session['signup_email'] = form.cleaned_data['email']
-                messages.success(request, '📧 OTP sent to your email! Please check your inbox.')
-                return redirect('verify_otp')
-                
-            except Exception as e:
-                messages.error(request, f'Error sending OTP email: {str(e)}')
-                otp_record.delete()
+                enqueue_email(subject, text_content, [form.cleaned_data['email']], html_body=html_content)
+
+            # Store email in session for verification page
+            request.session['signup_email'] = form.cleaned_data['email']
+            messages.success(request, '📧 OTP sent to your email! Please check your inbox.')
+            return redirect('verify_otp')
     else:
         form = StudentSignupForm()
     
@@ -179,28 +175,23 @@ def verify_otp(request):
             entered_otp = form.cleaned_data['otp']
             
             try:
-                otp_record = OTPVerification.objects.filter(
-                    email=email,
-                    is_verified=False
-                ).latest('created_at')
+                otp_record = OTPVerification.objects.get(email=email)
                 
                 if otp_record.is_expired():
                     messages.error(request, 'OTP has expired. Please request a new one.')
                 elif otp_record.otp == entered_otp:
-                    # OTP is valid, create the student account
-                    StudentUser.objects.create(
-                        full_name=otp_record.full_name,
-                        email=otp_record.email,
-                        roll_number=otp_record.roll_number,
-                        branch=otp_record.branch,
-                        year=otp_record.year,
-                        division=otp_record.division,
-                        password=otp_record.password
-                    )
-                    
-                    # Mark OTP as verified
-                    otp_record.is_verified = True
-                    otp_record.save()
+                    # OTP is valid, create the student account and consume the OTP
+                    with transaction.atomic():
+                        StudentUser.objects.create(
+                            full_name=otp_record.full_name,
+                            email=otp_record.email,
+                            roll_number=otp_record.roll_number,
+                            branch=otp_record.branch,
+                            year=otp_record.year,
+                            division=otp_record.division,
+                            password=otp_record.password
+                        )
+                        otp_record.delete()
                     
                     # Clear session
                     del request.session['signup_email']
@@ -230,29 +221,24 @@ def resend_otp(request):
         return redirect('student_signup')
     
     try:
-        # Get the latest OTP record for this email
-        otp_record = OTPVerification.objects.filter(
-            email=email,
-            is_verified=False
-        ).latest('created_at')
-        
-        # Generate new OTP
-        new_otp = OTPVerification.generate_otp()
-        otp_record.otp = new_otp
-        otp_record.expires_at = timezone.now() + timedelta(minutes=10)
-        otp_record.created_at = timezone.now()
-        otp_record.save()
-        
-        # Send new OTP email
-        try:
+        with transaction.atomic():
+            otp_record = OTPVerification.objects.select_for_update().get(email=email)
+
+            # Generate new OTP
+            new_otp = OTPVerification.generate_otp()
+            otp_record.otp = new_otp
+            otp_record.expires_at = timezone.now() + timedelta(minutes=10)
+            otp_record.created_at = timezone.now()
+            otp_record.save()
+
             subject = 'New OTP - SportsDeck Ground Booking'
-            
+
             # Render HTML email template
             html_content = render_to_string('booking/emails/signup_otp.html', {
                 'full_name': otp_record.full_name,
                 'otp': new_otp,
             })
-            
+
             # Plain text fallback
             text_content = f'''
 Hello {otp_record.full_name},
@@ -264,22 +250,11 @@ This OTP will expire in 10 minutes.
 Best regards,
 SportsDeck Admin Team
             '''
-            
-            # Create email with both HTML and plain text
-            email_msg = EmailMultiAlternatives(
-                subject,
-                text_content,
-                settings.DEFAULT_FROM_EMAIL,
-                [email]
-            )
-            email_msg.attach_alternative(html_content, "text/html")
-            email_msg.send(fail_silently=False)
-            
-            messages.success(request, 'New OTP sent to your email.')
-            
-        except Exception as e:
-            messages.error(request, f'Error sending OTP email: {str(e)}')
-            
+
+            enqueue_email(subject, text_content, [email], html_body=html_content)
+
+        messages.success(request, 'New OTP sent to your email.')
+
     except OTPVerification.DoesNotExist:
         messages.error(request, 'No pending signup found. Please signup again.')
         return redirect('student_signup')
@@ -303,34 +278,16 @@ def forgot_password(request):
             otp = OTPVerification.generate_otp()
             expires_at = timezone.now() + timedelta(minutes=10)
             
-            # Delete any existing password reset OTP for this email
-            OTPVerification.objects.filter(email=email, is_verified=False).delete()
-            
-            # Create OTP record for password reset
-            otp_record = OTPVerification.objects.create(
-                email=email,
-                otp=otp,
-                expires_at=expires_at,
-                full_name=student.full_name or '',
-                roll_number=student.roll_number or '',
-                branch=student.branch or '',
-                year=student.year or '',
-                division=student.division or '',
-                password=''  # Will be set during reset
-            )
-            
-            # Send OTP email
-            try:
-                subject = 'Password Reset OTP - SportsDeck Ground Booking'
-                
-                # Render HTML email template
-                html_content = render_to_string('booking/emails/reset_password_otp.html', {
-                    'full_name': student.full_name or 'Student',
-                    'otp': otp,
-                })
-                
-                # Plain text fallback
-                text_content = f'''
+            subject = 'Password Reset OTP - SportsDeck Ground Booking'
+
+            # Render HTML email template
+            html_content = render_to_string('booking/emails/reset_password_otp.html', {
+                'full_name': student.full_name or 'Student',
+                'otp': otp,
+            })
+
+            # Plain text fallback
+            text_content = f'''
 Hello {student.full_name},
 
 You have requested to reset your password for SportsDeck Ground Booking System.
@@ -343,26 +300,30 @@ If you did not request this password reset, please ignore this email and your pa
 
 Best regards,
 SportsDeck Admin Team
-                '''
-                
-                # Create email with both HTML and plain text
-                email_msg = EmailMultiAlternatives(
-                    subject,
-                    text_content,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [email]
+            '''
+
+            with transaction.atomic():
+                # One OTP per email: replaces any earlier code for this address
+                OTPVerification.objects.update_or_create(
+                    email=email,
+                    defaults=dict(
+                        otp=otp,
+                        created_at=timezone.now(),
+                        expires_at=expires_at,
+                        full_name=student.full_name or '',
+                        roll_number=student.roll_number or '',
+                        branch=student.branch or '',
+                        year=student.year or '',
+                        division=student.division or '',
+                        password='',  # Will be set during reset
+                    ),
                 )
-                email_msg.attach_alternative(html_content, "text/html")
-                email_msg.send(fail_silently=False)
-                
-                # Store email in session for reset page
-                request.session['reset_email'] = email
-                messages.success(request, '📧 Password reset OTP sent! Please check your email.')
-                return redirect('reset_password')
-                
-            except Exception as e:
-                messages.error(request, f'Error sending OTP email: {str(e)}')
-                otp_record.delete()
+                enqueue_email(subject, text_content, [email], html_body=html_content)
+
+            # Store email in session for reset page
+            request.session['reset_email'] = email
+            messages.success(request, '📧 Password reset OTP sent! Please check your email.')
+            return redirect('reset_password')
     else:
         form = ForgotPasswordForm()
     
@@ -383,22 +344,17 @@ def reset_password(request):
             new_password = form.cleaned_data['new_password']
             
             try:
-                otp_record = OTPVerification.objects.filter(
-                    email=email,
-                    is_verified=False
-                ).latest('created_at')
+                otp_record = OTPVerification.objects.get(email=email)
                 
                 if otp_record.is_expired():
                     messages.error(request, 'OTP has expired. Please request a new one.')
                 elif otp_record.otp == entered_otp:
-                    # OTP is valid, update the password
+                    # OTP is valid, update the password and consume the OTP
                     student = StudentUser.objects.get(email=email)
-                    student.password = new_password
-                    student.save()
-                    
-                    # Mark OTP as verified
-                    otp_record.is_verified = True
-                    otp_record.save()
+                    with transaction.atomic():
+                        student.password = new_password
+                        student.save()
+                        otp_record.delete()
                     
                     # Clear session
                     del request.session['reset_email']
@@ -433,45 +389,41 @@ def resend_reset_otp(request):
     try:
         student = StudentUser.objects.get(email=email)
         
-        # Get the latest OTP record or create new one
-        try:
-            otp_record = OTPVerification.objects.filter(
-                email=email,
-                is_verified=False
-            ).latest('created_at')
-        except OTPVerification.DoesNotExist:
-            # Create new OTP record
-            otp = OTPVerification.generate_otp()
-            expires_at = timezone.now() + timedelta(minutes=10)
-            otp_record = OTPVerification.objects.create(
-                email=email,
-                otp=otp,
-                expires_at=expires_at,
-                full_name=student.full_name or '',
-                roll_number=student.roll_number or '',
-                branch=student.branch or '',
-                year=student.year or '',
-                division=student.division or '',
-                password=''
-            )
-        
-        # Generate new OTP
-        new_otp = OTPVerification.generate_otp()
-        otp_record.otp = new_otp
-        otp_record.expires_at = timezone.now() + timedelta(minutes=10)
-        otp_record.created_at = timezone.now()
-        otp_record.save()
-        
-        # Send new OTP email
-        try:
+        with transaction.atomic():
+            # Get the latest OTP record or create new one
+            try:
+                otp_record = OTPVerification.objects.select_for_update().get(email=email)
+            except OTPVerification.DoesNotExist:
+                # Create new OTP record
+                otp = OTPVerification.generate_otp()
+                expires_at = timezone.now() + timedelta(minutes=10)
+                otp_record = OTPVerification.objects.create(
+                    email=email,
+                    otp=otp,
+                    expires_at=expires_at,
+                    full_name=student.full_name or '',
+                    roll_number=student.roll_number or '',
+                    branch=student.branch or '',
+                    year=student.year or '',
+                    division=student.division or '',
+                    password=''
+                )
+
+            # Generate new OTP
+            new_otp = OTPVerification.generate_otp()
+            otp_record.otp = new_otp
+            otp_record.expires_at = timezone.now() + timedelta(minutes=10)
+            otp_record.created_at = timezone.now()
+            otp_record.save()
+
             subject = 'New Password Reset OTP - SportsDeck Ground Booking'
-            
+
             # Render HTML email template
             html_content = render_to_string('booking/emails/reset_password_otp.html', {
                 'full_name': student.full_name or 'Student',
                 'otp': new_otp,
             })
-            
+
             # Plain text fallback
             text_content = f'''
 Hello {student.full_name},
@@ -483,22 +435,11 @@ This OTP will expire in 10 minutes.
 Best regards,
 SportsDeck Admin Team
             '''
-            
-            # Create email with both HTML and plain text
-            email_msg = EmailMultiAlternatives(
-                subject,
-                text_content,
-                settings.DEFAULT_FROM_EMAIL,
-                [email]
-            )
-            email_msg.attach_alternative(html_content, "text/html")
-            email_msg.send(fail_silently=False)
-            
-            messages.success(request, 'New OTP sent to your email.')
-            
-        except Exception as e:
-            messages.error(request, f'Error sending OTP email: {str(e)}')
-            
+
+            enqueue_email(subject, text_content, [email], html_body=html_content)
+
+        messages.success(request, 'New OTP sent to your email.')
+
     except StudentUser.DoesNotExist:
         messages.error(request, 'Student account not found.')
         return redirect('forgot_password')
@@ -533,195 +474,199 @@ def admin_logout(request):
     return redirect('admin_login')
 
 # -------------------- ADMIN DASHBOARD --------------------
+PENDING_PAGE_SIZE = 25
+# AllotedGroundBooking has no created_at; ids follow insertion order
+ALLOTMENT_ORDERING = ('-date', '-id')
+
+
+def _dashboard_filters(request):
+    return {
+        'date': (request.GET.get('date') or '').strip(),
+        'ground': (request.GET.get('ground') or '').strip(),
+    }
+
+
+def _filter_dashboard(querysets, filters):
+    """Apply the dashboard's date/ground filters to Booking/AllotedGroundBooking querysets."""
+    ground_id = reference.get_id('ground', filters['ground']) if filters['ground'] else None
+    filtered = []
+    for queryset in querysets:
+        if filters['date']:
+            queryset = queryset.filter(date=filters['date'])
+        if filters['ground']:
+            queryset = queryset.filter(ground_ref_id=ground_id) if ground_id else queryset.none()
+        filtered.append(queryset)
+    return filtered
+
+
 def custom_admin_dashboard(request):
     if not request.session.get('is_admin_logged_in'):
         return redirect('admin_login')
 
-    date_str = (request.GET.get('date') or '').strip()
-    ground   = (request.GET.get('ground') or '').strip()
+    # Taken before the page is read, so the change feed starts where the page ends
+    changes_cursor = change_feed.make_cursor()
+    filters = _dashboard_filters(request)
+    date_str, ground = filters['date'], filters['ground']
 
     # FCFS: show oldest pending first
-    bookings_qs = Booking.objects.filter(status='Pending').order_by('created_at')
-    allot_qs    = AllotedGroundBooking.objects.select_related('booking').all().order_by('-date')
-
-    if date_str:
-        bookings_qs = bookings_qs.filter(date=date_str)
-        allot_qs    = allot_qs.filter(date=date_str)
-
-    if ground:
-        bookings_qs = bookings_qs.filter(ground__iexact=ground)
-        allot_qs    = allot_qs.filter(ground__iexact=ground)
+    bookings_qs, allot_qs = _filter_dashboard([
+        Booking.objects.filter(status='Pending').order_by('created_at', 'id'),
+        AllotedGroundBooking.objects.select_related('booking').all(),
+    ], filters)
+
+    # Only one page of the pending queue is rendered; its players come from
+    # one prefetch query and are embedded for the players dialog
+    bookings_paginator = Paginator(
+        bookings_qs
+        .annotate(player_count=Count('players'))
+        .prefetch_related(Prefetch('players', queryset=Player.objects.order_by('id'))),
+        PENDING_PAGE_SIZE,
+    )
+    bookings_page = bookings_paginator.get_page(request.GET.get('pending_page', 1))
+    pending_players = {
+        b.id: [{'name': p.name, 'branch': p.branch, 'year': p.year, 'division': p.division} for p in b.players.all()]
+        for b in bookings_page
+    }
 
-    # Implement pagination for allotments (10 entries per page)
-    allotments_paginator = Paginator(allot_qs, 10)
-    page_number = request.GET.get('page', 1)
-    allotments_page = allotments_paginator.get_page(page_number)
+    # Keyset pagination for allotments (10 entries per page)
+    allotments_page = paginate(allot_qs, ALLOTMENT_ORDERING, request.GET.get('cursor'), per_page=10)
 
-    grounds = (Booking.objects.values_list('ground', flat=True)
-               .distinct().order_by('ground'))
+    grounds = reference.names('ground')
 
     context = {
-        'bookings': bookings_qs,
+        'bookings': bookings_page,
+        'bookings_paginator': bookings_paginator,
+        'pending_players': pending_players,
         'allotments': allotments_page,
-        'allotments_paginator': allotments_paginator,
         'grounds': grounds,
         'selected_date': date_str,
         'selected_ground': ground,
+        'change_feed': {
+            'url': f"{reverse('admin_changes')}?{urlencode(filters)}",
+            'cursor': changes_cursor,
+            # New pending requests belong at the end of the queue, new allotments at the top
+            'append_pending': not bookings_page.has_next(),
+            'insert_allotments': not allotments_page.has_previous,
+            'more_allotments': allotments_page.has_next,
+        },
     }
     return render(request, 'booking/admin_dashboard.html', context)
 
-def get_players(request, booking_id):
-    booking = get_object_or_404(Booking, id=booking_id)
-    players = Player.objects.filter(booking=booking).values(
+def admin_changes(request):
+    """
+    JSON change feed for the admin dashboard: the bookings and allotments
+    written since `since` (the dashboard's cursor, then the one each response
+    returns), under the dashboard's `date`/`ground` filters. Pending bookings
+    and allotments carry their rendered table row; other bookings only their
+    status, so the page drops them from the queue. `reload` is set when too
+    much changed to patch the page.
+    """
+    if not request.session.get('is_admin_logged_in'):
+        return JsonResponse({"error": "Admin login required"}, status=403)
+    since = change_feed.read_cursor(request.GET.get('since'))
+    if since is None:
+        return JsonResponse({"error": "since must be a cursor from the dashboard"}, status=400)
+
+    bookings, allotments, pending = _filter_dashboard([
+        Booking.objects.annotate(player_count=Count('players')),
+        AllotedGroundBooking.objects.all(),
+        Booking.objects.filter(status='Pending'),
+    ], _dashboard_filters(request))
+    changes = change_feed.changes_since(since, bookings, allotments)
+    if changes.truncated:
+        return JsonResponse({"cursor": changes.cursor, "reload": True}, status=200)
+    return JsonResponse({
+        "cursor": changes.cursor,
+        "reload": False,
+        "pending_count": pending.count(),
+        "bookings": [{
+            "id": b.id,
+            "status": b.status,
+            "html": render_to_string('booking/admin_pending_row.html', {'booking': b}) if b.status == 'Pending' else None,
+        } for b in changes.bookings],
+        "allotments": [{
+            "id": a.id,
+            "date": a.date.isoformat(),
+            "html": render_to_string('booking/admin_allotment_row.html', {'allot': a}),
+        } for a in changes.allotments],
+    }, status=200)
+
+async def get_players(request, booking_id):
+    booking = await aget_object_or_404(Booking.objects.only('id', 'student_name'), id=booking_id)
+    players = [p async for p in Player.objects.filter(booking=booking).values(
         "name", "branch", "year", "division",
-    )
+    )]
     return JsonResponse({
         "booking": booking.student_name,
-        "players": list(players)
+        "players": players
     }, status=200)
 
-def get_equipment_for_booking(request, booking_id):
-    booking = get_object_or_404(Booking, id=booking_id)
+async def get_equipment_for_booking(request, booking_id):
+    booking = await aget_object_or_404(Booking.objects.only('id', 'equipment'), id=booking_id)
     return JsonResponse({
         "equipment": booking.equipment or ""
     }, status=200)
 
 # -------------------- Approve / Reject Booking --------------------
 def approve_booking(request, booking_id):
-    """Approve booking with graceful email error handling"""
+    """Approve booking (FCFS) and queue notification emails"""
     booking = get_object_or_404(Booking, id=booking_id)
 
-    # Enforce FCFS and auto-reject conflicting pending requests atomically
-    with transaction.atomic():
-        # Lock the queue for this slot
-        same_slot = (
-            Booking.objects
-            .select_for_update()
-            .filter(
-                date=booking.date,
-                sport__iexact=(booking.sport or ''),
-                time_slot=booking.time_slot,
-            )
-        )
-
-        # Oldest pending wins for FCFS
-        oldest_pending = same_slot.filter(status='Pending').order_by('created_at').first()
-        to_approve = oldest_pending or booking
-
-        # Set approved
-        to_approve.status = 'Approved'
-        to_approve.save()
-
-        # Auto-reject all other pending for this exact slot (same date/sport/time)
-        conflicts_qs = same_slot.filter(status='Pending').exclude(id=to_approve.id)
-        conflicts = list(conflicts_qs)
-        for c in conflicts:
-            c.status = 'Rejected'
-        if conflicts:
-            Booking.objects.bulk_update(conflicts, ['status'])
-
-        # Reflect in AllotedGroundBooking
-        players_count = to_approve.players.count()
-        AllotedGroundBooking.objects.update_or_create(
-            booking=to_approve,
-            date=to_approve.date,
-            ground=to_approve.ground,
-            time_slot=to_approve.time_slot,
-            defaults={
-                'allotted_to': to_approve.student_name,
-                'roll_number': to_approve.roll_number,
-                'purpose': to_approve.purpose,
-                'players': players_count,
-            }
-        )
-
-    # Email approved - mandatory email sending
-    try:
-        html = render_to_string(
-            'booking/emails/booking_status_email.html',
-            {
-                'site_name': 'SportDeck',
-                'status': 'Approved',
-                'booking': to_approve,
-                'players': list(to_approve.players.all().values('name', 'branch', 'year', 'division')),
-            }
-        )
-        plain = strip_tags(html)
-        send_mail(
-            subject=f'Booking Approved — {to_approve.ground} on {to_approve.date}',
-            message=plain,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[to_approve.student_email],
-            html_message=html,
-            fail_silently=False,
-        )
-        messages.success(request, f'✅ Booking approved! Confirmation email sent successfully.')
-    except Exception as e:
-        # Email failed - log error and show warning but booking is still approved
-        print(f"ERROR: Failed to send approval email to {to_approve.student_email}: {e}")
-        messages.warning(request, f'⚠️ Booking approved, but email notification failed. Please inform the student manually.')
-        pass
-
-    # Email auto-rejected
-    for rej in conflicts:
-        try:
-            r_html = render_to_string(
-                'booking/emails/booking_status_email.html',
-                {
-                    'site_name': 'SportDeck',
-                    'status': 'Rejected',
-                    'booking': rej,
-                    'players': list(rej.players.all().values('name', 'branch', 'year', 'division')),
-                }
-            )
-            r_plain = strip_tags(r_html)
-            send_mail(
-                subject=f'Booking Rejected — {rej.ground} on {rej.date}',
-                message=r_plain,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[rej.student_email],
-                html_message=r_html,
-                fail_silently=True,
-            )
-        except Exception:
-            pass
+    # Oldest pending request for the slot wins; the rest are auto-rejected
+    approved, rejected = allocation.approve([booking])
 
+    if approved:
+        messages.success(request, f'✅ Booking approved! Confirmation email queued for delivery.')
+    else:
+        messages.warning(request, f'⚠️ This slot is already booked. {len(rejected)} pending request(s) were rejected.')
     return redirect('custom_admin_dashboard')
 
 def reject_booking(request, booking_id):
-    """Reject booking with graceful email error handling"""
+    """Reject booking and queue the notification email"""
     booking = get_object_or_404(Booking, id=booking_id)
-    booking.status = 'Rejected'
-    booking.save()
+    allocation.reject([booking])
 
-    # Build HTML email and send - mandatory email sending
-    try:
-        html = render_to_string(
-            'booking/emails/booking_status_email.html',
-            {
-                'site_name': 'SportDeck',
-                'status': 'Rejected',
-                'booking': booking,
-                'players': list(booking.players.all().values('name', 'branch', 'year', 'division')),
-            }
-        )
-        plain = strip_tags(html)
-        send_mail(
-            subject=f'Booking Rejected — {booking.ground} on {booking.date}',
-            message=plain,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[booking.student_email],
-            html_message=html,
-            fail_silently=False,
-        )
-        messages.success(request, f'❌ Booking rejected. Notification email sent successfully.')
-    except Exception as e:
-        # Email failed - log error and show warning but booking is still rejected
-        print(f"ERROR: Failed to send rejection email to {booking.student_email}: {e}")
-        messages.warning(request, f'⚠️ Booking rejected, but email notification failed. Please inform the student manually.')
-        pass
-    
+    messages.success(request, f'❌ Booking rejected. Notification email queued for delivery.')
     return redirect('custom_admin_dashboard')
+
+@require_POST
+def bulk_booking_action(request):
+    """
+    Approve or reject many bookings at once.
+
+    POST `action` (approve|reject) and repeated `booking_ids`. Approvals are
+    grouped per (date, sport, time_slot) and resolved FCFS with one lock per
+    slot. Responds with JSON when the client accepts it, otherwise redirects
+    back to the dashboard.
+    """
+    wants_json = 'application/json' in request.headers.get('Accept', '')
+    if not request.session.get('is_admin_logged_in'):
+        if wants_json:
+            return JsonResponse({"error": "Admin login required"}, status=403)
+        return redirect('admin_login')
+
+    action = request.POST.get('action')
+    ids = [int(i) for i in request.POST.getlist('booking_ids') if i.isdigit()]
+    bookings = list(Booking.objects.filter(id__in=ids))
+
+    if action == 'approve':
+        approved, rejected = allocation.approve(bookings)
+    elif action == 'reject':
+        approved, rejected = [], allocation.reject(bookings)
+    else:
+        if wants_json:
+            return JsonResponse({"error": "action must be approve or reject"}, status=400)
+        messages.error(request, 'Unknown bulk action.')
+        return redirect('custom_admin_dashboard')
+
+    if wants_json:
+        return JsonResponse({
+            "approved": [b.id for b in approved],
+            "rejected": [b.id for b in rejected],
+        }, status=200)
+    messages.success(request, f'Bulk {action}: {len(approved)} approved, {len(rejected)} rejected. Emails queued for delivery.')
+    return redirect('custom_admin_dashboard')
+
 def student_booking(request):
     number_options = range(1, 12)
 
@@ -733,113 +678,106 @@ def student_booking(request):
             student_email = request.POST.get("student_email") or request.session.get('student_email')
             booking_date = request.POST.get("date")
             
-            # Check 1-day restriction for main student
-            one_day_ago = datetime.now().date() - timedelta(days=1)
-            recent_bookings = Booking.objects.filter(
-                student_email=student_email,
-                date__gte=one_day_ago,
-                status='Approved'
-            )
-            
-            if recent_bookings.exists():
-                messages.error(request, f"You have already booked a ground within the last 24 hours. Please wait until {recent_bookings.first().date + timedelta(days=1)} to make another booking.")
-                return render(request, 'booking/student_booking.html', {
-                    'booking_form': booking_form,
-                    'number_options': number_options
-                })
-            
-            # Check 1-day restriction for selected players
             num_players = int(request.POST.get("number_of_players", 1))
-            restricted_players = []
-            
-            for i in range(1, num_players + 1):
-                player_email = request.POST.get(f'player{i}_name')
-                if player_email:
-                    # Check if this player has booked within 1 day
-                    player_recent_bookings = Booking.objects.filter(
-                        student_email=player_email,
+            player_emails = [
+                request.POST.get(f'player{i}_name')
+                for i in range(1, num_players + 1)
+                if request.POST.get(f'player{i}_name')
+            ]
+
+            with transaction.atomic():
+                # 1-day restriction for the organizer and every player in one aggregated query
+                one_day_ago = datetime.now().date() - timedelta(days=1)
+                last_booked = dict(
+                    Booking.objects
+                    .filter(
+                        student_email__in=[student_email] + player_emails,
                         date__gte=one_day_ago,
                         status='Approved'
                     )
-                    if player_recent_bookings.exists():
-                        try:
-                            player = StudentUser.objects.get(email=player_email)
-                            restricted_players.append(player.full_name)
-                        except StudentUser.DoesNotExist:
-                            restricted_players.append(player_email)
-            
-            if restricted_players:
-                players_list = ", ".join(restricted_players)
-                messages.error(request, f"The following players have already booked a ground within the last 24 hours and cannot be added: {players_list}")
-                return render(request, 'booking/student_booking.html', {
-                    'booking_form': booking_form,
-                    'number_options': number_options
-                })
-
-            booking = booking_form.save(commit=False)
-
-            # Organizer info
-            booking.student_name = request.POST.get("student_name")
-            booking.student_email = student_email
-            booking.roll_number = ''  # optional, can fetch if needed
-
-            # Booking info
-            booking.ground = request.POST.get("ground")
-            booking.sport = request.POST.get("sport") or ''
-            booking.date = request.POST.get("date")
-            booking.time_slot = request.POST.get("time_slot")
-            booking.equipment = request.POST.get("equipment_selected") or request.POST.get('equipment') or ''
-            booking.purpose = request.POST.get("purpose")
-            booking.number_of_players = num_players
-
-            booking.save()
-
-            # Save players dynamically (auto-fetch branch/year/division)
-            num_players = booking.number_of_players
-            for i in range(1, num_players + 1):
-                player_name_or_email = request.POST.get(f'player{i}_name')
-                if not player_name_or_email:
-                    continue
+                    .values('student_email')
+                    .annotate(last_date=Max('date'))
+                    .values_list('student_email', 'last_date')
+                )
 
-                # Fetch student from DB
-                try:
-                    student = StudentUser.objects.get(email=player_name_or_email)
-                    Player.objects.create(
-                        booking=booking,
-                        name=student.full_name,
-                        branch=student.branch,
-                        year=student.year,
-                        division=student.division
-                    )
-                except StudentUser.DoesNotExist:
-                    # If not found, create with only name
-                    Player.objects.create(
-                        booking=booking,
-                        name=player_name_or_email,
-                        branch='',
-                        year='',
-                        division=''
-                    )
+                if student_email in last_booked:
+                    messages.error(request, f"You have already booked a ground within the last 24 hours. Please wait until {last_booked[student_email] + timedelta(days=1)} to make another booking.")
+                    return render(request, 'booking/student_booking.html', {
+                        'booking_form': booking_form,
+                        'number_options': number_options
+                    })
 
-            # Ensure at least one player exists (include organizer if none selected)
-            if booking.players.count() == 0:
-                try:
-                    organizer = StudentUser.objects.get(email=booking.student_email)
-                    Player.objects.create(
-                        booking=booking,
-                        name=organizer.full_name or booking.student_name,
-                        branch=organizer.branch or '',
-                        year=organizer.year or '',
-                        division=organizer.division or ''
-                    )
-                except StudentUser.DoesNotExist:
-                    Player.objects.create(
-                        booking=booking,
-                        name=booking.student_name or (booking.student_email or 'Organizer'),
-                        branch='',
-                        year='',
-                        division=''
-                    )
+                # Resolve organizer and players to StudentUser rows with one IN query
+                students = StudentUser.objects.in_bulk(
+                    [e for e in [student_email] + player_emails if e], field_name='email'
+                )
+
+                restricted_players = [
+                    students[e].full_name if e in students else e
+                    for e in player_emails if e in last_booked
+                ]
+                if restricted_players:
+                    players_list = ", ".join(restricted_players)
+                    messages.error(request, f"The following players have already booked a ground within the last 24 hours and cannot be added: {players_list}")
+                    return render(request, 'booking/student_booking.html', {
+                        'booking_form': booking_form,
+                        'number_options': number_options
+                    })
+
+                booking = booking_form.save(commit=False)
+
+                # Organizer info
+                booking.student_name = request.POST.get("student_name")
+                booking.student_email = student_email
+                booking.roll_number = ''  # optional, can fetch if needed
+
+                # Booking info
+                booking.ground = request.POST.get("ground")
+                booking.sport = request.POST.get("sport") or ''
+                booking.date = request.POST.get("date")
+                booking.time_slot = request.POST.get("time_slot")
+                booking.equipment = request.POST.get("equipment_selected") or request.POST.get('equipment') or ''
+                booking.purpose = request.POST.get("purpose")
+                booking.number_of_players = num_players
+
+                booking.save()
+
+                # Players auto-fill branch/year/division from StudentUser; unknown emails keep only the name
+                players = []
+                for player_email in player_emails:
+                    student = students.get(player_email)
+                    if student:
+                        players.append(Player(
+                            booking=booking,
+                            name=student.full_name,
+                            branch=student.branch,
+                            year=student.year,
+                            division=student.division
+                        ))
+                    else:
+                        players.append(Player(booking=booking, name=player_email, branch='', year='', division=''))
+
+                # Ensure at least one player exists (include organizer if none selected)
+                if not players:
+                    organizer = students.get(booking.student_email)
+                    if organizer:
+                        players.append(Player(
+                            booking=booking,
+                            name=organizer.full_name or booking.student_name,
+                            branch=organizer.branch or '',
+                            year=organizer.year or '',
+                            division=organizer.division or ''
+                        ))
+                    else:
+                        players.append(Player(
+                            booking=booking,
+                            name=booking.student_name or (booking.student_email or 'Organizer'),
+                            branch='',
+                            year='',
+                            division=''
+                        ))
+
+                Player.objects.bulk_create(players)
 
             return redirect('booking_success')
     else:
@@ -862,10 +800,12 @@ def student_booking(request):
         'number_options': number_options
     })
 
+@cached_page()
 def booking_success(request):
     return render(request, 'booking/booking_success.html')
 
 # -------------------- STUDENT DASHBOARD --------------------
+@cached_page(vary_on=lambda request: request.session.get('student_email'))  # the greeting uses the name
 def student_dashboard(request):
     student_email = request.session.get('student_email')
     if not student_email:
@@ -879,138 +819,210 @@ def student_dashboard(request):
     })
 
 # -------------------- RULES --------------------
+@cached_page()
 def rules_regulations(request):
     return render(request, 'booking/rules_regulations.html')
 
 # -------------------- AJAX AVAILABILITY --------------------
 @csrf_exempt
-def check_availability(request):
+async def check_availability(request):
     ground = request.GET.get("ground")
     date_selected = request.GET.get("date")
     sport = (request.GET.get("sport") or '').strip()
 
-    time_slots = [
-        "07:00 AM - 09:00 AM", "04:00 PM - 06:00 PM",
-    ]
+    catalog = await aget_catalog()
+    time_slots = catalog.slots_for(sport, ground)
 
     slots = []
 
     if not ground or not date_selected or not sport:
         for slot in time_slots:
-            slots.append({"time": slot, "status": "freeze"})
+            slots.append({"time": slot.label, "status": "freeze"})
         return JsonResponse({"slots": slots}, status=200)
 
-    def parse_time_to_minutes(tstr):
-        tstr = tstr.strip()
-        fmts = ["%I:%M %p", "%I:%M%p", "%H:%M", "%I %p"]
-        for fmt in fmts:
-            try:
-                dt = datetime.strptime(tstr, fmt)
-                return dt.hour * 60 + dt.minute
-            except Exception:
-                continue
-        try:
-            parts = tstr.split(':')
-            if len(parts) == 2:
-                h = int(parts[0])
-                m = int(''.join(ch for ch in parts[1] if ch.isdigit()))
-                return h * 60 + m
-        except Exception:
-            pass
-        return None
-
-    def parse_range(rng):
-        if not rng or '-' not in rng:
-            return (None, None)
-        a, b = rng.split('-', 1)
-        start = parse_time_to_minutes(a)
-        end = parse_time_to_minutes(b)
-        return (start, end)
-
-    approved_bookings = Booking.objects.filter(
-        date=date_selected,
-        status__iexact='Approved',
-        sport__iexact=sport,
-    )
-    approved_ranges = []
-    for b in approved_bookings:
-        s, e = parse_range(b.time_slot or '')
-        if s is not None and e is not None:
-            approved_ranges.append((s, e))
+    # Served from the shared cache until approve/reject bumps the (date, sport) version
+    cached, cache_key = await availability_cache.aget_slots(date_selected, sport, ground, catalog)
+    if cached is not None:
+        return JsonResponse({"slots": cached}, status=200)
 
+    # One indexed range query: count approved bookings overlapping each slot
+    statuses = await slot_events.aslot_statuses(date_selected, sport, time_slots)
     for slot in time_slots:
-        slot_s, slot_e = parse_range(slot)
-        booked = False
-        if slot_s is not None and slot_e is not None:
-            for (bs, be) in approved_ranges:
-                if bs < slot_e and slot_s < be:
-                    booked = True
-                    break
-
-        slots.append({
-            "time": slot,
-            "status": "booked" if booked else "available"
-        })
+        slots.append({"time": slot.label, "status": statuses[slot.label]})
 
+    # Under the version read before the query: a decision committed since then orphans this entry
+    await availability_cache.aset_slots(cache_key, slots)
     return JsonResponse({"slots": slots}, status=200)
 
+# -------------------- LIVE SLOT STATUS (SSE) --------------------
+SLOT_EVENTS_KEEPALIVE = 15  # seconds; keeps proxies from closing an idle stream
+
+
+async def slot_events_stream(request):
+    """
+    Server-Sent Events for one (date, sport): a `snapshot` event with every
+    slot's status, then a `delta` event with the slots that changed after
+    each approve/reject. GET params: date=YYYY-MM-DD, sport.
+
+    Needs the ASGI deployment. Under WSGI a stream would hold a worker for
+    as long as the page is open, so the view answers 204, which tells
+    EventSource not to reconnect; the page keeps its fetched statuses.
+    """
+    try:
+        day = date.fromisoformat((request.GET.get('date') or '').strip())
+    except ValueError:
+        return JsonResponse({"error": "date must be YYYY-MM-DD"}, status=400)
+    sport = (request.GET.get('sport') or '').strip()
+    if not sport:
+        return JsonResponse({"error": "sport is required"}, status=400)
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    key = slot_events.subscription_key(day, sport)
+    hub = slot_events.get_hub()
+    queue = await hub.subscribe(key)
+
+    async def events():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    kind, slots = await asyncio.wait_for(queue.get(), SLOT_EVENTS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                data = json.dumps({"date": key[0], "sport": key[1], "slots": slots})
+                yield f'event: {kind}\ndata: {data}\n\n'
+        finally:
+            hub.unsubscribe(key, queue)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # no proxy buffering of the stream
+    return response
+
+# -------------------- AJAX AVAILABILITY GRID --------------------
+AVAILABILITY_GRID_MAX_DAYS = 62
+
+
+def availability_grid(request):
+    """
+    Slot status matrix for a date range and several sports in one request.
+
+    GET params: start=YYYY-MM-DD, end=YYYY-MM-DD (defaults to start + 6 days),
+    sports=Football,Cricket. The payload is columnar:
+
+        {"dates": [...], "slots": [...], "sports": [...],
+         "booked": {"football": [[0, 1, ...], [0, 0, ...]]}}
+
+    where booked[sport][slot_index][date_index] is 1 when an approved booking
+    overlaps that slot, and a slot the catalog does not offer for the sport
+    has a row of nulls. Availability does not depend on the ground, so no
+    ground parameter is needed.
+    """
+    try:
+        start = date.fromisoformat((request.GET.get('start') or '').strip())
+        end_str = (request.GET.get('end') or '').strip()
+        end = date.fromisoformat(end_str) if end_str else start + timedelta(days=6)
+    except ValueError:
+        return JsonResponse({"error": "start/end must be YYYY-MM-DD dates"}, status=400)
+
+    sports = sorted({s.strip().lower() for s in (request.GET.get('sports') or '').split(',') if s.strip()})
+    if not sports:
+        return JsonResponse({"error": "sports is required"}, status=400)
+    if end < start or (end - start).days >= AVAILABILITY_GRID_MAX_DAYS:
+        return JsonResponse({"error": f"date range must be 1-{AVAILABILITY_GRID_MAX_DAYS} days"}, status=400)
+
+    dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    date_index = {d: i for i, d in enumerate(dates)}
+    catalog = get_catalog()
+    booked = {}
+    for sport in sports:
+        offered = catalog.slots_for(sport)
+        booked[sport] = [[0 if slot in offered else None] * len(dates) for slot in catalog.slots]
+
+    # One grouped query on integer sport ids
+    sport_ids = {reference.get_id('sport', sport): sport for sport in sports}
+    sport_ids.pop(None, None)
+    ranges = (
+        Booking.objects
+        .filter(date__range=(start, end), status='Approved', start_minute__isnull=False,
+                sport_ref_id__in=list(sport_ids))
+        .values('date', 'sport_ref_id', 'start_minute', 'end_minute')
+        .annotate(n=Count('id'))
+    ) if sport_ids else []
+    for row in ranges:
+        columns = booked[sport_ids[row['sport_ref_id']]]
+        day = date_index[row['date']]
+        for i, slot in enumerate(catalog.slots):
+            if (columns[i][day] is not None and slot.start_minute is not None
+                    and row['start_minute'] < slot.end_minute and row['end_minute'] > slot.start_minute):
+                columns[i][day] = 1
+
+    return JsonResponse({
+        "dates": [d.isoformat() for d in dates],
+        "slots": [slot.label for slot in catalog.slots],
+        "sports": sports,
+        "booked": booked,
+    }, status=200)
+
 # -------------------- AJAX: Fetch Student Data --------------------
-def fetch_student_data(request):
+async def fetch_student_data(request):
     """
-    AJAX endpoint to fetch student info by first name
+    AJAX typeahead: students whose name, email or roll number matches `q`,
+    ranked best first (see booking/student_search.py).
     """
     q = request.GET.get("q", "")
-    print(f"[fetch_student_data] Received query: '{q}'")
-    
-    if not q:
-        print("[fetch_student_data] Empty query, returning empty list")
+    if not q.strip():
         return JsonResponse([], safe=False)
 
-    # Search by first name (split full_name and check first part)
-    students = StudentUser.objects.filter(full_name__icontains=q)[:10]
-    print(f"[fetch_student_data] Found {students.count()} students")
-    
-    data = []
-    for s in students:
-        if s.full_name:  # Only include students with names
-            data.append({
-                "full_name": s.full_name,
-                "email": s.email,
-                "roll_number": s.roll_number,
-                "branch": s.branch,
-                "year": s.year,
-                "division": s.division
-            })
-    
-    print(f"[fetch_student_data] Returning {len(data)} student records")
+    data = [
+        {
+            "full_name": s.full_name,
+            "email": s.email,
+            "roll_number": s.roll_number,
+            "branch": s.branch,
+            "year": s.year,
+            "division": s.division
+        }
+        for s in await asearch_students(q, limit=10)
+    ]
     return JsonResponse(data, safe=False)
 
 from django.shortcuts import get_object_or_404
 from django.http import JsonResponse
 from .models import AllotedGroundBooking
 
-def get_allotment_players(request, allot_id):
-    allotment = get_object_or_404(AllotedGroundBooking, id=allot_id)
+async def get_allotment_players(request, allot_id):
+    allotment = await aget_object_or_404(AllotedGroundBooking.objects.only('id', 'booking_id'), id=allot_id)
     # Some legacy/allotment entries may not be linked to a Booking
-    if not allotment.booking:
+    if not allotment.booking_id:
         return JsonResponse({"players": []})
-    players = allotment.booking.players.all()  # get all players linked to this booking
-    data = [
-        {
-            "name": p.name,
-            "branch": p.branch,
-            "year": p.year,
-            "division": p.division,
-        }
-        for p in players
-    ]
+    # All players linked to this booking
+    data = [p async for p in Player.objects.filter(booking_id=allotment.booking_id).values(
+        "name", "branch", "year", "division",
+    )]
     return JsonResponse({"players": data})
 
 from django.shortcuts import get_object_or_404
 from django.http import JsonResponse
 from .models import AllotedGroundBooking
 
-def get_equipment_for_allotment(request, allot_id):
-    allotment = get_object_or_404(AllotedGroundBooking, id=allot_id)
+async def get_equipment_for_allotment(request, allot_id):
+    allotment = await aget_object_or_404(AllotedGroundBooking.objects.select_related('booking'), id=allot_id)
     equipment = allotment.booking.equipment if allotment.booking else ""
     return JsonResponse({"equipment": equipment})
+
+
+# -------------------- METRICS (Prometheus) --------------------
+def prometheus_metrics(request):
+    """Shared counters of every worker in Prometheus text format; admin session or METRICS_TOKEN."""
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    if not request.session.get('is_admin_logged_in') and not (
+        token and hmac.compare_digest(authorization, f'Bearer {token}')
+    ):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+
+    metrics.flush()
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'groundbooking.settings')
 
 application = get_asgi_application()
+
+# Fill the reference table cache before the first request (booking.reference)
+from booking import reference  # noqa: E402
+
+reference.warm()
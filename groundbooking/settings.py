@@ -31,7 +31,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoise for static files
+    'booking.static_middleware.StaticFilesMiddleware',  # WhiteNoise static files, sync and async
+    'booking.metrics.MetricsMiddleware',  # Latency and DB use per URL name for /metrics
+    'booking.query_budget.QueryBudgetMiddleware',  # Logs views over QUERY_BUDGETS and slow queries
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -46,12 +48,23 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'booking', 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'booking.page_cache.navbar',
+            ],
+            # Compiled templates are kept for the life of the process in production;
+            # with DEBUG on they are re-read from disk, so edits show up at once
+            'loaders': [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ] if DEBUG else [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
             ],
         },
     },
@@ -63,7 +76,9 @@ WSGI_APPLICATION = 'groundbooking.wsgi.application'
 DATABASES = {
     'default': dj_database_url.config(
         default=config("DATABASE_URL"),
-        conn_max_age=600,  # persistent connections for performance
+        # Persistent connections for performance; set CONN_MAX_AGE=0 under ASGI,
+        # where every request runs its queries on a fresh thread
+        conn_max_age=config('CONN_MAX_AGE', default=600, cast=int),
         ssl_require=True
     )
 }
@@ -82,12 +97,89 @@ TIME_ZONE = 'UTC'
 USE_I18N = True
 USE_TZ = True
 
+# ✅ Cache - shared by all gunicorn workers on the instance (no external service needed).
+# 'default' holds state that is expensive to lose: version stamps, cached_db sessions,
+# the catalog and search stamps. 'bulk' holds payloads that are only re-rendered when
+# evicted (availability slot lists, page bodies, the navbar fragment), so filling it
+# never culls a session or a stamp. FileBasedCache culls a third of its entries once it
+# holds MAX_ENTRIES. Point CACHE_BACKEND/CACHE_LOCATION at Redis or Memcached when
+# running more than one instance; 'bulk' can stay per instance.
+CACHES = {
+    'default': {
+        'BACKEND': config("CACHE_BACKEND", default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config("CACHE_LOCATION", default=os.path.join(BASE_DIR, '.django_cache')),
+        'OPTIONS': {'MAX_ENTRIES': config("CACHE_MAX_ENTRIES", default=50000, cast=int)},
+    },
+    'bulk': {
+        'BACKEND': config("BULK_CACHE_BACKEND", default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config("BULK_CACHE_LOCATION", default=os.path.join(BASE_DIR, '.django_cache_bulk')),
+        'OPTIONS': {'MAX_ENTRIES': config("BULK_CACHE_MAX_ENTRIES", default=5000, cast=int)},
+    },
+}
+AVAILABILITY_CACHE_TIMEOUT = config("AVAILABILITY_CACHE_TIMEOUT", default=3600, cast=int)
+# Pages that change only on deploy (home, rules, booking success, the dashboard shell) and
+# the navbar fragment, cached per login state by booking.page_cache. The version is part
+# of their keys and ETags; Render sets RENDER_GIT_COMMIT on every deploy.
+PAGE_CACHE_TIMEOUT = config("PAGE_CACHE_TIMEOUT", default=86400, cast=int)
+PAGE_CACHE_VERSION = config("PAGE_CACHE_VERSION", default=config("RENDER_GIT_COMMIT", default=''))
+# Seconds between checks of the availability stamps for /slot-events/ subscribers; a
+# decision taken in the same process is pushed at once
+SLOT_EVENTS_POLL_INTERVAL = config("SLOT_EVENTS_POLL_INTERVAL", default=1.0, cast=float)
+
+# ✅ Metrics - each process adds its counts to the MetricCounter table at most this
+# often; /metrics is open to a logged-in admin or a scraper sending
+# "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_FLUSH_INTERVAL = config("METRICS_FLUSH_INTERVAL", default=10.0, cast=float)
+METRICS_TOKEN = config("METRICS_TOKEN", default='')
+
+# ✅ Query budgets - most queries (and optionally DB milliseconds) one request to a
+# view may use, by URL name. Requests over budget are logged with their SQL by
+# booking.query_budget, and the test suite asserts the same numbers.
+QUERY_BUDGETS = {
+    'check_availability': {'queries': 2},
+    'availability_grid': {'queries': 2},
+    'custom_admin_dashboard': {'queries': 6},
+    'admin_changes': {'queries': 4},
+    'student_booking': {'queries': 7},
+    'student_history': {'queries': 6},  # the page that reaches the archive also reads the archive tables
+    'student_dashboard': {'queries': 1},
+    'fetch_student_data': {'queries': 1},
+}
+SLOW_QUERY_MS = config("SLOW_QUERY_MS", default=200, cast=float)
+
+# ✅ Sessions - cached_db serves reads from the cache above and writes through to
+# the database, so existing database sessions keep working. For no server-side
+# storage at all use booking.signed_cookie_sessions, which adopts a live database
+# session the first time its old cookie is seen.
+SESSION_ENGINE = config("SESSION_ENGINE", default='django.contrib.sessions.backends.cached_db')
+
 # ✅ Static files setup for Render
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
-# WhiteNoise configuration - use simpler storage for better compatibility
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
+# WhiteNoise configuration - collectstatic writes content-hashed copies (served
+# with a one-year immutable Cache-Control), gzip/brotli copies of text assets and
+# the responsive image variants below (see booking/storage.py).
+# STATICFILES_STORAGE is ignored since Django 5.1; STORAGES is the only setting.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "booking.storage.StaticFilesStorage"},
+}
+
+# Widths (px) of the AVIF/WebP variants generated for {% responsive_image %}:
+# roughly 1x/1.5x/2x of the widths each image is laid out at
+RESPONSIVE_IMAGES = {
+    'images/VitGround1.jpg': (640, 960, 1280),
+    'images/VitGround2.jpg': (640, 960, 1280),
+    'images/VitGround3.jpg': (640, 960, 1280),
+    'images/VitGround4.jpg': (640, 960, 1280),
+    'images/rules-banner.jpeg': (640, 1280),
+    'images/SportDeckLogo.png': (48, 96, 144),
+    'images/VITLogo.png': (168, 336, 504),
+    'images/ground.png': (40, 80, 120),
+    'images/calendar.png': (40, 80, 120),
+    'images/management.png': (40, 80, 120),
+}
 
 # (Optional) if you have media uploads:
 MEDIA_URL = '/media/'
@@ -103,5 +195,11 @@ EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL")
 EMAIL_TIMEOUT = 30  # 30 seconds timeout for SMTP connections
 
+# ✅ Email outbox - views enqueue, `python manage.py send_outbox` delivers
+OUTBOX_MAX_ATTEMPTS = config("OUTBOX_MAX_ATTEMPTS", default=5, cast=int)
+OUTBOX_RETRY_BASE_SECONDS = config("OUTBOX_RETRY_BASE_SECONDS", default=30, cast=int)  # doubles per attempt
+OUTBOX_RETRY_MAX_SECONDS = config("OUTBOX_RETRY_MAX_SECONDS", default=3600, cast=int)
+OUTBOX_LEASE_SECONDS = config("OUTBOX_LEASE_SECONDS", default=300, cast=int)  # a claimed batch is retried by another worker after this
+
 # ✅ Default primary key field
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'